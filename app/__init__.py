@@ -7,19 +7,15 @@ import os
 import sys
 from flask_sqlalchemy import SQLAlchemy
 from config import Config
-from sqlalchemy import create_engine
-from flask_session import Session
+from modules.db_pool import engine_options, register_engines
+from modules.db_routing import RoutingSession, replica_binds, replica_router
+from modules.session_store import init_sessions
+from modules.sql_instrumentation import init_sql_instrumentation
+from modules.profiler import init_profiler
 from prometheus_flask_exporter import PrometheusMetrics
 import pytz
 from datetime import datetime
 
-print("[DEBUG] ENV DUMP:", file=sys.stderr, flush=True)
-for k, v in os.environ.items():
-    if k.startswith("DB_") or k == "TEST_BASE_URL":
-        print(f"{k}={v}", file=sys.stderr, flush=True)
-sys.stderr.flush()
-sys.stdout.flush()
-
 UPLOAD_FOLDER = 'static/temp'
 ALLOWED_EXTENSIONS = set(['txt', 'pdf', 'png', 'jpg', 'jpeg', 'gif'])
 
@@ -44,11 +40,11 @@ if os.getenv("TESTING") == "true" and os.getenv("SQLALCHEMY_DATABASE_URI"):
     app.config['WTF_CSRF_ENABLED'] = False
     
     # Skip MySQL configuration and go straight to SQLAlchemy setup
-    app.config['DB_ENGINE'] = create_engine(app.config['SQLALCHEMY_DATABASE_URI'])
     app.config["SESSION_COOKIE_NAME"] = "session"
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-    db = SQLAlchemy(app)
-    Session(app)
+    app.config['SQLALCHEMY_BINDS'] = replica_binds(app.config['DB_REPLICA_URIS'])
+    db = SQLAlchemy(app, session_options={'class_': RoutingSession})
+    init_sessions(app, db)
     print(f"[app/__init__.py] Unit test setup complete with: {app.config['SQLALCHEMY_DATABASE_URI']}", file=sys.stderr, flush=True)
 else:
 
@@ -71,25 +67,30 @@ else:
         print("[app/__init__.py] Local development environment detected", file=sys.stderr, flush=True)
 
     _db_port = os.getenv("DB_PORT", "3310")
-    print(f"[DEBUG] _db_port value: {_db_port} (type: {type(_db_port)})", file=sys.stderr, flush=True)
     if _db_port == "None":
         raise RuntimeError("DB_PORT environment variable is set to the string 'None'. Please set it to a valid port number.")
     _db_name = os.getenv("DB_NAME", "reef_test")
-    print(f"[app/__init__.py] DB_USER={_db_user} DB_PASS={_db_pass} DB_HOST={_db_host} DB_PORT={_db_port} DB_NAME={_db_name}", file=sys.stderr, flush=True)
     if not all([_db_user, _db_pass, _db_host, _db_port, _db_name]):
-        raise RuntimeError(f"Missing DB env var: DB_USER={_db_user}, DB_PASS={_db_pass}, DB_HOST={_db_host}, DB_PORT={_db_port}, DB_NAME={_db_name}")
+        raise RuntimeError(f"Missing DB env var: DB_USER={_db_user}, DB_HOST={_db_host}, DB_PORT={_db_port}, DB_NAME={_db_name}")
     app.config['SQLALCHEMY_DATABASE_URI'] = f"mysql+pymysql://{_db_user}:{_db_pass}@{_db_host}:{_db_port}/{_db_name}"
     if ":None/" in app.config['SQLALCHEMY_DATABASE_URI']:
-        raise RuntimeError(f"SQLALCHEMY_DATABASE_URI contains ':None/': {app.config['SQLALCHEMY_DATABASE_URI']}")
-    print(f"[app/__init__.py] SQLALCHEMY_DATABASE_URI: {app.config['SQLALCHEMY_DATABASE_URI']}", file=sys.stderr, flush=True)
+        raise RuntimeError("SQLALCHEMY_DATABASE_URI contains ':None/'; check DB_PORT")
 
-    app.config['DB_ENGINE'] = create_engine(app.config['SQLALCHEMY_DATABASE_URI'])
+    # One engine, owned by Flask-SQLAlchemy, with the DB_POOL_* settings. It connects
+    # lazily, so importing the app (e.g. gunicorn --preload) opens no connection
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
     app.config["SESSION_COOKIE_NAME"] = "session"
 
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-    db = SQLAlchemy(app)
+    # Replicas get the same pool settings; RoutingSession picks them for @replica_reads views
+    app.config['SQLALCHEMY_BINDS'] = replica_binds(app.config['DB_REPLICA_URIS'], app.config['SQLALCHEMY_ENGINE_OPTIONS'])
+    db = SQLAlchemy(app, session_options={'class_': RoutingSession})
+
+    init_sessions(app, db)
 
-    Session(app)
+with app.app_context():
+    register_engines(db.engines)
+replica_router.configure(app.config['REPLICA_CHECK_SECONDS'], app.config['REPLICA_RETRY_SECONDS'])
 
 # Initialize Prometheus metrics
 x_metrics = PrometheusMetrics(app)
@@ -102,6 +103,10 @@ x_metrics.counter('api_requests_total', 'Total requests to the /api endpoint')
 x_metrics.counter('home_requests_total', 'Total requests to the / endpoint')
 x_metrics.counter('metrics_requests_total', 'Total requests to the /metrics endpoint')
 x_metrics.counter('test_results_requests_total', 'Total requests to the /test_results endpoint')
+# ?__profile=1 sampling (token-gated); registered first so it wraps the other hooks
+init_profiler(app)
+# Per-endpoint query count/time histograms, Server-Timing header and slow-query log
+init_sql_instrumentation(app)
 
 # Import and register routes
 from app.routes.api import api_bp
@@ -109,11 +114,11 @@ from app.routes.web import web_fn
 app.register_blueprint(api_bp)
 app.register_blueprint(web_fn)
 from app.routes import corals, home, metrics, test, doser, models
+from app import cli
 import modules
 
 # Move context processor registration here to avoid circular import
-from modules.models import Tank
-from modules.tank_context import get_current_tank_id
+from modules.tank_context import get_current_tank_id, tank_catalogue
 
 @app.context_processor
 def inject_tank_context():
@@ -122,7 +127,8 @@ def inject_tank_context():
         return dict(tanks=[], tank_id=1)
     
     try:
-        tanks = Tank.query.all()
+        # Served from the per-process catalogue; invalidated on tank writes in table_ops
+        tanks = tank_catalogue.get()
         tank_id = get_current_tank_id()
         return dict(tanks=tanks, tank_id=tank_id)
     except Exception as e:
@@ -133,6 +139,5 @@ def inject_tank_context():
         raise
 
 # FINAL FAIL-FAST CHECK
-print(f"[FINAL CHECK] SQLALCHEMY_DATABASE_URI: {app.config['SQLALCHEMY_DATABASE_URI']}", file=sys.stderr, flush=True)
 if ':None/' in app.config['SQLALCHEMY_DATABASE_URI']:
-    raise RuntimeError(f"[FINAL CHECK] SQLALCHEMY_DATABASE_URI contains ':None/': {app.config['SQLALCHEMY_DATABASE_URI']}")
+    raise RuntimeError("[FINAL CHECK] SQLALCHEMY_DATABASE_URI contains ':None/'; check DB_PORT")
@@ -0,0 +1,173 @@
+# Copyright (c) 2025 Jasdeep Nijjar
+# All rights reserved.
+# Commercial use, copying, or redistribution of this software or any substantial portion of it is strictly prohibited without the express written permission of the copyright holder. For commercial licensing, please contact jasdeepn4@gmail.com.
+"""Maintenance commands, run with `flask <group> <command>`."""
+import click
+from flask.cli import AppGroup
+from app import app
+
+rollups_cli = AppGroup('rollups', help='Maintain the hourly/daily rollup tables.')
+
+
+@rollups_cli.command('rebuild')
+@click.option('--batch-size', default=5000, show_default=True, help='Rows fetched/written per batch.')
+def rollups_rebuild(batch_size):
+    """Recompute all rollups from raw test_results and dosing."""
+    from modules.rollups import rebuild_rollups
+    n_tests, n_doses = rebuild_rollups(batch_size=batch_size)
+    click.echo(f"Rebuilt rollups from {n_tests} test results and {n_doses} doses.")
+
+
+archive_cli = AppGroup('archive', help='Move old test/probe rows into compressed archive segments.')
+
+
+@archive_cli.command('compact')
+@click.option('--days', type=int, default=None, help='Archive rows older than this many days (default ARCHIVE_AFTER_DAYS).')
+@click.option('--tank-id', type=int, default=None, help='Only compact this tank.')
+def archive_compact(days, tank_id):
+    """Archive old rows into per-tank monthly segments and delete them from the database."""
+    from modules.archive import compact
+    result = compact(older_than_days=days, tank_id=tank_id)
+    click.echo(
+        f"Archived {result['test_results']} test results and "
+        f"{result['probe_readings']} probe readings older than {result['cutoff']}."
+    )
+
+
+@archive_cli.command('list')
+@click.option('--tank-id', type=int, default=None, help='Only list this tank.')
+def archive_list(tank_id):
+    """List archive segments with their row counts and sizes."""
+    import os
+    from modules import archive
+    for source in sorted(os.listdir(archive.archive_dir())) if os.path.isdir(archive.archive_dir()) else []:
+        for tid in archive.archived_tanks(source):
+            if tank_id and tid != tank_id:
+                continue
+            for path in archive.list_segments(source, tid):
+                header, _ = archive.read_segment(path, columns=[])
+                click.echo(f"{source}\ttank {tid}\t{header['month']}\t{header['rows']} rows\t{os.path.getsize(path)} bytes")
+
+
+export_cli = AppGroup('export', help='Export tank history as Arrow IPC or Parquet.')
+
+
+@export_cli.command('tank')
+@click.option('--tank-id', type=int, required=True, help='Tank to export.')
+@click.option('--format', 'fmt', type=click.Choice(['parquet', 'arrow']), default='parquet', show_default=True)
+@click.option('--out', 'out_dir', type=click.Path(file_okay=False), default='.', show_default=True, help='Output directory.')
+@click.option('--table', 'tables', multiple=True, help='Table to export (repeatable, default all).')
+@click.option('--batch-size', type=int, default=None, help='Rows per record batch / row group.')
+def export_tank(tank_id, fmt, out_dir, tables, batch_size):
+    """Write one file per table, e.g. tank1_test_results.parquet."""
+    import os
+    from modules.export import EXPORT_TABLES, FORMATS, write_export
+    os.makedirs(out_dir, exist_ok=True)
+    for table_name in tables or EXPORT_TABLES:
+        path = os.path.join(out_dir, f"tank{tank_id}_{table_name}.{FORMATS[fmt][1]}")
+        rows = write_export(table_name, tank_id, fmt, path, batch_rows=batch_size)
+        click.echo(f"{path}: {rows} rows")
+
+
+media_cli = AppGroup('media', help='Maintain uploaded photos.')
+
+
+@media_cli.command('rehash')
+@click.option('--all', 'rehash_all', is_flag=True, help='Recompute hashes that already exist.')
+def media_rehash(rehash_all):
+    """Compute perceptual hashes for stored originals (backfill for the similarity index)."""
+    import os
+    from PIL import Image, ImageOps
+    from app import db
+    from modules import media
+    from modules.models import PhotoHash
+    from modules.photo_similarity import record_photo_hash
+    known = set() if rehash_all else {d for (d,) in db.session.query(PhotoHash.digest).all()}
+    root = os.path.join(media.upload_dir(), 'originals')
+    done = 0
+    for folder, _, files in os.walk(root):
+        for name in files:
+            digest = name.split('.', 1)[0]
+            if not media.DIGEST_RE.match(digest) or digest in known:
+                continue
+            with Image.open(os.path.join(folder, name)) as img:
+                record_photo_hash(digest, ImageOps.exif_transpose(img))
+            done += 1
+    click.echo(f"Hashed {done} photos.")
+
+
+sessions_cli = AppGroup('sessions', help='Maintain server-side sessions (SESSION_BACKEND=sql).')
+
+
+@sessions_cli.command('purge')
+def sessions_purge():
+    """Delete expired web_sessions rows."""
+    from app import db
+    from modules.session_store import SqlSessionInterface
+    removed = SqlSessionInterface(db, 0, 0).purge_expired()
+    click.echo(f"Removed {removed} expired sessions.")
+
+
+synth_cli = AppGroup('synth', help='Generate synthetic data for load and performance testing.')
+
+
+@synth_cli.command('generate')
+@click.option('--scale', default='small', show_default=True, help='small, medium, large or xl.')
+@click.option('--set', 'settings', multiple=True, metavar='KEY=VALUE', help='Override one scale setting (repeatable).')
+@click.option('--seed', type=int, default=0, show_default=True)
+@click.option('--end', type=click.DateTime(formats=['%Y-%m-%d']), default=None, help='Last generated day (default today).')
+@click.option('--rollups', is_flag=True, help='Rebuild the rollup tables afterwards.')
+def synth_generate(scale, settings, seed, end, rollups):
+    """Append a seeded, correlated dataset (tanks, schedules, doses, tests, taxonomy, corals)."""
+    from app import db
+    from modules.synthetic_data import generate, resolve_scale
+    overrides = {}
+    for item in settings:
+        key, _, value = item.partition('=')
+        if not value:
+            raise click.BadParameter(f"expected KEY=VALUE, got '{item}'", param_hint='--set')
+        overrides[key] = value
+    try:
+        spec = resolve_scale(scale, overrides)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+    counts = generate(db.engine, spec, seed=seed, end=end.date() if end else None)
+    click.echo(', '.join(f"{table}={n}" for table, n in counts.items()))
+    if rollups:
+        from modules.rollups import rebuild_rollups
+        n_tests, n_doses = rebuild_rollups()
+        click.echo(f"Rebuilt rollups from {n_tests} test results and {n_doses} doses.")
+
+
+schema_cli = AppGroup('schema', help='Bring an existing database in line with the models.')
+
+
+@schema_cli.command('indexes')
+@click.option('--dry-run', is_flag=True, help='Only list the missing indexes.')
+def schema_indexes(dry_run):
+    """Create indexes declared on the models that existing tables lack. Safe to re-run."""
+    from sqlalchemy import inspect
+    from app import db
+    inspector = inspect(db.engine)
+    missing = 0
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {ix['name'] for ix in inspector.get_indexes(table.name)}
+        for index in sorted(table.indexes, key=lambda ix: ix.name):
+            if index.name in existing:
+                continue
+            missing += 1
+            click.echo(f"{table.name}: {'missing' if dry_run else 'creating'} {index.name}")
+            if not dry_run:
+                index.create(db.engine)
+    click.echo(f"{missing} index(es) missing." if dry_run else f"Created {missing} index(es).")
+
+
+app.cli.add_command(rollups_cli)
+app.cli.add_command(archive_cli)
+app.cli.add_command(export_cli)
+app.cli.add_command(media_cli)
+app.cli.add_command(sessions_cli)
+app.cli.add_command(synth_cli)
+app.cli.add_command(schema_cli)
@@ -6,6 +6,12 @@ from .tests import bp as tests_bp
 from .taxonomy import bp as taxonomy_bp
 from .corals import bp as corals_bp
 from .models import bp as alk
+from .grafana import bp as grafana_bp
+from .probes import bp as probes_bp
+from .export import bp as export_bp
+from .db import bp as db_bp
+from .profiler import bp as profiler_bp
+from .dashboard import bp as dashboard_bp
 
 api_bp = Blueprint('api', __name__, url_prefix='/api/v1')
 
@@ -16,4 +22,10 @@ api_bp.register_blueprint(tests_bp)
 api_bp.register_blueprint(taxonomy_bp)
 api_bp.register_blueprint(corals_bp)
 api_bp.register_blueprint(alk)
+api_bp.register_blueprint(grafana_bp)
+api_bp.register_blueprint(probes_bp)
+api_bp.register_blueprint(export_bp)
+api_bp.register_blueprint(db_bp)
+api_bp.register_blueprint(profiler_bp)
+api_bp.register_blueprint(dashboard_bp)
 
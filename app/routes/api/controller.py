@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify, current_app
 from app import db
+from modules import rollups
 from sqlalchemy import text
 from datetime import datetime
 import pytz
@@ -68,6 +69,7 @@ def create_dosing():
                 'trigger_time': trigger_time
             }
         )
+        rollups.record_dose(schedule_id, product_id, trigger_time, amount_float)
         db.session.commit()
         return jsonify({'success': True}), 201
     except Exception as e:
@@ -0,0 +1,52 @@
+import asyncio
+
+from flask import Blueprint, jsonify, request
+from sqlalchemy import select
+
+from modules.async_db import run_sync
+from modules.db_functions import read_rows
+from modules.models import AlkalinityDoseModel, DSchedule, TestResults
+from modules.tank_context import get_current_tank_id
+
+bp = Blueprint('dashboard_api', __name__, url_prefix='/dashboard')
+
+
+def _columns(row, names):
+    return {name: getattr(row, name) for name in names}
+
+
+@bp.route('/summary', methods=['GET'])
+async def get_dashboard_summary():
+    """
+    Latest test results, dosing schedules and alkalinity models for one tank.
+    The three reads are awaited together, so their DB round trips overlap.
+
+    Example usage:
+    /api/v1/dashboard/summary?tank_id=1&tests=10
+    """
+    tank_id = request.args.get('tank_id', type=int) or get_current_tank_id()
+    if not tank_id:
+        return jsonify({'error': 'No tank selected.'}), 400
+    limit = min(max(request.args.get('tests', 10, type=int), 1), 200)
+
+    latest = (
+        select(TestResults).where(TestResults.tank_id == tank_id)
+        .order_by(TestResults.test_date.desc(), TestResults.test_time.desc()).limit(limit)
+    )
+    tests, schedules, models = await asyncio.gather(
+        run_sync(lambda session: session.execute(latest).scalars().all()),
+        read_rows(DSchedule, {'tank_id': tank_id}),
+        read_rows(AlkalinityDoseModel, {'tank_id': tank_id}),
+    )
+    return jsonify({
+        'tank_id': tank_id,
+        'tests': [t.to_dict() for t in tests],
+        'schedules': [
+            _columns(s, ('id', 'product_id', 'amount', 'trigger_interval', 'suspended', 'last_refill'))
+            for s in schedules or []
+        ],
+        'alkalinity_models': [
+            _columns(m, ('id', 'product_id', 'slope', 'intercept', 'r2_score', 'last_trained'))
+            for m in models or []
+        ],
+    })
@@ -0,0 +1,32 @@
+from flask import Blueprint, jsonify, request
+from modules.db_pool import pool_stats
+from modules.sql_instrumentation import query_stats
+
+bp = Blueprint('db_api', __name__, url_prefix='/db')
+
+
+@bp.route('/pool', methods=['GET'])
+def get_pool_stats():
+    """
+    Connection pool occupancy for this worker process (the same numbers as the db_pool_* metrics).
+
+    Example usage:
+    /api/v1/db/pool
+    """
+    return jsonify(pool_stats())
+
+
+@bp.route('/queries', methods=['GET'])
+def get_query_stats():
+    """
+    Per-endpoint SQL totals for this worker process, heaviest first.
+    sort: db_seconds (default), queries, avg_queries, avg_db_ms, slowest_ms or requests.
+
+    Example usage:
+    /api/v1/db/queries?sort=avg_queries&limit=20
+    """
+    sort = request.args.get('sort', 'db_seconds')
+    if sort not in ('db_seconds', 'queries', 'avg_queries', 'avg_db_ms', 'slowest_ms', 'requests'):
+        return jsonify({'error': f"Unknown sort '{sort}'"}), 400
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 500)
+    return jsonify(query_stats.snapshot(sort=sort, limit=limit))
@@ -0,0 +1,34 @@
+from flask import Blueprint, jsonify, request, Response, stream_with_context
+from modules import export
+from modules.tank_context import get_current_tank_id
+
+bp = Blueprint('export_api', __name__, url_prefix='/export')
+
+
+@bp.route('/<table_name>', methods=['GET'])
+def export_table(table_name):
+    """
+    Stream one table of a tank's history as Parquet or an Arrow IPC stream.
+
+    Example usage:
+    /api/v1/export/test_results?tank_id=1&format=parquet
+    /api/v1/export/dosing?format=arrow   (tank from the session)
+
+    pandas: pd.read_parquet(url) or pa.ipc.open_stream(resp.raw).read_pandas()
+    """
+    if table_name not in export.EXPORT_TABLES:
+        return jsonify({"error": f"Table '{table_name}' not found."}), 404
+    fmt = request.args.get('format', 'parquet').lower()
+    if fmt not in export.FORMATS:
+        return jsonify({"error": f"Unknown format '{fmt}', use one of {list(export.FORMATS)}"}), 400
+    tank_id = request.args.get('tank_id', type=int) or get_current_tank_id()
+    if not tank_id:
+        return jsonify({"error": "No tank_id provided or set in session"}), 400
+
+    mimetype, extension = export.FORMATS[fmt]
+    filename = f"tank{tank_id}_{table_name}.{extension}"
+    return Response(
+        stream_with_context(export.stream_export(table_name, tank_id, fmt)),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'},
+    )
@@ -0,0 +1,113 @@
+from datetime import datetime, timezone
+
+from flask import Blueprint, jsonify, request
+from app import db
+from modules import rollups
+from modules.models import Tank, Products, DSchedule
+from modules.utils.timeseries import TEST_PARAMETERS, to_epoch_ms
+from modules.db_routing import replica_reads
+
+# Grafana simple-JSON / Infinity datasource. Point the datasource URL at /api/v1/grafana.
+# Targets look like "tank:<tank_id>:<param>" or "tank:<tank_id>:dose:<product_id>".
+bp = Blueprint('grafana_api', __name__, url_prefix='/grafana')
+
+AGGREGATES = ('avg', 'min', 'max', 'count', 'sum')
+
+
+def _parse_time(value):
+    # Rollup buckets are naive UTC; shift offset timestamps to UTC before dropping the offset
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc)
+    return parsed.replace(tzinfo=None)
+
+
+@bp.route('/', methods=['GET'])
+def grafana_health():
+    # Grafana's "Save & test" only checks for a 200
+    return jsonify({'success': True})
+
+
+@bp.route('/search', methods=['POST'])
+@replica_reads
+def grafana_search():
+    body = request.get_json(silent=True) or {}
+    needle = (body.get('target') or '').lower()
+
+    tanks = db.session.query(Tank.id, Tank.name).order_by(Tank.id).all()
+    products = dict(db.session.query(Products.id, Products.name).all())
+    schedules = db.session.query(DSchedule.tank_id, DSchedule.product_id).distinct().all()
+
+    targets = []
+    for tank_id, tank_name in tanks:
+        for param in TEST_PARAMETERS:
+            targets.append({'text': f"{tank_name} {param}", 'value': f"tank:{tank_id}:{param}"})
+    tank_names = {t[0]: t[1] for t in tanks}
+    for tank_id, product_id in schedules:
+        targets.append({
+            'text': f"{tank_names.get(tank_id, tank_id)} dosed {products.get(product_id, product_id)}",
+            'value': f"tank:{tank_id}:dose:{product_id}",
+        })
+    if needle:
+        targets = [t for t in targets if needle in t['text'].lower() or needle in t['value']]
+    return jsonify(targets)
+
+
+@bp.route('/query', methods=['POST'])
+@replica_reads
+def grafana_query():
+    """
+    Serve Grafana timeseries queries from the hourly/daily rollup tables.
+    Hourly buckets are used when they fit in maxDataPoints, daily otherwise.
+    """
+    body = request.get_json(silent=True) or {}
+    try:
+        start = _parse_time(body['range']['from'])
+        end = _parse_time(body['range']['to'])
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'error': 'Query requires range.from and range.to'}), 400
+    max_points = int(body.get('maxDataPoints') or 1000)
+    granularity = rollups.pick_granularity(start, end, max_points)
+
+    response = []
+    for target in body.get('targets', []):
+        name = target.get('target')
+        if not name:
+            continue
+        options = target.get('payload') or target.get('data') or {}
+        agg = options.get('agg', 'avg') if isinstance(options, dict) else 'avg'
+        if agg not in AGGREGATES:
+            return jsonify({'error': f"Unknown aggregate '{agg}'"}), 400
+
+        parts = name.split(':')
+        try:
+            if len(parts) == 3 and parts[0] == 'tank' and parts[2] in TEST_PARAMETERS:
+                rows = rollups.get_test_series(int(parts[1]), parts[2], granularity, start, end)
+                datapoints = []
+                for bucket_start, count, total, lo, hi in rows:
+                    value = {
+                        'avg': total / count if count else None,
+                        'min': lo,
+                        'max': hi,
+                        'count': count,
+                        'sum': total,
+                    }[agg]
+                    datapoints.append([value, to_epoch_ms(bucket_start)])
+            elif len(parts) == 4 and parts[0] == 'tank' and parts[2] == 'dose':
+                rows = rollups.get_dose_series(int(parts[1]), int(parts[3]), granularity, start, end)
+                datapoints = [
+                    [count if agg == 'count' else total, to_epoch_ms(bucket_start)]
+                    for bucket_start, count, total in rows
+                ]
+            else:
+                return jsonify({'error': f"Unknown target '{name}'"}), 400
+        except ValueError:
+            return jsonify({'error': f"Invalid target '{name}'"}), 400
+        response.append({'target': name, 'datapoints': datapoints})
+    return jsonify(response)
+
+
+@bp.route('/annotations', methods=['POST'])
+@replica_reads
+def grafana_annotations():
+    return jsonify([])
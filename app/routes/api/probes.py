@@ -0,0 +1,89 @@
+import math
+from datetime import datetime
+
+from flask import Blueprint, jsonify, request, current_app
+from app import db
+from modules.probe_buffer import probe_buffer, BufferFull
+from modules.tank_context import tank_catalogue
+
+bp = Blueprint('probes_api', __name__, url_prefix='/probes')
+
+PROBES = ('ph',)
+
+
+def _parse_reading_time(value):
+    if isinstance(value, (int, float)):
+        return datetime.utcfromtimestamp(value / 1000)
+    return datetime.fromisoformat(str(value).replace('Z', '+00:00')).replace(tzinfo=None)
+
+
+def _parse_value(value):
+    value = float(value)
+    if not math.isfinite(value):
+        raise ValueError(f"value must be finite, got {value}")
+    return value
+
+
+def _tank_exists(tank_id):
+    if any(tank.id == tank_id for tank in tank_catalogue.get()):
+        return True
+    # The catalogue may predate a tank created in another worker
+    from modules.models import Tank
+    return db.session.get(Tank, tank_id) is not None
+
+
+@bp.route('/readings', methods=['POST'])
+def ingest_readings():
+    """
+    Accept a batch of probe readings. They are buffered and written in bulk,
+    so a 202 means "queued", not "committed".
+
+    Body:
+    {"tank_id": 1, "probe": "ph", "readings": [[1717430400000, 8.12], ["2025-06-03T16:00:15Z", 8.13]]}
+    or readings as objects: [{"t": 1717430400000, "v": 8.12}, ...]
+    """
+    data = request.get_json(silent=True) or {}
+    tank_id = data.get('tank_id')
+    probe = (data.get('probe') or '').lower()
+    readings = data.get('readings') or []
+
+    if not tank_id:
+        return jsonify({'success': False, 'error': 'Missing tank_id'}), 400
+    if probe not in PROBES:
+        return jsonify({'success': False, 'error': f"Unknown probe '{probe}'"}), 400
+    if not isinstance(readings, list) or not readings:
+        return jsonify({'success': False, 'error': 'No readings provided'}), 400
+    max_batch = current_app.config['PROBE_MAX_BATCH']
+    if len(readings) > max_batch:
+        return jsonify({'success': False, 'error': f"Batch too large (max {max_batch} readings)"}), 413
+
+    rows = []
+    try:
+        tank_id = int(tank_id)
+        for reading in readings:
+            if isinstance(reading, dict):
+                t, v = reading['t'], reading['v']
+            else:
+                t, v = reading
+            rows.append({
+                'tank_id': tank_id,
+                'probe': probe,
+                'reading_time': _parse_reading_time(t),
+                'value': _parse_value(v),
+            })
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'success': False, 'error': f"Invalid reading: {e}"}), 400
+    if not _tank_exists(tank_id):
+        return jsonify({'success': False, 'error': f"Unknown tank_id {tank_id}"}), 404
+
+    try:
+        accepted = probe_buffer.submit(rows)
+    except BufferFull as e:
+        retry_after = max(1, int(probe_buffer.flush_seconds))
+        return jsonify({'success': False, 'error': str(e)}), 503, {'Retry-After': str(retry_after)}
+    return jsonify({'success': True, 'accepted': accepted, 'queued': len(probe_buffer)}), 202
+
+
+@bp.route('/stats', methods=['GET'])
+def probe_buffer_stats():
+    return jsonify(probe_buffer.stats())
@@ -0,0 +1,55 @@
+from functools import wraps
+
+from flask import Blueprint, Response, current_app, jsonify, request
+from modules.profiler import authorized, worker_profiler
+
+bp = Blueprint('profiler_api', __name__, url_prefix='/profiler')
+
+
+def profiler_token_required(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not current_app.config.get('PROFILER_TOKEN'):
+            return jsonify({'error': 'Not found'}), 404
+        if not authorized():
+            return jsonify({'error': 'Invalid profiler token'}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+
+@bp.route('/start', methods=['POST'])
+@profiler_token_required
+def start_profile():
+    """
+    Sample every thread of this worker process for a while.
+
+    Example usage:
+    curl -X POST -H 'X-Profile-Token: ...' '/api/v1/profiler/start?seconds=20&interval_ms=10'
+    """
+    max_seconds = current_app.config['PROFILER_MAX_SECONDS']
+    seconds = min(max(request.args.get('seconds', 10, type=float), 0.1), max_seconds)
+    interval_ms = max(request.args.get('interval_ms', current_app.config['PROFILER_INTERVAL_MS'], type=float), 1)
+    sampler = worker_profiler.start(seconds, interval_ms / 1000)
+    if sampler is None:
+        return jsonify({'error': 'A profile is already running in this worker'}), 409
+    return jsonify({'running': True, 'seconds': seconds, 'interval_ms': interval_ms}), 202
+
+
+@bp.route('/result', methods=['GET'])
+@profiler_token_required
+def get_profile():
+    """
+    Collapsed stacks from the last worker profile (format=json for JSON, top=N to trim).
+
+    Example usage:
+    curl -H 'X-Profile-Token: ...' /api/v1/profiler/result > worker.folded && flamegraph.pl worker.folded > worker.svg
+    """
+    running, profile = worker_profiler.status()
+    if profile is None:
+        return jsonify({'error': 'No profile has been recorded in this worker'}), 404
+    if request.args.get('format') == 'json':
+        return jsonify(dict(profile.to_dict(top=request.args.get('top', type=int)), running=running))
+    response = Response(profile.collapsed(), mimetype='text/plain')
+    response.headers['X-Profile-Running'] = str(running).lower()
+    response.headers['X-Profile-Samples'] = str(profile.samples)
+    return response
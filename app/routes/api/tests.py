@@ -1,6 +1,10 @@
-from flask import Blueprint, jsonify
-from modules.models import TestResults  # Adjust import if your model is named differently
+from flask import Blueprint, jsonify, request
+from modules.models import TestResults, ProbeReading  # Adjust import if your model is named differently
+from modules.tank_context import get_current_tank_id
+from modules.utils import timeseries
+from modules import archive
 from app import db
+from modules.db_routing import replica_reads
 
 bp = Blueprint('tests_api', __name__, url_prefix='/tests')
 
@@ -18,4 +22,113 @@ def get_latest_test():
 @bp.route('/get/<int:test_id>', methods=['GET'])
 def get_test_by_id(test_id):
     test = TestResults.query.get(test_id)
-    return jsonify(result=test.to_dict() if test else None)
\ No newline at end of file
+    return jsonify(result=test.to_dict() if test else None)
+
+def _load_test_series(tank_id, params, start, end, start_ms, end_ms):
+    """Return {param: (ts_ms, values)} for test_results rows in range, NaN for missing values."""
+    # Only pull the columns we chart; the date filter narrows on the index
+    columns = [getattr(TestResults, p) for p in params]
+    query = db.session.query(TestResults.test_date, TestResults.test_time, *columns).filter(
+        TestResults.tank_id == tank_id
+    )
+    if start:
+        query = query.filter(TestResults.test_date >= start.date())
+    if end:
+        query = query.filter(TestResults.test_date <= end.date())
+    rows = query.order_by(TestResults.test_date, TestResults.test_time).all()
+
+    ts = [timeseries.to_epoch_ms(r[0], r[1]) for r in rows]
+    keep = [
+        i for i, t in enumerate(ts)
+        if (start_ms is None or t >= start_ms) and (end_ms is None or t <= end_ms)
+    ]
+    ts = [ts[i] for i in keep]
+    hot_values = {}
+    for col_idx, param in enumerate(params, start=2):
+        values = [rows[i][col_idx] for i in keep]
+        hot_values[param] = [float('nan') if v is None else v for v in values]
+    ts, merged = archive.merge_with_hot(archive.TEST_SOURCE, tank_id, params, start_ms, end_ms, ts, hot_values)
+    return {param: (ts, merged[param]) for param in params}
+
+
+def _load_probe_series(tank_id, probe, start, end, start_ms, end_ms):
+    """Return (ts_ms, values) for probe_readings in range, including archived readings."""
+    query = db.session.query(ProbeReading.reading_time, ProbeReading.value).filter(
+        ProbeReading.tank_id == tank_id,
+        ProbeReading.probe == probe,
+    )
+    if start:
+        query = query.filter(ProbeReading.reading_time >= start)
+    if end:
+        query = query.filter(ProbeReading.reading_time <= end)
+    rows = query.order_by(ProbeReading.reading_time).all()
+    ts, merged = archive.merge_with_hot(
+        archive.probe_source(probe), tank_id, ['value'], start_ms, end_ms,
+        [timeseries.to_epoch_ms(r[0]) for r in rows], {'value': [r[1] for r in rows]},
+    )
+    return ts, merged['value']
+
+
+@bp.route('/series', methods=['GET'])
+@replica_reads
+def get_test_series():
+    """
+    Downsampled time series of test parameters (and probe readings such as ph) for charts.
+
+    Example usage:
+    /api/v1/tests/series?tank_id=1&params=alk,cal&start=2025-01-01&end=2025-06-01&points=300&mode=lttb
+
+    mode=lttb returns [ts_ms, value] pairs, mode=bucket returns
+    [ts_ms, min, max, avg, count] rows. The payload never exceeds `points`
+    entries per parameter regardless of how much history exists.
+    """
+    tank_id = request.args.get('tank_id', type=int) or get_current_tank_id()
+    if not tank_id:
+        return jsonify({'error': 'No tank selected.'}), 400
+
+    params = [p for p in request.args.get('params', '').split(',') if p]
+    if not params:
+        params = list(timeseries.TEST_PARAMETERS)
+    unknown = [p for p in params if p not in timeseries.SERIES_PARAMETERS]
+    if unknown:
+        return jsonify({'error': f"Unknown parameter(s): {', '.join(unknown)}"}), 400
+
+    mode = request.args.get('mode', 'lttb')
+    if mode not in ('lttb', 'bucket'):
+        return jsonify({'error': f"Unknown mode '{mode}'"}), 400
+    points = request.args.get('points', timeseries.DEFAULT_POINTS, type=int)
+    points = max(3, min(points, timeseries.MAX_POINTS))
+
+    try:
+        start = timeseries.parse_range_arg(request.args.get('start'))
+        end = timeseries.parse_range_arg(request.args.get('end'), end_of_day=True)
+    except ValueError as e:
+        return jsonify({'error': f"Invalid time range: {e}"}), 400
+
+    start_ms = timeseries.to_epoch_ms(start) if start else None
+    end_ms = timeseries.to_epoch_ms(end) if end else None
+
+    loaded = {}
+    test_params = [p for p in params if p in timeseries.TEST_PARAMETERS]
+    if test_params:
+        loaded.update(_load_test_series(tank_id, test_params, start, end, start_ms, end_ms))
+    for probe in (p for p in params if p in timeseries.PROBE_PARAMETERS):
+        loaded[probe] = _load_probe_series(tank_id, probe, start, end, start_ms, end_ms)
+
+    series = {}
+    for param in params:
+        ts, values = loaded[param]
+        series[param] = {
+            'raw_count': sum(1 for v in values if v == v),
+            'data': timeseries.downsample(ts, values, points, mode, start_ms, end_ms),
+        }
+
+    return jsonify({
+        'tank_id': tank_id,
+        'mode': mode,
+        'points': points,
+        'start': start_ms,
+        'end': end_ms,
+        'columns': ['ts', 'value'] if mode == 'lttb' else ['ts', 'min', 'max', 'avg', 'count'],
+        'series': series,
+    })
@@ -6,6 +6,8 @@ from modules.utils import helper
 from modules.forms import CoralForm
 from modules.models import Coral, Tank, Taxonomy, ColorMorphs # Add Taxonomy, ColorMorph
 from modules.tank_context import get_current_tank_id
+from modules import media
+from modules.db_routing import replica_reads
 import os
 import datetime
 from modules.utils.helper import generate_columns, validate_and_process_data
@@ -21,7 +23,7 @@ def get_field(form, field):
     return val.data if val and val.data not in ("", None) else None
 
 
-def build_coral(form, taxonomy=None, color_morph=None):
+def build_coral(form, taxonomy=None, color_morph=None, photo=None):
     # Build coral_name using taxonomy and color morph objects, and append unique_id if present
     unique_id = get_field(form, "unique_id")
     if taxonomy and color_morph:
@@ -61,12 +63,20 @@ def build_coral(form, taxonomy=None, color_morph=None):
         unique_id=get_field(form, "unique_id"),
         # origin=get_field(form, "origin"),
         # compatibility=get_field(form, "compatibility"),
-        photo=form.photo.data.filename if form.photo.data else None,
+        photo=photo,  # content hash from modules.media, see save_coral_photo
         notes=get_field(form, "notes"),
         test_id=get_field(form, "test_id")
     )
 
 
+def save_coral_photo(file_storage):
+    """Store an uploaded coral photo and return its SHA-256 for Coral.photo (None if no file)."""
+    if not file_storage or not getattr(file_storage, 'filename', None):
+        return None
+    digest, _ = media.save_upload(file_storage)
+    return digest
+
+
 @app.route("/coral/add", methods=["GET", "POST"])
 def new_coral():
     form = CoralForm()
@@ -91,7 +101,17 @@ def new_coral():
                 now=datetime.datetime.now,
                 form_errors=errors
             )
-        coral = build_coral(form, taxonomy=taxonomy, color_morph=color_morph)
+        try:
+            photo = save_coral_photo(form.photo.data)
+        except media.InvalidImage as e:
+            return render_template(
+                "coral/new_coral.html",
+                title="NEW CORAL",
+                form=form,
+                now=datetime.datetime.now,
+                form_errors={'photo': [str(e)]}
+            )
+        coral = build_coral(form, taxonomy=taxonomy, color_morph=color_morph, photo=photo)
         db.session.add(coral)
         db.session.commit()
         print("Coral object created:", coral)
@@ -131,6 +151,7 @@ import enum
 from datetime import date, time
 
 @app.route("/web/fn/get/corals", methods=["GET"])
+@replica_reads
 def get_corals_for_tank():
     try:
         tank_id = get_current_tank_id()
@@ -143,17 +164,35 @@ def get_corals_for_tank():
                 "error": "No tank selected."
             })
         draw = int(request.args.get('draw', 1))
-        params = {
-            'search': request.args.get('search', ''),
-            'sidx': request.args.get('sidx', ''),
-            'sord': request.args.get('sord', 'asc'),
-            'page': request.args.get('page', 1),
-            'rows': request.args.get('rows', 10)
-        }
+        page = max(int(request.args.get('page', 1) or 1), 1)
+        rows = min(max(int(request.args.get('rows', 10) or 10), 1), 500)
+        search = request.args.get('search', '').strip()
+        sidx = request.args.get('sidx', '')
+        sord = request.args.get('sord', 'asc')
+
+        # Search, ordering and paging run in SQL so only one page is loaded
         base_query = Coral.query.filter_by(tank_id=tank_id)
-        all_results = base_query.all()
+        records_total = base_query.order_by(None).count()
+        filtered_query = base_query
+        if search:
+            pattern = f"%{search}%"
+            # Dates, PAR and other non-text columns are matched on their text form too
+            searchable = [
+                c if isinstance(c.type, (db.String, db.Text, db.Enum)) else db.cast(c, db.String)
+                for c in Coral.__table__.columns
+                if not isinstance(c.type, (db.Boolean, db.LargeBinary))
+            ]
+            filtered_query = filtered_query.filter(db.or_(*[c.ilike(pattern) for c in searchable]))
+        records_filtered = filtered_query.order_by(None).count() if search else records_total
+        if sidx in Coral.__table__.columns:
+            column = Coral.__table__.columns[sidx]
+            filtered_query = filtered_query.order_by(column.desc() if sord == 'desc' else column.asc(), Coral.id)
+        else:
+            filtered_query = filtered_query.order_by(Coral.id)
+        page_results = filtered_query.limit(rows).offset((page - 1) * rows).all()
+
         data = []
-        for row in all_results:
+        for row in page_results:
             row_data = {}
             for column in Coral.__table__.columns:
                 value = getattr(row, column.name)
@@ -166,13 +205,11 @@ def get_corals_for_tank():
                 else:
                     row_data[column.name] = value
             data.append(row_data)
-        from modules.utils.helper import apply_datatables_query_params_to_dicts
-        filtered_data, total_filtered = apply_datatables_query_params_to_dicts(data, params)
         response = {
             "draw": draw,
-            "recordsTotal": len(data),
-            "recordsFiltered": total_filtered,
-            "data": filtered_data,
+            "recordsTotal": records_total,
+            "recordsFiltered": records_filtered,
+            "data": data,
         }
         return jsonify(response)
     except Exception as e:
@@ -5,6 +5,7 @@ from app import app
 from modules.models import *  # Import your models
 from modules.utils.helper import *
 from modules.tank_context import get_current_tank_id
+from modules.services.dosing import ServiceError, submit_doser_form
 # import db
 import enum
 from flask_wtf import FlaskForm
@@ -159,75 +160,18 @@ def doser_submit():
     if not tank_id:
         return jsonify({"success": False, "error": "No tank selected"}), 400
     data = request.get_json()
-    form_type = data.get("form_type")
-    if not form_type:
-        return jsonify({"success": False, "error": "Missing form_type"}), 400
+    try:
+        # New product (if any) and the schedule or dose are written in one transaction
+        row, product = submit_doser_form(tank_id, data)
+    except ServiceError as e:
+        return jsonify({"success": False, "error": e.message}), e.status
+    except Exception as e:
+        return jsonify({"success": False, "error": f"Failed to add record: {str(e)}"}), 500
+    response = {"success": True, "id": row.id, "message": "Record added successfully"}
+    if product is not None:
+        response["product_id"] = product.id
+    return jsonify(response), 201
 
-    # --- Handle new product creation if needed ---
-    if data.get("product_id") == "add_new_product":
-        product_fields = {"name", "total_volume", "current_avail", "dry_refill"}
-        product_data = {k: v for k, v in data.items() if k in product_fields}
-        from app import app as flask_app
-        with flask_app.test_request_context():
-            with flask_app.test_client() as client:
-                resp = client.post("/web/fn/ops/new/products", json=product_data)
-                prod_resp = resp.get_json()
-                if not prod_resp or not prod_resp.get("success") or not prod_resp.get("id"):
-                    return jsonify({"success": False, "error": "Failed to create new product"}), 400
-                data["product_id"] = prod_resp["id"]
-
-    if not data.get("product_id"):
-        return jsonify({"success": False, "error": "Product ID is required"}), 400
-
-    if "schedule_time" in data:
-        data["_time"] = data["schedule_time"]
-        data.pop("schedule_time", None)
-
-    # Always set tank_id in the data dict for downstream API calls
-    # data["tank_id"] = tank_id
-
-    from app import app as flask_app
-    with flask_app.test_request_context():
-        with flask_app.test_client() as client:
-            
-            if form_type == "recurring":
-                # Validation for recurring
-                required_fields = ["amount", "product_id", "trigger_interval", "_time"]
-                missing = [field for field in required_fields if not data.get(field)]
-                if missing:
-                    return jsonify({
-                        "success": False,
-                        "error": f"Missing required fields for recurring: {', '.join(missing)}"
-                    }), 400
-                # Insert only into d_schedule (not dosing)
-                schedule_data = {
-                    "amount": data["amount"],
-                    "product_id": data["product_id"],
-                    "trigger_interval": data["trigger_interval"],
-                    "suspended": data.get("suspended", False),
-                    "tank_id": tank_id,
-                }
-                sched_resp = client.post("/web/fn/ops/new/d_schedule", json=schedule_data)
-                return sched_resp.get_data(), sched_resp.status_code, sched_resp.headers.items()
-            elif form_type in ("single", "intermittent"):
-                required_fields = ["amount", "product_id", "_time"]
-                missing = [field for field in required_fields if not data.get(field)]
-                if missing:
-                    return jsonify({
-                        "success": False,
-                        "error": f"Missing required fields for {form_type}: {', '.join(missing)}"
-                    }), 400
-                api_url = "/web/fn/ops/new/dosing"
-                dosing_data = {
-                    "amount": data["amount"],
-                    "product_id": data["product_id"],
-                    "trigger_time": data["_time"],
-                }
-                resp = client.post(api_url, json=dosing_data)
-                return resp.get_data(), resp.status_code, resp.headers.items()
-            else:
-                return jsonify({"success": False, "error": "Unknown form_type"}), 400
-            
 
 @app.route("/doser/products", methods=["GET"])
 def get_products():
@@ -9,6 +9,7 @@ from .tests import bp as tests_web
 from .taxonomy import bp as taxonomy_web
 from .corals import bp as corals_web
 from .models import bp as alk_W
+from .media import bp as media_web
 
 web_fn = Blueprint('web_fn', __name__, url_prefix='/web/fn')
 
@@ -22,4 +23,5 @@ web_fn.register_blueprint(tests_web)
 web_fn.register_blueprint(taxonomy_web)
 web_fn.register_blueprint(corals_web)
 web_fn.register_blueprint(alk_W)
+web_fn.register_blueprint(media_web)
 
@@ -3,11 +3,13 @@ from app import db
 from modules.models import db as models_db
 from modules.utils.helper import datatables_response, advanced_join_query
 from modules.utils.table_map import TABLE_MAP
+from modules.db_routing import replica_reads
 import json
 
 bp = Blueprint('advanced_join_api', __name__)
 
 @bp.route('/get/advanced_join', methods=['GET'])
+@replica_reads
 def api_advanced_join():
     """
     Example usage:
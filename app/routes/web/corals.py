@@ -1,41 +1,89 @@
-from flask import Blueprint, jsonify, current_app
+from flask import Blueprint, jsonify, current_app, request, url_for
 from app import db
-from modules.models import Coral, Tank, Taxonomy
+from modules.models import Coral, Tank, Taxonomy, ColorMorphs, Vendors
+from modules.tank_context import get_current_tank_id
+from modules import media
+from modules.db_routing import replica_reads
 from datetime import datetime
+import base64
+import binascii
+import json
 import pytz
 
 bp = Blueprint('coral_api', __name__, url_prefix='/corals')
 
+STATS_PER_PAGE = 100
+STATS_MAX_PER_PAGE = 500
+
+
 @bp.route('/stats', methods=['GET'])
+@replica_reads
 def get_coral_stats():
-    # Optionally join with Tank and Taxonomy for more info
-    corals = db.session.query(Coral, Tank, Taxonomy).\
-        outerjoin(Tank, Coral.tank_id == Tank.id).\
-        outerjoin(Taxonomy, Coral.taxonomy_id == Taxonomy.id).all()
+    """
+    Coral cards for the current tank, one page at a time.
+
+    Example usage:
+    /web/fn/corals/stats?page=2&per_page=50
+    /web/fn/corals/stats?tank_id=3
+
+    The body stays a plain list for the cards macro; paging info is in the
+    X-Total-Count / X-Page / X-Per-Page headers.
+    """
+    tank_id = request.args.get('tank_id', type=int) or get_current_tank_id()
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', STATS_PER_PAGE, type=int), 1), STATS_MAX_PER_PAGE)
+    if not tank_id:
+        # Stats are per tank; never fall back to scanning every tank's corals
+        response = jsonify([])
+        response.headers['X-Total-Count'] = '0'
+        response.headers['X-Page'] = str(page)
+        response.headers['X-Per-Page'] = str(per_page)
+        return response
+
+    # Everything the cards show comes from one joined query; the window count
+    # gives the total without a second round trip.
+    query = (
+        db.session.query(
+            Coral,
+            Tank.name,
+            Taxonomy.species,
+            Taxonomy.common_name,
+            ColorMorphs.morph_name,
+            db.func.count().over().label('total'),
+        )
+        .outerjoin(Tank, Coral.tank_id == Tank.id)
+        .outerjoin(Taxonomy, Coral.taxonomy_id == Taxonomy.id)
+        .outerjoin(ColorMorphs, Coral.color_morphs_id == ColorMorphs.id)
+        .filter(Coral.tank_id == tank_id)
+    )
+    rows = query.order_by(Coral.id).limit(per_page).offset((page - 1) * per_page).all()
+    total = rows[0].total if rows else 0
+    if not rows and page > 1:
+        total = query.with_entities(db.func.count(Coral.id)).order_by(None).scalar()
 
     tzname = current_app.config.get('TIMEZONE', 'UTC')
     tz = pytz.timezone(tzname)
     stats = []
 
-    for coral, tank, taxonomy in corals:
+    for coral, tank_name, species, common_name, morph_name, _ in rows:
         stat = {}
         stat['card_title'] = ['Coral Name', coral.coral_name, coral.id]
         # stat['coral_type'] = ['Type', coral.coral_type, '']
-        stat['species'] = ['Species', taxonomy.species if taxonomy else '', '']
-        stat['common_name'] = ['Common Name', taxonomy.common_name if taxonomy else '', '']
+        stat['species'] = ['Species', species or '', '']
+        stat['common_name'] = ['Common Name', common_name or '', '']
         stat['date_acquired'] = [
             'Date Acquired',
             coral.date_acquired.strftime('%b %d %Y') if coral.date_acquired else None,
             ''
         ]
-        stat['tank'] = ['Tank', tank.name if tank else '', '']
+        stat['tank'] = ['Tank', tank_name or '', '']
         # stat['lighting'] = ['Lighting', coral.lighting, '']
         stat['par'] = ['PAR', coral.par, '']
         stat['flow'] = ['Flow', coral.flow, '']
         # stat['feeding'] = ['Feeding', coral.feeding, '']
         stat['placement'] = ['Placement', coral.placement, '']
         stat['current_size'] = ['Current Size', coral.current_size, '']
-        stat['color_morph'] = ['Color Morph', coral.color_morph.morph_name, '']
+        stat['color_morph'] = ['Color Morph', morph_name or '', '']
         stat['health_status'] = ['Health Status', coral.health_status, '']
         stat['frag_colony'] = ['Frag/Colony', coral.frag_colony, '']
         # stat['growth_rate'] = ['Growth Rate', coral.growth_rate, '']
@@ -58,7 +106,150 @@ def get_coral_stats():
             ''
         ]
         stats.append(stat)
-    return jsonify(stats)
+    response = jsonify(stats)
+    response.headers['X-Total-Count'] = str(total)
+    response.headers['X-Page'] = str(page)
+    response.headers['X-Per-Page'] = str(per_page)
+    return response
+
+GALLERY_LIMIT = 48
+GALLERY_MAX_LIMIT = 200
+# query arg -> column; enum columns are validated against their allowed values
+GALLERY_FILTERS = {
+    'health_status': Coral.health_status,
+    'placement': Coral.placement,
+    'flow': Coral.flow,
+    'type': Taxonomy.type,
+}
+
+
+def _encode_cursor(last_id):
+    return base64.urlsafe_b64encode(json.dumps({'id': last_id}).encode()).decode().rstrip('=')
+
+
+def _decode_cursor(cursor):
+    padded = cursor + '=' * (-len(cursor) % 4)
+    return int(json.loads(base64.urlsafe_b64decode(padded))['id'])
+
+
+def coral_photo_urls(photo):
+    """(photo_url, thumbnail_url) for a stored coral photo, or (None, None)."""
+    if not photo:
+        return None, None
+    digest = photo.split('.', 1)[0]
+    if media.DIGEST_RE.match(digest):
+        return media.rendition_url(digest, media.RENDITION_WIDTHS[-1], 'jpg'), media.rendition_url(digest, media.RENDITION_WIDTHS[0], 'webp')
+    # Legacy rows store a bare filename
+    url = url_for('static', filename=f"temp/{photo}")
+    return url, url
+
+
+@bp.route('/gallery', methods=['GET'])
+@replica_reads
+def get_coral_gallery():
+    """
+    Cursor-paged coral cards for the gallery, newest first.
+
+    Example usage:
+    /web/fn/corals/gallery?limit=48
+    /web/fn/corals/gallery?health_status=Healthy&type=SPS&vendor=3&cursor=eyJpZCI6IDEyMH0
+
+    Filters run in SQL against the (tank_id, <filter>, id) indexes and paging is
+    keyset-based (id < cursor), so deep pages cost the same as the first one.
+    """
+    tank_id = request.args.get('tank_id', type=int) or get_current_tank_id()
+    if not tank_id:
+        return jsonify({'error': 'No tank_id provided or set in session'}), 400
+    limit = min(max(request.args.get('limit', GALLERY_LIMIT, type=int), 1), GALLERY_MAX_LIMIT)
+
+    query = (
+        db.session.query(
+            Coral.id, Coral.coral_name, Coral.date_acquired, Coral.health_status, Coral.placement,
+            Coral.flow, Coral.current_size, Coral.photo,
+            Taxonomy.genus, Taxonomy.species, Taxonomy.common_name, Taxonomy.type,
+            ColorMorphs.morph_name, Vendors.name,
+        )
+        .outerjoin(Taxonomy, Coral.taxonomy_id == Taxonomy.id)
+        .outerjoin(ColorMorphs, Coral.color_morphs_id == ColorMorphs.id)
+        .outerjoin(Vendors, Coral.vendors_id == Vendors.id)
+        .filter(Coral.tank_id == tank_id)
+    )
+    for arg, column in GALLERY_FILTERS.items():
+        value = request.args.get(arg)
+        if not value:
+            continue
+        if value not in column.type.enums:
+            return jsonify({'error': f"Invalid {arg} '{value}', expected one of {column.type.enums}"}), 400
+        query = query.filter(column == value)
+    vendor = request.args.get('vendor')
+    if vendor:
+        try:
+            query = query.filter(Coral.vendors_id == int(vendor))
+        except ValueError:
+            return jsonify({'error': f"Invalid vendor '{vendor}', expected a vendor id"}), 400
+
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            query = query.filter(Coral.id < _decode_cursor(cursor))
+        except (ValueError, KeyError, TypeError, binascii.Error):
+            return jsonify({'error': 'Invalid cursor'}), 400
+
+    # One extra row tells us whether there is a next page without counting
+    rows = query.order_by(Coral.id.desc()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    cards = []
+    for (coral_id, name, acquired, health, placement, flow, size, photo,
+         genus, species, common_name, type_, morph, vendor_name) in rows:
+        photo_url, thumbnail_url = coral_photo_urls(photo)
+        cards.append({
+            'id': coral_id,
+            'name': name,
+            'date_acquired': acquired.strftime('%Y-%m-%d') if acquired else None,
+            'health_status': health,
+            'placement': placement,
+            'flow': flow,
+            'current_size': size,
+            'genus': genus,
+            'species': species,
+            'common_name': common_name,
+            'type': type_,
+            'color_morph': morph,
+            'vendor': vendor_name,
+            'photo_url': photo_url,
+            'thumbnail_url': thumbnail_url,
+        })
+    return jsonify({
+        'cards': cards,
+        'next_cursor': _encode_cursor(rows[-1][0]) if has_more else None,
+        'limit': limit,
+    })
+
+@bp.route('/<int:coral_id>/similar', methods=['GET'])
+@replica_reads
+def get_similar_corals(coral_id):
+    """
+    Corals whose photos look like this coral's photo (possible duplicates or the same colony).
+
+    Example usage:
+    /web/fn/corals/12/similar?max_distance=10
+    """
+    from app.routes.web.media import similar_payload
+    from modules.photo_similarity import DEFAULT_MAX_DISTANCE
+    coral = db.session.get(Coral, coral_id)
+    if coral is None:
+        return jsonify({'error': f"Coral {coral_id} not found"}), 404
+    digest = (coral.photo or '').split('.', 1)[0]
+    if not media.DIGEST_RE.match(digest):
+        return jsonify({'error': 'Coral has no stored photo'}), 404
+    max_distance = min(max(request.args.get('max_distance', DEFAULT_MAX_DISTANCE, type=int), 0), 32)
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+    payload = similar_payload(digest, max_distance, limit)
+    if payload is None:
+        return jsonify({'error': 'Photo has not been hashed yet'}), 404
+    return jsonify(payload)
 
 @bp.route('/vendors/all', methods=['GET'])
 def get_all_vendors():
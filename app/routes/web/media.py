@@ -0,0 +1,69 @@
+from flask import Blueprint, jsonify, request, send_file
+from app import db
+from modules import media
+from modules.models import Coral
+from modules.photo_similarity import similar_photos, DEFAULT_MAX_DISTANCE
+
+bp = Blueprint('media_web', __name__, url_prefix='/media')
+
+# Rendition bytes never change for a given digest/width/format
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+@bp.route('/<digest>/<int:width>.<fmt>', methods=['GET'])
+def get_rendition(digest, width, fmt):
+    if not media.DIGEST_RE.match(digest) or width not in media.RENDITION_WIDTHS or fmt not in media.RENDITION_FORMATS:
+        return jsonify({'error': 'Unknown rendition'}), 404
+    path = media.ensure_rendition(digest, width, fmt)
+    if path is None:
+        return jsonify({'error': 'Image not found'}), 404
+    response = send_file(
+        path,
+        mimetype=media.RENDITION_FORMATS[fmt][1],
+        max_age=IMMUTABLE_MAX_AGE,
+        etag=f"{digest}-{width}-{fmt}",
+        conditional=True,
+    )
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+def similar_payload(digest, max_distance, limit):
+    """Similar photos with their thumbnails and the corals that use them, or None if the photo is unhashed."""
+    matches = similar_photos(digest, max_distance=max_distance, limit=limit)
+    if matches is None:
+        return None
+    digests = [d for _, d in matches]
+    corals = {}
+    if digests:
+        rows = db.session.query(Coral.id, Coral.coral_name, Coral.tank_id, Coral.photo).filter(Coral.photo.in_(digests)).all()
+        for coral_id, name, tank_id, photo in rows:
+            corals.setdefault(photo, []).append({'id': coral_id, 'name': name, 'tank_id': tank_id})
+    return [
+        {
+            'digest': d,
+            'distance': distance,
+            'thumbnail': media.rendition_url(d, media.RENDITION_WIDTHS[0], 'webp'),
+            'corals': corals.get(d, []),
+        }
+        for distance, d in matches
+    ]
+
+
+@bp.route('/<digest>/similar', methods=['GET'])
+def get_similar_photos(digest):
+    """
+    Photos whose perceptual hash is within max_distance bits of this one.
+
+    Example usage:
+    /web/fn/media/<sha256>/similar?max_distance=8&limit=10
+    """
+    if not media.DIGEST_RE.match(digest):
+        return jsonify({'error': 'Unknown photo'}), 404
+    max_distance = min(max(request.args.get('max_distance', DEFAULT_MAX_DISTANCE, type=int), 0), 32)
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+    payload = similar_payload(digest, max_distance, limit)
+    if payload is None:
+        return jsonify({'error': 'Photo has not been hashed yet'}), 404
+    return jsonify(payload)
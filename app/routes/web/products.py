@@ -5,10 +5,12 @@ from sqlalchemy import text
 import pytz
 
 from modules.tank_context import get_current_tank_id
+from modules.db_routing import replica_reads
 
 bp = Blueprint('product_api', __name__, url_prefix='/products')
 
 @bp.route('/stats', methods=['GET'])
+@replica_reads
 def get_product_stats():
 
     sql = """
@@ -4,12 +4,14 @@ from app import db
 from modules.models import DSchedule, Products, Dosing
 from modules.tank_context import get_current_tank_id
 from modules.utils.helper import datatables_response
+from modules.db_routing import replica_reads
 from sqlalchemy import text
 import pytz
 
 bp = Blueprint('schedule_api', __name__, url_prefix='/schedule')
 
 @bp.route('/get/all', methods=['GET'])
+@replica_reads
 def get_sched():
     tank_id = get_current_tank_id()
     if tank_id is None:
@@ -111,6 +113,7 @@ def get_doses_for_schedule(schedule_id):
 
 
 @bp.route('/get/stats', methods=['GET'])
+@replica_reads
 def get_schedule_stats():
     tank_id = get_current_tank_id()
     
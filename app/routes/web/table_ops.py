@@ -1,17 +1,39 @@
 from flask import Blueprint, jsonify, request
 from app import db
 import modules
+from modules import rollups
 from modules.models import db as models_db
 from modules.utils.helper import datatables_response, validate_and_process_data
 from modules.db_functions import create_row
 from modules.utils.table_map import TABLE_MAP
-from modules.tank_context import get_current_tank_id
+from modules.tank_context import get_current_tank_id, tank_catalogue
+from modules.taxonomy_tree import taxonomy_tree
+from modules.taxonomy_suggest import suggest_index
+from modules.db_routing import replica_reads
+from modules.services.dosing import ServiceError, create_dose, create_product, create_schedule, unit_of_work
 import enum
 from datetime import date, time
 
 bp = Blueprint('table_ops_api', __name__, url_prefix='/ops')
 
+# /new/<table> for these tables goes through the dosing service layer
+DOSING_SERVICES = {
+    'products': create_product,
+    'd_schedule': lambda data: create_schedule(data.get('tank_id') or get_current_tank_id(), data),
+    'dosing': lambda data: create_dose(data.get('tank_id') or get_current_tank_id(), data),
+}
+
+
+def _invalidate_caches(table_name, row_id=None):
+    # Drop (or patch) in-process caches built from tables that were just written
+    if table_name == 'tanks':
+        tank_catalogue.invalidate()
+    elif table_name in ('taxonomy', 'color_morphs'):
+        taxonomy_tree.invalidate()
+        suggest_index.refresh(table_name, row_id)
+
 @bp.route('/get/<table_name>', methods=['GET'])
+@replica_reads
 def get_table_data(table_name):
     try:
         if table_name not in TABLE_MAP:
@@ -66,6 +88,7 @@ def get_table_data(table_name):
 
 
 @bp.route('/get/raw/<table_name>', methods=['GET'])
+@replica_reads
 def get_raw_data(table_name):
     try:
         # Check if the table name exists in the mapping
@@ -117,10 +140,15 @@ def edit_table(table_name):
         if table_name == 'corals':
             if 'prod_id' in data:
                 data['product_id'] = data.pop('prod_id')
+        days = rollups.affected_days(row)
         for key, value in data.items():
             if key != "id" and hasattr(row, key):
                 setattr(row, key, value)
+        db.session.flush()
+        # Recompute the days the row moved out of and into
+        rollups.refresh_days(days + rollups.affected_days(row))
         db.session.commit()
+        _invalidate_caches(table_name, row.id)
         return jsonify({'success': True, 'message': 'Record updated successfully'}), 201
 
     except Exception as e:
@@ -134,7 +162,17 @@ def add_new_record(table_name):
     # Get the table model
     table = TABLE_MAP[table_name]
     data = request.get_json()
-    print('insert into model', table, data)
+
+    if table_name in DOSING_SERVICES:
+        # Same domain operations /doser/submit uses; validation, duplicate checks and rollups live there
+        try:
+            with unit_of_work():
+                new_row = DOSING_SERVICES[table_name](data)
+        except ServiceError as e:
+            return jsonify({'error': e.message}), e.status
+        except Exception as e:
+            return jsonify({'error': f"Failed to add record: {str(e)}"}), 500
+        return jsonify({'success': True, 'id': new_row.id, 'message': 'Record added successfully'}), 201
 
     data = validate_and_process_data(table, data)
     # Fix for legacy/prod_id -> product_id mapping
@@ -142,16 +180,6 @@ def add_new_record(table_name):
         if 'prod_id' in data:
             data['product_id'] = data.pop('prod_id')
     
-    # Prevent duplicate d_schedule for same tank_id and product_id
-    if table_name == 'd_schedule':
-        product_id = data.get('product_id')
-        tank_id = data.get('tank_id')
-       
-        if product_id and tank_id:
-            exists = table.query.filter_by(product_id=product_id, tank_id=tank_id).first()
-            if exists:
-                return jsonify({'error': 'A schedule already exists for this tank and product.'}), 400
-
     # If the cleaned data only has a product id, throw a form error
     if list(data.keys()) == ["prod_id"]:
         return jsonify({'error': 'Form data missing: only product id provided.'}), 400
@@ -159,6 +187,7 @@ def add_new_record(table_name):
     try:
         new_row = create_row(table, data)
         db.session.commit()
+        _invalidate_caches(table_name, new_row.id)
         return jsonify({'success': True, 'id': new_row.id, 'message': 'Record added successfully'}), 201
     except Exception as e:
         return jsonify({'error': f"Failed to add record: {str(e)}"}), 500
@@ -186,14 +215,19 @@ def delete_record(table_name):
             return jsonify({"error": f"Record with ID {row_id} not found in '{table_name}'."}), 404
 
         # Delete the record
+        days = rollups.affected_days(row)
         db.session.delete(row)
+        db.session.flush()
+        rollups.refresh_days(days)
         db.session.commit()
+        _invalidate_caches(table_name, row_id)
 
         return jsonify({'success': True, 'message': 'Record deleted successfully'}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @bp.route('/datatable/<table_name>', methods=['GET'])
+@replica_reads
 def datatable_fallback(table_name):
     """
     Fallback route to always return a DataTables-compatible response for /web/fn/datatable/<table_name>.
@@ -251,6 +285,7 @@ def datatable_fallback(table_name):
 
 # Fallback route for DataTables: always returns a DataTables-compatible response
 @bp.route('/get/<table_name>/datatable', methods=['GET'])
+@replica_reads
 def get_table_data_datatable(table_name):
     try:
         if table_name not in TABLE_MAP:
@@ -1,27 +1,37 @@
-import os
-from flask import Blueprint, request, jsonify, current_app
-from werkzeug.utils import secure_filename
+from flask import Blueprint, request, jsonify
+from modules import media
 
 bp = Blueprint('timeline_api', __name__)
 
-UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'user', 'upload')
-ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'bmp', 'webp'}
+ALLOWED_EXTENSIONS = media.IMAGE_EXTENSIONS
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 @bp.route('/timeline/upload', methods=['POST'])
 def timeline_upload():
+    """
+    Stream an uploaded photo into the content-addressed store and queue its
+    thumbnails. Re-uploading the same bytes returns the existing hash with
+    duplicate=true.
+    The response carries rendition URLs usable right away; a request that
+    arrives before the render finishes waits for it.
+    """
     if 'file' not in request.files:
         return jsonify({'success': False, 'error': 'No file part'}), 400
     file = request.files['file']
     if file.filename == '':
         return jsonify({'success': False, 'error': 'No selected file'}), 400
-    if file and allowed_file(file.filename):
-        filename = secure_filename(file.filename)
-        os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-        file_path = os.path.join(UPLOAD_FOLDER, filename)
-        file.save(file_path)
-        return jsonify({'success': True, 'filename': filename}), 200
-    else:
-        return jsonify({'success': False, 'error': 'Invalid file type'}), 400
\ No newline at end of file
+    if not allowed_file(file.filename):
+        return jsonify({'success': False, 'error': 'Invalid file type'}), 400
+    try:
+        digest, duplicate = media.save_upload(file)
+    except media.InvalidImage as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    return jsonify({
+        'success': True,
+        'filename': digest,
+        'hash': digest,
+        'duplicate': duplicate,
+        'renditions': media.rendition_urls(digest),
+    }), 200
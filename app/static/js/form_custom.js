@@ -86,12 +86,43 @@ document.addEventListener('DOMContentLoaded', function() {
 
     // Cache all genus data for filtering
     let allGenus = [];
+    // genus -> {species: [...], color_morphs: [...]}, filled from the bootstrap payload
+    let genusDetails = {};
 
-    // Fetch all genus with type info
-    fetch('/web/fn/taxonomy/genus/all')
+    // Fetch the whole picker dataset (genera, species, morphs) in one request.
+    // Rows come as arrays; column names are listed once in data.fields.
+    const taxonomyReady = fetch('/web/fn/taxonomy/bootstrap')
         .then(response => response.json())
         .then(data => {
-            allGenus = Array.isArray(data) ? data : [];
+            const col = (name, field) => data.fields[name].indexOf(field);
+            allGenus = (data.genera || []).map(row => ({
+                genus: row[col('genera', 'genus')],
+                type: row[col('genera', 'type')],
+                id: row[col('genera', 'id')],
+            }));
+            genusDetails = {};
+            const speciesGenus = {};
+            (data.species || []).forEach(row => {
+                const genus = row[col('species', 'genus')];
+                const entry = genusDetails[genus] || (genusDetails[genus] = {species: [], color_morphs: []});
+                const id = row[col('species', 'id')];
+                speciesGenus[id] = genus;
+                entry.species.push({
+                    id: id,
+                    species: row[col('species', 'species')],
+                    common_name: row[col('species', 'common_name')],
+                });
+            });
+            (data.morphs || []).forEach(row => {
+                const taxonomyId = row[col('morphs', 'taxonomy_id')];
+                const entry = genusDetails[speciesGenus[taxonomyId]];
+                if (!entry) return;
+                entry.color_morphs.push({
+                    id: row[col('morphs', 'id')],
+                    name: row[col('morphs', 'name')],
+                    taxonomy_id: taxonomyId,
+                });
+            });
             // Do NOT call populateGenus() here!
             // Only call it after a type is selected
         });
@@ -211,10 +242,9 @@ document.addEventListener('DOMContentLoaded', function() {
                 return;
             }
 
-            // Combined request for both species and color morphs
-  
-            fetch(`/web/fn/taxonomy/genus/details/${encodeURIComponent(genus)}`)
-                .then(response => response.json())
+            // Species and color morphs come from the bootstrap payload; no request per genus
+            taxonomyReady
+                .then(() => genusDetails[genus] || {species: [], color_morphs: []})
                 .then(data => {
                     // console.log('Genus details:', data);
                     // Save all species and color morphs for later filtering
@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+Replay a realistic traffic mix against a running instance and report latency percentiles.
+
+Virtual users (asyncio + httpx, no external services) pick requests from a
+weighted mix: DataTables paging, stats cards, taxonomy pickers and
+controller dose posts. Each user waits for its response before sending the
+next one (closed loop), or, with --rate, requests are started on a fixed
+schedule regardless of how fast the server answers (open loop), which is
+what exposes queueing when workers or pool connections run out.
+
+Per scenario it reports requests, errors, throughput and p50/p95/p99/max
+latency, followed by the pool occupancy of the worker that answered
+/api/v1/db/pool at the end.
+
+--spawn starts a local gunicorn (gunicorn.conf.py, gevent workers by
+default) for the duration of the run, so worker counts and pool sizes can be
+compared back to back:
+
+Example usage:
+    python bin/load_test.py --url http://127.0.0.1:5000 --users 50 --duration 60
+    python bin/load_test.py --spawn --workers 2 --pool-size 5 --users 100 --duration 30
+    python bin/load_test.py --spawn --rate 200 --weight dose=0 --json > run.json
+    python bin/load_test.py --list
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SUGGEST_PREFIXES = ('ac', 'acro', 'mon', 'por', 'zo', 'eu', 'ph', 'sty', 'go', 'ca')
+
+
+def _datatable(table, sidx):
+    def build(user):
+        return 'GET', (f"/web/fn/ops/get/{table}/datatable?draw={user.next_draw()}"
+                       f"&page={user.rng.randint(1, 20)}&rows=25&sidx={sidx}&sord=desc"), None
+    return build
+
+
+def _static(path):
+    return lambda user: ('GET', path, None)
+
+
+def _suggest(user):
+    return 'GET', f"/web/fn/taxonomy/suggest?q={user.rng.choice(SUGGEST_PREFIXES)}&limit=10", None
+
+
+def _species(user):
+    genus = user.rng.choice(user.context['genera']) if user.context['genera'] else ''
+    return 'GET', f"/web/fn/taxonomy/species/by_genus?genus={genus}", None
+
+
+def _dose(user):
+    if not user.context['schedules']:
+        return None
+    return 'POST', '/api/v1/controller/dose', {
+        'schedule_id': user.rng.choice(user.context['schedules']), 'tank_id': user.context['tank_id'],
+    }
+
+
+# name -> (default weight, request builder); weights roughly follow the page views in production
+SCENARIOS = {
+    'tests_datatable': (25, _datatable('test_results', 'test_date')),
+    'dosing_datatable': (10, _datatable('dosing', 'trigger_time')),
+    'corals_datatable': (10, _datatable('corals', 'coral_name')),
+    'coral_stats': (10, _static('/web/fn/corals/stats')),
+    'schedule_stats': (10, _static('/web/fn/schedule/get/stats')),
+    'product_stats': (5, _static('/web/fn/products/stats')),
+    'taxonomy_genus': (5, _static('/web/fn/taxonomy/genus/all')),
+    'taxonomy_species': (5, _species),
+    'taxonomy_suggest': (15, _suggest),
+    'dose': (5, _dose),
+}
+
+
+class User:
+    def __init__(self, rng, context):
+        self.rng = rng
+        self.context = context
+        self._draw = 0
+
+    def next_draw(self):
+        self._draw += 1
+        return self._draw
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.recording = False
+
+    def add(self, name, seconds, status):
+        if not self.recording:
+            return
+        self.latencies[name].append(seconds)
+        self.statuses[name][status] += 1
+        if status == 'error' or status >= 400:
+            self.errors[name] += 1
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * pct // 100))  # ceil
+    return sorted_values[int(rank) - 1]
+
+
+def summarize(recorder, elapsed):
+    rows = {}
+    for name in sorted(recorder.latencies, key=lambda n: -len(recorder.latencies[n])):
+        values = sorted(recorder.latencies[name])
+        rows[name] = {
+            'requests': len(values),
+            'errors': recorder.errors[name],
+            'rps': round(len(values) / elapsed, 2),
+            'p50_ms': round(percentile(values, 50) * 1000, 2),
+            'p95_ms': round(percentile(values, 95) * 1000, 2),
+            'p99_ms': round(percentile(values, 99) * 1000, 2),
+            'max_ms': round(values[-1] * 1000, 2),
+            'status': {str(k): v for k, v in recorder.statuses[name].items()},
+        }
+    everything = sorted(v for values in recorder.latencies.values() for v in values)
+    total = {
+        'requests': len(everything),
+        'errors': sum(recorder.errors.values()),
+        'rps': round(len(everything) / elapsed, 2) if elapsed else 0,
+    }
+    if everything:
+        total.update({f"p{p}_ms": round(percentile(everything, p) * 1000, 2) for p in (50, 95, 99)})
+    return rows, total
+
+
+async def send(client, recorder, name, build, user):
+    request = build(user)
+    if request is None:
+        return
+    method, path, body = request
+    started = time.perf_counter()
+    try:
+        resp = await client.request(method, path, json=body)
+        await resp.aread()
+        status = resp.status_code
+    except httpx.HTTPError:
+        status = 'error'
+    recorder.add(name, time.perf_counter() - started, status)
+
+
+async def closed_loop_user(client, recorder, mix, user, stop_at):
+    names, builders, weights = mix
+    while time.perf_counter() < stop_at:
+        i = user.rng.choices(range(len(names)), weights)[0]
+        await send(client, recorder, names[i], builders[i], user)
+
+
+async def open_loop(client, recorder, mix, users, rate, stop_at):
+    names, builders, weights = mix
+    interval = 1.0 / rate
+    next_at = time.perf_counter()
+    pending = set()
+    k = 0
+    while next_at < stop_at:
+        await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+        user = users[k % len(users)]
+        i = user.rng.choices(range(len(names)), weights)[0]
+        task = asyncio.ensure_future(send(client, recorder, names[i], builders[i], user))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+        next_at += interval
+        k += 1
+    if pending:
+        await asyncio.wait(pending)
+
+
+async def discover(client, tank_id):
+    """Select the tank (session cookie) and collect ids the scenarios need."""
+    resp = await client.post('/set_tank', data={'tank_id': tank_id})
+    if resp.status_code >= 400:
+        sys.exit(f"POST /set_tank -> {resp.status_code}")
+    schedules = await client.get('/web/fn/schedule/get/all?rows=1000')
+    genera = await client.get('/web/fn/taxonomy/genus/all')
+    return {
+        'tank_id': tank_id,
+        'schedules': [s['id'] for s in schedules.json().get('data', [])] if schedules.status_code == 200 else [],
+        'genera': [g['genus'] for g in genera.json()] if genera.status_code == 200 else [],
+    }
+
+
+async def run(args, mix):
+    limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+    timeout = httpx.Timeout(args.timeout)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=timeout) as client:
+        context = await discover(client, args.tank_id)
+        rng = random.Random(args.seed)
+        users = [User(random.Random(rng.random()), context) for _ in range(args.users)]
+        recorder = Recorder()
+
+        started = time.perf_counter()
+        stop_at = started + args.warmup + args.duration
+
+        async def start_recording():
+            await asyncio.sleep(args.warmup)
+            recorder.recording = True
+
+        flag = asyncio.ensure_future(start_recording())
+        if args.rate:
+            await open_loop(client, recorder, mix, users, args.rate, stop_at)
+        else:
+            await asyncio.gather(*(closed_loop_user(client, recorder, mix, u, stop_at) for u in users))
+        await flag
+        elapsed = time.perf_counter() - started - args.warmup
+
+        pool = None
+        try:
+            resp = await client.get('/api/v1/db/pool')
+            pool = resp.json() if resp.status_code == 200 else None
+        except (httpx.HTTPError, ValueError):
+            pass
+    return recorder, elapsed, context, pool
+
+
+def spawn_gunicorn(args):
+    env = dict(os.environ)
+    env.update({
+        'GUNICORN_BIND': args.url.split('://', 1)[-1],
+        'GUNICORN_WORKERS': str(args.workers),
+        'GUNICORN_WORKER_CLASS': args.worker_class,
+    })
+    if args.pool_size is not None:
+        env['DB_POOL_SIZE'] = str(args.pool_size)
+    if args.max_overflow is not None:
+        env['DB_MAX_OVERFLOW'] = str(args.max_overflow)
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL if not args.verbose else None,
+        start_new_session=True,
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            sys.exit(f"gunicorn exited with {proc.returncode} (run with --verbose to see its log)")
+        try:
+            if httpx.get(args.url + '/api/v1/db/pool', timeout=1).status_code < 500:
+                return proc
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    stop_gunicorn(proc)
+    sys.exit("gunicorn did not become ready within 60 s")
+
+
+def stop_gunicorn(proc):
+    try:
+        os.killpg(proc.pid, signal.SIGTERM)
+        proc.wait(timeout=30)
+    except (ProcessLookupError, subprocess.TimeoutExpired):
+        os.killpg(proc.pid, signal.SIGKILL)
+
+
+def build_mix(weight_args):
+    weights = {name: weight for name, (weight, _) in SCENARIOS.items()}
+    for item in weight_args or ():
+        name, _, value = item.partition('=')
+        if name not in SCENARIOS or not value:
+            sys.exit(f"--weight expects name=N with name in: {', '.join(SCENARIOS)}")
+        weights[name] = float(value)
+    names = [n for n in SCENARIOS if weights[n] > 0]
+    if not names:
+        sys.exit("All scenario weights are zero")
+    return names, [SCENARIOS[n][1] for n in names], [weights[n] for n in names]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--users', type=int, default=20, help='concurrent virtual users / max connections')
+    parser.add_argument('--duration', type=float, default=30, help='measured seconds')
+    parser.add_argument('--warmup', type=float, default=5, help='seconds of traffic before measuring')
+    parser.add_argument('--rate', type=float, help='open loop: start this many requests per second')
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--tank-id', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--weight', action='append', metavar='NAME=N', help='change one scenario weight (0 disables)')
+    parser.add_argument('--list', action='store_true', help='list scenarios and default weights')
+    parser.add_argument('--json', action='store_true', help='print a JSON report')
+    spawn = parser.add_argument_group('local server (--spawn)')
+    spawn.add_argument('--spawn', action='store_true', help='start gunicorn with gunicorn.conf.py for the run')
+    spawn.add_argument('--workers', type=int, default=2)
+    spawn.add_argument('--worker-class', default='gevent')
+    spawn.add_argument('--pool-size', type=int, help='DB_POOL_SIZE for the spawned workers')
+    spawn.add_argument('--max-overflow', type=int, help='DB_MAX_OVERFLOW for the spawned workers')
+    spawn.add_argument('--verbose', action='store_true', help="show gunicorn's log")
+    args = parser.parse_args()
+
+    if args.list:
+        for name, (weight, _) in SCENARIOS.items():
+            print(f"{name:20} {weight}")
+        return
+
+    mix = build_mix(args.weight)
+    proc = spawn_gunicorn(args) if args.spawn else None
+    try:
+        recorder, elapsed, context, pool = asyncio.run(run(args, mix))
+    finally:
+        if proc is not None:
+            stop_gunicorn(proc)
+
+    rows, total = summarize(recorder, elapsed)
+    report = {
+        'url': args.url,
+        'users': args.users,
+        'rate': args.rate,
+        'duration_seconds': round(elapsed, 2),
+        'server': {'workers': args.workers, 'worker_class': args.worker_class, 'pool_size': args.pool_size,
+                   'max_overflow': args.max_overflow} if args.spawn else None,
+        'total': total,
+        'endpoints': rows,
+        'pool': pool,
+    }
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    mode = f"open loop {args.rate:g} req/s" if args.rate else f"{args.users} users"
+    print(f"{args.url}: {mode}, {elapsed:.1f} s measured, {len(context['schedules'])} schedules, "
+          f"{len(context['genera'])} genera")
+    print(f"  {'scenario':20} {'reqs':>7} {'err':>5} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}")
+    for name, r in rows.items():
+        print(f"  {name:20} {r['requests']:7} {r['errors']:5} {r['rps']:8.1f} {r['p50_ms']:8.1f} "
+              f"{r['p95_ms']:8.1f} {r['p99_ms']:8.1f} {r['max_ms']:8.1f}")
+    if total['requests']:
+        print(f"  {'TOTAL':20} {total['requests']:7} {total['errors']:5} {total['rps']:8.1f} {total['p50_ms']:8.1f} "
+              f"{total['p95_ms']:8.1f} {total['p99_ms']:8.1f}")
+    if pool:
+        print(f"  pool (one worker): {json.dumps(pool)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Measure how long `import app` takes and which modules dominate it.
+
+Runs a fresh interpreter with `python -X importtime` several times and
+reports the median total plus the slowest top-level packages by cumulative
+time. Heavy packages that should stay deferred (numpy, sklearn, ...) are
+flagged if they show up.
+
+Example usage:
+    python bin/startup_bench.py
+    python bin/startup_bench.py --runs 10 --top 15 --json > startup.json
+    python bin/startup_bench.py --max-ms 1500   # exit 1 if slower (CI gate)
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFERRED = ('numpy', 'sklearn', 'scipy', 'pandas', 'pyarrow', 'PIL')
+LINE_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def run_once(target):
+    env = dict(os.environ)
+    # Same defaults as the unit tests: an in-memory database, no MySQL needed
+    env.setdefault('TESTING', 'true')
+    env.setdefault('SQLALCHEMY_DATABASE_URI', 'sqlite:///:memory:')
+    env['PYTHONPATH'] = ROOT + os.pathsep + env.get('PYTHONPATH', '')
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f"import {target}"],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+    if proc.returncode != 0:
+        sys.exit(f"import {target} failed:\n{proc.stderr[-2000:]}")
+    modules = {}
+    for line in proc.stderr.splitlines():
+        m = LINE_RE.match(line)
+        if m:
+            self_us, cumulative_us, indent, name = m.groups()
+            modules[name] = (int(self_us), int(cumulative_us), len(indent))
+    return wall_ms, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--target', default='app', help='module to import (default: app)')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--json', action='store_true', help='print a JSON report')
+    parser.add_argument('--max-ms', type=float, help='fail if the median import time exceeds this')
+    args = parser.parse_args()
+
+    runs = [run_once(args.target) for _ in range(max(1, args.runs))]
+    walls = [w for w, _ in runs]
+    imports = [mods[args.target][1] / 1000 for _, mods in runs if args.target in mods]
+    last = runs[-1][1]
+    # Top-level packages only (indent of one level under the target)
+    top_level = sorted(
+        ((name, cum / 1000) for name, (_, cum, indent) in last.items() if indent <= 3 and name != args.target),
+        key=lambda kv: kv[1], reverse=True,
+    )[:args.top]
+    report = {
+        'target': args.target,
+        'runs': len(runs),
+        'import_ms_median': round(statistics.median(imports), 1) if imports else None,
+        'process_ms_median': round(statistics.median(walls), 1),
+        'modules_imported': len(last),
+        'slowest': [{'module': name, 'cumulative_ms': round(ms, 1)} for name, ms in top_level],
+        'deferred_loaded': [name for name in DEFERRED if name in last],
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"import {args.target}: median {report['import_ms_median']} ms "
+              f"(process {report['process_ms_median']} ms, {report['modules_imported']} modules, {len(runs)} runs)")
+        for row in report['slowest']:
+            print(f"  {row['cumulative_ms']:8.1f} ms  {row['module']}")
+        if report['deferred_loaded']:
+            print(f"WARNING: loaded at startup: {', '.join(report['deferred_loaded'])}")
+
+    if args.max_ms is not None and report['import_ms_median'] is not None and report['import_ms_median'] > args.max_ms:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -29,9 +29,71 @@ class Config(object):
     JQGRID_ROWID_KEY = '_rowid'
     PK_DELIMITER = '---' # must be 3 characters
 
-    GUNICORN_WORKERS = 4  # Number of worker processes
-    GUNICORN_BIND = "0.0.0.0:5000"  # Bind address
-    GUNICORN_WORKER_CLASS = "gevent"  # Use Gevent worker class
+    GUNICORN_WORKERS = int(os.getenv("GUNICORN_WORKERS", 4))  # Number of worker processes
+    GUNICORN_BIND = os.getenv("GUNICORN_BIND", "0.0.0.0:5000")  # Bind address
+    GUNICORN_WORKER_CLASS = os.getenv("GUNICORN_WORKER_CLASS", "gevent")  # Use Gevent worker class
+    # Import the app once in the master so forked workers share its pages (see gunicorn.conf.py)
+    GUNICORN_PRELOAD = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
 
     # Add timezone config
     TIMEZONE = os.getenv("TIMEZONE", SYSTEM_TIMEZONE)
+
+    # Connection pool for the MySQL engine (see modules/db_pool.py); applies per worker process
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))  # connections kept open
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))  # extra connections allowed under load
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 10))  # seconds to wait for a free connection
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))  # reconnect before MySQL's wait_timeout drops us
+    DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"  # test connections on checkout
+
+    # Read replicas for @replica_reads views (see modules/db_routing.py); comma-separated URLs
+    DB_REPLICA_URIS = os.getenv("DB_REPLICA_URIS", "")
+    REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", 5))  # primary-only window after a write
+    REPLICA_CHECK_SECONDS = float(os.getenv("REPLICA_CHECK_SECONDS", 30))  # re-check a healthy replica this often
+    REPLICA_RETRY_SECONDS = float(os.getenv("REPLICA_RETRY_SECONDS", 30))  # skip a failed replica this long
+
+    # asyncio engine for async views (see modules/async_db.py); default derives it from SQLALCHEMY_DATABASE_URI
+    ASYNC_SQLALCHEMY_DATABASE_URI = os.getenv("ASYNC_SQLALCHEMY_DATABASE_URI", "")
+
+    # Per-request SQL instrumentation (see modules/sql_instrumentation.py)
+    SQL_SLOW_QUERY_MS = float(os.getenv("SQL_SLOW_QUERY_MS", 200))  # log statements slower than this
+    SQL_SERVER_TIMING = os.getenv("SQL_SERVER_TIMING", "true").lower() == "true"  # add a Server-Timing header
+
+    # Sampling profiler (see modules/profiler.py); disabled unless a token is set
+    PROFILER_TOKEN = os.getenv("PROFILER_TOKEN", "")
+    PROFILER_INTERVAL_MS = float(os.getenv("PROFILER_INTERVAL_MS", 5))  # sampling period
+    PROFILER_MAX_SECONDS = float(os.getenv("PROFILER_MAX_SECONDS", 60))  # cap for one profiling run
+
+    # Session storage (see modules/session_store.py): cookie | sql | filesystem
+    SESSION_BACKEND = os.getenv("SESSION_BACKEND", "cookie")
+    SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", 10000))  # decoded sessions kept per process
+    SESSION_CACHE_SECONDS = float(os.getenv("SESSION_CACHE_SECONDS", 300))
+
+    # Probe ingestion buffer (see modules/probe_buffer.py)
+    PROBE_BUFFER_SIZE = int(os.getenv("PROBE_BUFFER_SIZE", 50000))  # max readings held in memory
+    PROBE_FLUSH_ROWS = int(os.getenv("PROBE_FLUSH_ROWS", 1000))  # flush once this many are queued
+    PROBE_FLUSH_SECONDS = float(os.getenv("PROBE_FLUSH_SECONDS", 5))  # or after this long
+    PROBE_MAX_BATCH = int(os.getenv("PROBE_MAX_BATCH", 5000))  # max readings per POST
+    PROBE_DEAD_LETTER_SIZE = int(os.getenv("PROBE_DEAD_LETTER_SIZE", 1000))  # refused readings kept for inspection
+
+    # Columnar archive for old test/probe rows (see modules/archive.py)
+    ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", os.path.join(basedir, 'user', 'archive'))
+    ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", 365))
+    ARCHIVE_BATCH_ROWS = int(os.getenv("ARCHIVE_BATCH_ROWS", 50000))  # rows read, archived and deleted per transaction
+
+    # Per-process tank list cache for the navbar (see modules/tank_context.py)
+    TANK_CACHE_SECONDS = float(os.getenv("TANK_CACHE_SECONDS", 300))
+
+    # In-memory taxonomy tree for the coral form pickers (see modules/taxonomy_tree.py)
+    TAXONOMY_CACHE_SECONDS = float(os.getenv("TAXONOMY_CACHE_SECONDS", 600))
+    # Full rebuild interval for the autocomplete index; table_ops edits patch it in place.
+    # Bounds staleness for edits made by other workers, like TAXONOMY_CACHE_SECONDS for the pickers
+    SUGGEST_REBUILD_SECONDS = float(os.getenv("SUGGEST_REBUILD_SECONDS", 600))
+
+    # Photo uploads and thumbnail renditions (see modules/media.py)
+    UPLOAD_DIR = os.getenv("UPLOAD_DIR", os.path.join(basedir, 'user', 'upload'))
+    MEDIA_WORKERS = int(os.getenv("MEDIA_WORKERS", 2))  # background render threads per process
+    # Full reload of the photo similarity index, to pick up uploads hashed by other workers
+    SIMILARITY_RELOAD_SECONDS = float(os.getenv("SIMILARITY_RELOAD_SECONDS", 300))
+
+    # Arrow/Parquet export (see modules/export.py)
+    EXPORT_BATCH_ROWS = int(os.getenv("EXPORT_BATCH_ROWS", 10000))  # rows per record batch / row group
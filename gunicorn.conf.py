@@ -0,0 +1,46 @@
+# Copyright (c) 2025 Jasdeep Nijjar
+# All rights reserved.
+# Commercial use, copying, or redistribution of this software or any substantial portion of it is strictly prohibited without the express written permission of the copyright holder. For commercial licensing, please contact jasdeepn4@gmail.com.
+"""
+Gunicorn settings, read from the GUNICORN_* entries in config.py.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+With preload_app the master imports the app once and forks workers from it,
+so the interpreter, Flask, SQLAlchemy and the route modules are shared
+copy-on-write instead of being imported again in every worker. Nothing may
+hold a live DB connection across the fork: every engine (primary, replica
+binds and the asyncio engines) is disposed in post_fork so each worker opens
+its own pools. Background threads (probe
+flusher, rendition pool) are started lazily per worker already.
+
+With gevent workers the master must monkey-patch before anything imports the
+app: module-level locks (tank catalogue, taxonomy tree, probe buffer, ...) are
+created at import time, and an unpatched threading.Lock blocks the whole
+worker instead of yielding to other greenlets.
+"""
+import os
+
+if os.getenv("GUNICORN_WORKER_CLASS", "gevent") == "gevent":
+    from gevent import monkey
+    monkey.patch_all()
+
+from config import Config  # noqa: E402
+
+bind = Config.GUNICORN_BIND
+workers = Config.GUNICORN_WORKERS
+worker_class = Config.GUNICORN_WORKER_CLASS
+preload_app = Config.GUNICORN_PRELOAD
+
+
+def post_fork(server, worker):
+    if not preload_app:
+        return
+    from app import app, db
+    from modules import async_db
+    with app.app_context():
+        # close=False: drop the inherited pools without closing sockets the master still owns
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+        async_db.reset_after_fork()
+    server.log.info(f"Worker {worker.pid}: reset DB pools after fork")
@@ -0,0 +1,316 @@
+"""
+Columnar archive for old test results and probe readings.
+
+Rows older than ARCHIVE_AFTER_DAYS are moved out of MySQL into one segment
+file per source, tank and month:
+
+    <ARCHIVE_DIR>/<source>/<tank_id>/<YYYY-MM>.seg
+
+Segment layout:
+
+    b'REEFSEG1' | uint32 header length | JSON header | column blocks
+
+Each column block is zlib-compressed. Timestamps (epoch ms) and ids are
+delta-encoded int64, values are float64 with NaN for missing. Files are
+memory-mapped on read and only the requested columns are decompressed.
+"""
+import json
+import logging
+import mmap
+import os
+import struct
+import zlib
+from datetime import datetime, timedelta, time
+
+from sqlalchemy import select, delete, exists
+
+from app import app, db
+from modules.models import TestResults, ProbeReading, Coral
+from modules.utils.timeseries import TEST_PARAMETERS, PROBE_PARAMETERS, to_epoch_ms
+from modules.utils.lazy import lazy_import
+
+np = lazy_import('numpy')
+
+logger = logging.getLogger("archive")
+
+MAGIC = b'REEFSEG1'
+DELTA_COLUMNS = ('ts', 'id')
+TEST_SOURCE = 'test_results'
+
+
+def probe_source(probe):
+    return f"probe_{probe}"
+
+
+def source_columns(source):
+    """Value columns stored for a source (besides ts and id)."""
+    if source == TEST_SOURCE:
+        return list(TEST_PARAMETERS)
+    return ['value']
+
+
+def archive_dir():
+    return app.config['ARCHIVE_DIR']
+
+
+def segment_path(source, tank_id, month):
+    return os.path.join(archive_dir(), source, str(tank_id), f"{month}.seg")
+
+
+def write_segment(path, source, tank_id, month, columns):
+    """
+    Atomically write a segment. columns must contain 'ts' and 'id' int64 arrays
+    sorted by ts, plus float64 arrays for each value column.
+    """
+    blocks = []
+    meta = {}
+    offset = 0
+    for name, values in columns.items():
+        if name in DELTA_COLUMNS:
+            arr = np.asarray(values, dtype=np.int64)
+            raw = np.diff(arr, prepend=np.int64(0)).astype('<i8').tobytes()
+            meta[name] = {'dtype': 'int64', 'encoding': 'delta'}
+        else:
+            raw = np.asarray(values, dtype='<f8').tobytes()
+            meta[name] = {'dtype': 'float64', 'encoding': 'plain'}
+        block = zlib.compress(raw, 6)
+        meta[name].update(offset=offset, length=len(block))
+        offset += len(block)
+        blocks.append(block)
+    header = json.dumps({
+        'source': source,
+        'tank_id': tank_id,
+        'month': month,
+        'rows': int(len(columns['ts'])),
+        'ts_min': int(columns['ts'][0]) if len(columns['ts']) else None,
+        'ts_max': int(columns['ts'][-1]) if len(columns['ts']) else None,
+        'columns': meta,
+    }).encode()
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<I', len(header)))
+        f.write(header)
+        for block in blocks:
+            f.write(block)
+        f.flush()
+        os.fsync(f.fileno())
+    # Readers that already mapped the old file keep their view until they close it
+    os.replace(tmp_path, path)
+
+
+def read_segment(path, columns=None):
+    """
+    Memory-map a segment and decode the requested columns (all if None).
+    Returns (header, {column: ndarray}); 'ts' is always included.
+    """
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if mm[:len(MAGIC)] != MAGIC:
+                raise ValueError(f"{path} is not an archive segment")
+            header_len = struct.unpack_from('<I', mm, len(MAGIC))[0]
+            data_start = len(MAGIC) + 4 + header_len
+            header = json.loads(mm[len(MAGIC) + 4:data_start])
+            wanted = list(header['columns']) if columns is None else ['ts'] + [c for c in columns if c != 'ts']
+            out = {}
+            for name in wanted:
+                meta = header['columns'].get(name)
+                if meta is None:
+                    continue
+                start = data_start + meta['offset']
+                raw = zlib.decompress(mm[start:start + meta['length']])
+                if meta['encoding'] == 'delta':
+                    out[name] = np.cumsum(np.frombuffer(raw, dtype='<i8'))
+                else:
+                    out[name] = np.frombuffer(raw, dtype='<f8')
+    return header, out
+
+
+def _months_between(start_ms, end_ms):
+    start = datetime.utcfromtimestamp(start_ms / 1000).replace(day=1)
+    end = datetime.utcfromtimestamp(end_ms / 1000)
+    months = []
+    while start <= end:
+        months.append(start.strftime('%Y-%m'))
+        start = (start + timedelta(days=32)).replace(day=1)
+    return months
+
+
+def list_segments(source, tank_id):
+    folder = os.path.join(archive_dir(), source, str(tank_id))
+    if not os.path.isdir(folder):
+        return []
+    return sorted(os.path.join(folder, f) for f in os.listdir(folder) if f.endswith('.seg'))
+
+
+def read_range(source, tank_id, columns, start_ms=None, end_ms=None):
+    """
+    Read archived rows for one tank in [start_ms, end_ms] (either bound optional).
+    Returns (ts ndarray, {column: ndarray}) sorted by ts.
+    """
+    if start_ms is not None and end_ms is not None:
+        paths = [segment_path(source, tank_id, m) for m in _months_between(start_ms, end_ms)]
+        paths = [p for p in paths if os.path.exists(p)]
+    else:
+        paths = list_segments(source, tank_id)
+
+    ts_parts = []
+    value_parts = {c: [] for c in columns}
+    for path in paths:
+        _, data = read_segment(path, columns)
+        ts = data['ts']
+        lo = 0 if start_ms is None else np.searchsorted(ts, start_ms, side='left')
+        hi = len(ts) if end_ms is None else np.searchsorted(ts, end_ms, side='right')
+        ts_parts.append(ts[lo:hi])
+        for c in columns:
+            col = data.get(c)
+            value_parts[c].append(col[lo:hi] if col is not None else np.full(hi - lo, np.nan))
+    if not ts_parts:
+        return np.empty(0, dtype=np.int64), {c: np.empty(0) for c in columns}
+    return np.concatenate(ts_parts), {c: np.concatenate(v) for c, v in value_parts.items()}
+
+
+def merge_with_hot(source, tank_id, columns, start_ms, end_ms, hot_ts, hot_values):
+    """
+    Prepend archived rows to hot (database) rows for the series API.
+    Returns (ts list, {column: values list}) sorted by ts.
+    """
+    arch_ts, arch_values = read_range(source, tank_id, columns, start_ms, end_ms)
+    if not len(arch_ts):
+        return hot_ts, hot_values
+    ts = np.concatenate([arch_ts, np.asarray(hot_ts, dtype=np.int64)])
+    merged = {
+        c: np.concatenate([arch_values[c], np.asarray(hot_values[c], dtype=np.float64)])
+        for c in columns
+    }
+    if len(hot_ts) and arch_ts[-1] > hot_ts[0]:
+        order = np.argsort(ts, kind='stable')
+        ts = ts[order]
+        merged = {c: v[order] for c, v in merged.items()}
+    return ts.tolist(), {c: v.tolist() for c, v in merged.items()}
+
+
+def archived_tanks(source):
+    folder = os.path.join(archive_dir(), source)
+    if not os.path.isdir(folder):
+        return []
+    return sorted(int(d) for d in os.listdir(folder) if d.isdigit())
+
+
+def _merge_into_segment(source, tank_id, month, new_columns):
+    """Merge new rows with an existing segment (dedup by id) and rewrite it."""
+    path = segment_path(source, tank_id, month)
+    if os.path.exists(path):
+        _, old = read_segment(path)
+        merged = {k: np.concatenate([old[k], new_columns[k]]) for k in new_columns}
+    else:
+        merged = new_columns
+    _, first = np.unique(merged['id'], return_index=True)
+    merged = {k: v[first] for k, v in merged.items()}
+    order = np.argsort(merged['ts'], kind='stable')
+    merged = {k: v[order] for k, v in merged.items()}
+    write_segment(path, source, tank_id, month, merged)
+    return path
+
+
+def _write_month_groups(source, tank_id, ids, ts, values):
+    """Split rows by calendar month and merge each month into its segment."""
+    months = np.array([datetime.utcfromtimestamp(t / 1000).strftime('%Y-%m') for t in ts])
+    written = []
+    for month in np.unique(months):
+        mask = months == month
+        columns = {'ts': ts[mask], 'id': ids[mask]}
+        columns.update({c: v[mask] for c, v in values.items()})
+        written.append(_merge_into_segment(source, tank_id, str(month), columns))
+    return written
+
+
+def _delete_ids(model, ids, chunk=1000):
+    for i in range(0, len(ids), chunk):
+        db.session.execute(delete(model).where(model.id.in_([int(x) for x in ids[i:i + chunk]])))
+
+
+def _batches(query, id_column, batch_rows):
+    """Keyset-paginate `query` by id: lists of at most batch_rows rows, so memory stays bounded."""
+    last = 0
+    while True:
+        rows = db.session.execute(query.where(id_column > last).order_by(id_column).limit(batch_rows)).all()
+        if not rows:
+            return
+        yield rows
+        last = rows[-1][0]
+
+
+def _batch_rows():
+    return max(app.config.get('ARCHIVE_BATCH_ROWS', 50000), 1)
+
+
+def compact_test_results(cutoff, tank_id=None):
+    """Archive test results taken before cutoff. Results linked to a coral are kept hot."""
+    query = (
+        select(TestResults.id, TestResults.tank_id, TestResults.test_date, TestResults.test_time,
+               *[getattr(TestResults, p) for p in TEST_PARAMETERS])
+        .where(TestResults.test_date < cutoff.date())
+        .where(~exists().where(Coral.test_id == TestResults.id))
+    )
+    if tank_id:
+        query = query.where(TestResults.tank_id == tank_id)
+    moved = 0
+    for rows in _batches(query, TestResults.id, _batch_rows()):
+        by_tank = {}
+        for row in rows:
+            by_tank.setdefault(row[1], []).append(row)
+        for tid, tank_rows in by_tank.items():
+            ids = np.array([r[0] for r in tank_rows], dtype=np.int64)
+            ts = np.array([to_epoch_ms(r[2], r[3] or time.min) for r in tank_rows], dtype=np.int64)
+            values = {
+                p: np.array([np.nan if r[4 + i] is None else r[4 + i] for r in tank_rows], dtype=np.float64)
+                for i, p in enumerate(TEST_PARAMETERS)
+            }
+            # _merge_into_segment sorts by ts, so id-ordered batches can land in any month
+            _write_month_groups(TEST_SOURCE, tid, ids, ts, values)
+            _delete_ids(TestResults, ids)
+            moved += len(ids)
+        db.session.commit()
+    return moved
+
+
+def compact_probe_readings(cutoff, tank_id=None):
+    """Archive probe readings taken before cutoff."""
+    moved = 0
+    for probe in PROBE_PARAMETERS:
+        tanks_query = select(ProbeReading.tank_id).where(
+            ProbeReading.probe == probe, ProbeReading.reading_time < cutoff
+        ).distinct()
+        tank_ids = [tank_id] if tank_id else db.session.execute(tanks_query).scalars().all()
+        for tid in tank_ids:
+            query = (
+                select(ProbeReading.id, ProbeReading.reading_time, ProbeReading.value)
+                .where(ProbeReading.tank_id == tid, ProbeReading.probe == probe,
+                       ProbeReading.reading_time < cutoff)
+            )
+            for rows in _batches(query, ProbeReading.id, _batch_rows()):
+                ids = np.array([r[0] for r in rows], dtype=np.int64)
+                ts = np.array([to_epoch_ms(r[1]) for r in rows], dtype=np.int64)
+                values = {'value': np.array([r[2] for r in rows], dtype=np.float64)}
+                _write_month_groups(probe_source(probe), tid, ids, ts, values)
+                _delete_ids(ProbeReading, ids)
+                db.session.commit()
+                moved += len(ids)
+    return moved
+
+
+def compact(older_than_days=None, tank_id=None, now=None):
+    """
+    Move rows older than `older_than_days` (default ARCHIVE_AFTER_DAYS) into segments.
+    Segments are written before the rows are deleted; a crash in between only
+    leaves duplicates that the next run drops by id.
+    """
+    days = app.config['ARCHIVE_AFTER_DAYS'] if older_than_days is None else older_than_days
+    cutoff = (now or datetime.utcnow()) - timedelta(days=days)
+    tests = compact_test_results(cutoff, tank_id)
+    probes = compact_probe_readings(cutoff, tank_id)
+    logger.info(f"Archived {tests} test results and {probes} probe readings older than {cutoff}")
+    return {'test_results': tests, 'probe_readings': probes, 'cutoff': cutoff.isoformat()}
@@ -0,0 +1,225 @@
+"""
+SQLAlchemy asyncio engine for `async def` views and modules/db_functions.
+
+The async URL comes from ASYNC_SQLALCHEMY_DATABASE_URI, or is derived from
+SQLALCHEMY_DATABASE_URI by swapping in the asyncio driver:
+
+    mysql+pymysql://...  ->  mysql+aiomysql://...
+    sqlite:///reef.db    ->  sqlite+aiosqlite:///reef.db
+
+Flask runs every async view in its own short-lived event loop, while pooled
+asyncio connections belong to the loop that opened them. So each process
+runs one long-lived "DB loop" in its own OS thread, and every async
+engine lives on it. run_sync() hands the
+work to that loop and awaits the result, so connections are reused across
+requests, the pool follows the DB_POOL_* settings and reports the same
+metrics as the sync engines (pool="async_default", "async_replica_0", ...).
+
+Inside a @replica_reads view, read-only calls go to a replica's async
+engine under the same rules as RoutingSession; a replica that fails the
+query is marked down and the read is retried on the primary.
+
+The gain is inside a request: independent queries awaited together
+(asyncio.gather) run on separate connections at the same time instead of
+one after another.
+
+`run_sync` falls back to the regular (pooled, replica-routed)
+Flask-SQLAlchemy session when:
+
+* the database is in-memory SQLite (the unit tests' default), which cannot
+  be shared with a second engine, or
+* gevent has monkey-patched threading (the default gunicorn worker). The
+  DB loop's thread would then share gevent primitives with the hub's
+  greenlets, and driver helper threads (aiosqlite, getaddrinfo executors)
+  would never be scheduled. Gevent already overlaps requests' DB I/O.
+
+Example usage:
+    async def view():
+        tests, schedules = await asyncio.gather(
+            run_sync(lambda s: s.execute(select(TestResults)).scalars().all()),
+            run_sync(lambda s: s.execute(select(DSchedule)).scalars().all()),
+        )
+"""
+import asyncio
+import os
+import threading
+
+from flask import current_app
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import OperationalError
+
+from modules.db_pool import InstrumentedAsyncQueuePool, engine_options, register_pool
+from modules.db_routing import replica_read_allowed, replica_router, stick_to_primary
+
+ASYNC_DRIVERS = {
+    'mysql': 'mysql+aiomysql',
+    'mysql+pymysql': 'mysql+aiomysql',
+    'mysql+mysqldb': 'mysql+aiomysql',
+    'sqlite': 'sqlite+aiosqlite',
+    'sqlite+pysqlite': 'sqlite+aiosqlite',
+}
+
+_engines = {}  # (async url, pool name) -> AsyncEngine, all bound to _loop
+_loop = None
+_loop_pid = None
+_lock = threading.Lock()
+
+
+def _async_url(uri):
+    url = make_url(uri)
+    driver = ASYNC_DRIVERS.get(url.drivername)
+    if driver is None:
+        return None
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        return None
+    return url.set(drivername=driver).render_as_string(hide_password=False)
+
+
+def async_database_uri(config):
+    """The asyncio URL for this config, or None when there is no usable one."""
+    explicit = config.get('ASYNC_SQLALCHEMY_DATABASE_URI')
+    if explicit:
+        return explicit
+    uri = config.get('SQLALCHEMY_DATABASE_URI')
+    if not uri:
+        return None
+    return _async_url(uri)
+
+
+def _gevent_patched():
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched('threading')
+
+
+def _db_loop():
+    """This process's DB event loop, started on first use (and again in a forked child)."""
+    global _loop, _loop_pid
+    if _loop is not None and _loop_pid == os.getpid():
+        return _loop
+    with _lock:
+        if _loop is None or _loop_pid != os.getpid():
+            from modules.profiler import _real_threading
+            start_thread = _real_threading()[0]
+            # A forked child inherits the parent's engines but not its loop thread; drop both
+            _engines.clear()
+            _loop = asyncio.new_event_loop()
+            _loop_pid = os.getpid()
+            start_thread(_loop.run_forever, ())
+    return _loop
+
+
+def _engine_for(uri, name):
+    engine = _engines.get((uri, name))
+    if engine is None:
+        with _lock:
+            engine = _engines.get((uri, name))
+            if engine is None:
+                from sqlalchemy.ext.asyncio import create_async_engine
+                options = dict(engine_options(current_app.config), poolclass=InstrumentedAsyncQueuePool)
+                engine = _engines[(uri, name)] = create_async_engine(uri, **options)
+                register_pool(engine.sync_engine.pool, name)
+    return engine
+
+
+def get_async_engine(bind_key=None):
+    """Per-process pooled AsyncEngine for the primary, or for a replica bind key (None if unavailable)."""
+    _db_loop()
+    if bind_key is None:
+        uri = async_database_uri(current_app.config)
+    else:
+        from app import db
+        uri = _async_url(db.engines[bind_key].url.render_as_string(hide_password=False))
+    if uri is None:
+        return None
+    return _engine_for(uri, f"async_{bind_key or 'default'}")
+
+
+async def _on_db_loop(coro):
+    """Run a coroutine on the DB loop and await it from the caller's loop."""
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, _db_loop()))
+
+
+async def _run(engine, fn, commit):
+    from sqlalchemy.ext.asyncio import AsyncSession
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        try:
+            result = await session.run_sync(fn)
+            if commit:
+                await session.commit()
+            return result
+        except Exception:
+            await session.rollback()
+            raise
+
+
+def _replica_key():
+    from app import db
+    key, _ = replica_router.pick(db.engines)
+    return key
+
+
+async def run_sync(fn, commit=False):
+    """
+    Run fn(session) with the DB I/O awaited on the DB loop and return its result.
+
+    fn receives a regular (sync-API) Session bound to an asyncio connection, so
+    existing query code works unchanged. With commit=True the session is committed
+    after fn returns and, inside a request, the browser session is made sticky to
+    the primary just like a RoutingSession commit; any exception rolls it back.
+    """
+    engine = None if _gevent_patched() else get_async_engine()
+    if engine is None:
+        from app import db
+        try:
+            result = fn(db.session)
+            if commit:
+                db.session.commit()
+            return result
+        except Exception:
+            db.session.rollback()
+            raise
+
+    if not commit and replica_read_allowed():
+        key = _replica_key()
+        replica = get_async_engine(key) if key is not None else None
+        if replica is not None:
+            try:
+                return await _on_db_loop(_run(replica, fn, False))
+            except OperationalError:
+                replica_router.mark_down(key)
+
+    result = await _on_db_loop(_run(engine, fn, commit))
+    if commit:
+        # This session is not a RoutingSession, so its after_commit hook never fires
+        stick_to_primary()
+    return result
+
+
+def reset_after_fork():
+    """
+    Drop the async engines and DB loop inherited from a forked parent (gunicorn post_fork).
+    Like Engine.dispose(close=False), the parent's sockets are left alone.
+    """
+    global _loop, _loop_pid
+    with _lock:
+        for engine in _engines.values():
+            engine.sync_engine.dispose(close=False)
+        _engines.clear()
+        _loop = _loop_pid = None
+
+
+async def dispose_engines():
+    """Close every async engine (tests, or after changing the config)."""
+    with _lock:
+        engines = list(_engines.values())
+        _engines.clear()
+    if not engines:
+        return
+
+    async def dispose():
+        for engine in engines:
+            await engine.dispose()
+    await _on_db_loop(dispose())
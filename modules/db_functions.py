@@ -1,6 +1,8 @@
 from sqlalchemy import insert 
 from sqlalchemy import select, update, delete
 from app import db
+from modules import rollups
+from modules.async_db import run_sync
 
 
 def create_row(table_class, data):
@@ -16,6 +18,7 @@ def create_row(table_class, data):
     try:
         stmt = insert(table_class).values(data)
         result = db.session.execute(stmt)
+        rollups.record_insert(table_class, data)
         db.session.commit()
         return result.inserted_primary_key
     except Exception as e:
@@ -23,65 +26,63 @@ def create_row(table_class, data):
         db.session.rollback()
         raise e
 
+# The async functions below run on the asyncio engine (modules/async_db.py), so
+# awaiting several of them together overlaps their DB round trips.
+
 # Read
 async def read_rows(table_class, filters=None):
-    try:
+    def work(session):
         stmt = select(table_class)
         if filters:
             stmt = stmt.filter_by(**filters)
-        result = db.session.execute(stmt).scalars().all()
-        return result
+        return session.execute(stmt).scalars().all()
+    try:
+        return await run_sync(work)
     except Exception as e:
         print(f"Error reading rows: {e}")
         return None
 
 # Update
 async def update_row(table_class, filters, update_data):
-    try:
+    def work(session):
         stmt = update(table_class).where(*[getattr(table_class, k) == v for k, v in filters.items()]).values(update_data)
-        db.session.execute(stmt)
-        db.session.commit()
+        session.execute(stmt)
+    try:
+        await run_sync(work, commit=True)
         return True
     except Exception as e:
         print(f"Error updating row: {e}")
-        db.session.rollback()
         return False
 
 # Delete
 async def delete_row(table_class, filters):
-    try:
+    def work(session):
         stmt = delete(table_class).where(*[getattr(table_class, k) == v for k, v in filters.items()])
-        db.session.execute(stmt)
-        db.session.commit()
+        session.execute(stmt)
+    try:
+        await run_sync(work, commit=True)
         return True
     except Exception as e:
         print(f"Error deleting row: {e}")
-        db.session.rollback()
         return False
 
 # Test functions
 async def insert_test_row(table_class, data, tank_id):  
   clean_data = await process_data(data)
   assert clean_data != {}, "no data to insert"
-  try:
-    # print('try this data', clean_data)
-    clean_data['tank_id'] = tank_id
-    stmt = insert(table_class).values(clean_data)
-    # print(stmt)
-    compiled = stmt.compile()
-    # print(compiled.params) 
-  except Exception as err:
-    print(f"Unexpected {err=}, {type(err)=}")
-    raise
-    print('error compiling insert statment')
-    return False
+  clean_data['tank_id'] = tank_id
+  stmt = insert(table_class).values(clean_data)
 
+  def work(session):
+    session.execute(stmt)
+    rollups.record_test_result(tank_id, clean_data.get('test_date'), clean_data.get('test_time'), clean_data,
+                               session=session)
   try:
-    result = db.session.execute(stmt)
-    db.session.commit()
+    await run_sync(work, commit=True)
     return True
-  except:
-    print('error executing sql')
+  except Exception as err:
+    print(f"Error inserting test row: {err}")
+    return False
 
 async def process_data(dirty):
   # print('process', dirty)
@@ -111,16 +112,5 @@ async def process_data(dirty):
     return {}
   
 async def get_test_row(table_class, id):
-  try:
-    stmt = select(table_class).where(table_class.id == id)
-    result = db.session.execute(stmt)
-    row = result.fetchone()
-    if row:
-      return row
-    else:
-      return None
-  except Exception as err:
-    print(f"Unexpected {err=}, {type(err)=}")
-    raise
-    print('error getting test row')
-    return None
+  stmt = select(table_class).where(table_class.id == id)
+  return await run_sync(lambda session: session.execute(stmt).fetchone())
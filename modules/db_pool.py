@@ -0,0 +1,133 @@
+"""
+Connection pool settings and statistics.
+
+There is one engine per database, created by Flask-SQLAlchemy from
+SQLALCHEMY_ENGINE_OPTIONS, which engine_options() builds from the DB_POOL_*
+config entries. Its pool is an InstrumentedQueuePool, which times every
+checkout (waiting for a free connection plus opening an overflow one) and
+counts checkouts that hit DB_POOL_TIMEOUT. Pool occupancy is exported as
+Prometheus gauges labelled by engine name:
+
+    db_pool_size{pool="default"}          configured pool_size
+    db_pool_checked_out{pool="default"}   connections in use
+    db_pool_checked_in{pool="default"}    idle connections held by the pool
+    db_pool_overflow{pool="default"}      connections opened beyond pool_size
+
+This module must not import the app: app/__init__ uses it before db exists.
+"""
+import threading
+import time
+
+from prometheus_client import Counter, Histogram, REGISTRY
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+POOL_CHECKOUT_SECONDS = Histogram(
+    'db_pool_checkout_seconds', 'Time to get a connection from the pool (waiting and connecting)', ['pool'],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30),
+)
+POOL_TIMEOUTS = Counter('db_pool_timeouts_total', 'Checkouts that gave up after DB_POOL_TIMEOUT', ['pool'])
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def engine_options(config):
+    """SQLALCHEMY_ENGINE_OPTIONS for a server database (MySQL) from the DB_POOL_* config."""
+    return {
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': config['DB_POOL_PRE_PING'],
+    }
+
+
+class _InstrumentedPool:
+    """Records checkout latency and timeouts once the pool has been given a name."""
+
+    metrics_name = None
+
+    def _do_get(self):
+        if self.metrics_name is None:
+            return super()._do_get()
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeout:
+            POOL_TIMEOUTS.labels(self.metrics_name).inc()
+            raise
+        finally:
+            POOL_CHECKOUT_SECONDS.labels(self.metrics_name).observe(time.perf_counter() - started)
+
+    def recreate(self):
+        # engine.dispose() swaps in a fresh pool; keep reporting under the same name
+        pool = super().recreate()
+        if self.metrics_name is not None:
+            register_pool(pool, self.metrics_name)
+        return pool
+
+
+class InstrumentedQueuePool(_InstrumentedPool, QueuePool):
+    """QueuePool with checkout metrics, for the sync engines."""
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPool, AsyncAdaptedQueuePool):
+    """The same for asyncio engines (modules/async_db.py)."""
+
+
+def register_pool(pool, name):
+    if isinstance(pool, _InstrumentedPool):
+        pool.metrics_name = name
+    with _pools_lock:
+        _pools[name] = pool
+
+
+def register_engines(engines):
+    """Name each engine's pool for metrics; `engines` is db.engines (bind key -> engine)."""
+    for key, engine in engines.items():
+        register_pool(engine.pool, key or 'default')
+
+
+def pool_stats():
+    """Current occupancy of every registered QueuePool in this process."""
+    with _pools_lock:
+        pools = list(_pools.items())
+    out = {}
+    for name, pool in pools:
+        if not isinstance(pool, QueuePool):
+            out[name] = {'class': type(pool).__name__}
+            continue
+        out[name] = {
+            'class': type(pool).__name__,
+            'size': pool.size(),
+            'checked_out': pool.checkedout(),
+            'checked_in': pool.checkedin(),
+            'overflow': max(0, pool.overflow()),
+            'max_overflow': pool._max_overflow,
+            'timeout': pool.timeout(),
+        }
+    return out
+
+
+class _PoolCollector:
+    GAUGES = (
+        ('db_pool_size', 'Configured pool size', 'size'),
+        ('db_pool_checked_out', 'Connections currently checked out', 'checked_out'),
+        ('db_pool_checked_in', 'Idle connections held by the pool', 'checked_in'),
+        ('db_pool_overflow', 'Connections open beyond pool_size', 'overflow'),
+    )
+
+    def collect(self):
+        stats = pool_stats()
+        for metric, doc, field in self.GAUGES:
+            family = GaugeMetricFamily(metric, doc, labels=['pool'])
+            for name, s in stats.items():
+                if field in s:
+                    family.add_metric([name], s[field])
+            yield family
+
+
+REGISTRY.register(_PoolCollector())
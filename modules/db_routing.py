@@ -0,0 +1,243 @@
+"""
+Read-replica routing for db.session.
+
+Replica URLs come from DB_REPLICA_URIS (comma separated) and are registered
+as Flask-SQLAlchemy binds named replica_0, replica_1, ... Models do not use
+these bind keys. Instead, RoutingSession.get_bind sends a statement to a
+replica only when all of the following hold:
+
+* the view is marked @replica_reads (grids, stats, pickers, Grafana),
+* the statement is a plain SELECT (not FOR UPDATE) and this session has
+  not written yet (an ORM flush, or Core/text DML through session.execute),
+* this browser session has not written in the last REPLICA_STICKY_SECONDS
+  (read-your-writes), and
+* a replica is reachable. Replicas that fail a connect check, or a query
+  (which is then retried on the primary), are skipped for
+  REPLICA_RETRY_SECONDS.
+
+In every other case the statement goes to the primary. With no replicas
+configured, routing is a no-op. Code that fills process-wide caches should
+use `with primary_reads():`, so a lagging replica cannot pin stale data.
+
+Example usage:
+    @bp.route('/stats')
+    @replica_reads
+    def get_stats(): ...
+"""
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from flask import current_app, has_request_context, session as flask_session
+from flask_sqlalchemy.session import Session
+from prometheus_client import Counter
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.sql.elements import TextClause
+
+REPLICA_PREFIX = 'replica_'
+STICKY_KEY = '_db_primary_until'
+
+ROUTED_READS = Counter('db_routed_reads_total', 'Replica-eligible reads by where they were sent', ['target'])
+REPLICA_FAILURES = Counter('db_replica_failures_total', 'Replica connect checks that failed', ['replica'])
+
+_mode = ContextVar('db_routing_mode', default=None)
+
+
+def replica_binds(uris, options=None):
+    """SQLALCHEMY_BINDS entries for the replica URLs (comma separated string or list)."""
+    if isinstance(uris, str):
+        uris = [u.strip() for u in uris.split(',')]
+    binds = {}
+    for i, uri in enumerate(u for u in uris or () if u):
+        binds[f"{REPLICA_PREFIX}{i}"] = dict(options or {}, url=uri)
+    return binds
+
+
+def replica_reads(view):
+    """Let SELECTs issued by this view go to a read replica."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        token = _mode.set('replica')
+        try:
+            return view(*args, **kwargs)
+        finally:
+            _mode.reset(token)
+    return wrapper
+
+
+@contextmanager
+def primary_reads():
+    """Force the primary for the enclosed block, e.g. while rebuilding a shared cache."""
+    token = _mode.set('primary')
+    try:
+        yield
+    finally:
+        _mode.reset(token)
+
+
+class ReplicaRouter:
+    """Round-robins over replica engines, skipping ones that recently failed a connect check."""
+
+    def __init__(self, check_seconds=30, retry_seconds=30):
+        self.check_seconds = check_seconds
+        self.retry_seconds = retry_seconds
+        self._lock = threading.Lock()
+        self._checked = {}  # bind key -> monotonic time of last good check
+        self._down_until = {}  # bind key -> monotonic time to retry
+        self._counter = itertools.count()
+
+    def configure(self, check_seconds, retry_seconds):
+        self.check_seconds = check_seconds
+        self.retry_seconds = retry_seconds
+
+    def _available(self, key, engine):
+        now = time.monotonic()
+        if self._down_until.get(key, 0) > now:
+            return False
+        if now - self._checked.get(key, -self.check_seconds - 1) <= self.check_seconds:
+            return True
+        try:
+            with engine.connect():
+                pass
+        except Exception:
+            self.mark_down(key)
+            return False
+        with self._lock:
+            self._checked[key] = now
+            self._down_until.pop(key, None)
+        return True
+
+    def mark_down(self, key):
+        REPLICA_FAILURES.labels(key).inc()
+        with self._lock:
+            self._down_until[key] = time.monotonic() + self.retry_seconds
+            self._checked.pop(key, None)
+
+    def pick(self, engines):
+        """A healthy replica engine (bind key, engine), or (None, None) to use the primary."""
+        keys = sorted(k for k in engines if k and k.startswith(REPLICA_PREFIX))
+        if not keys:
+            return None, None
+        start = next(self._counter)
+        for i in range(len(keys)):
+            key = keys[(start + i) % len(keys)]
+            if self._available(key, engines[key]):
+                return key, engines[key]
+        return None, None
+
+    def reset(self):
+        with self._lock:
+            self._checked.clear()
+            self._down_until.clear()
+
+
+replica_router = ReplicaRouter()
+
+
+def _sticky_to_primary():
+    if not has_request_context():
+        return False
+    return flask_session.get(STICKY_KEY, 0) > time.time()
+
+
+def replica_read_allowed():
+    """True inside a @replica_reads view whose browser session is not pinned to the primary."""
+    return _mode.get() == 'replica' and not _sticky_to_primary()
+
+
+def _is_read_text(clause):
+    # Raw SQL: only statements that read
+    return clause.text.lstrip().lower().startswith(('select', 'with'))
+
+
+def _is_plain_select(clause):
+    if clause is None:
+        return False
+    if isinstance(clause, TextClause):
+        return _is_read_text(clause)
+    return getattr(clause, 'is_select', False) and getattr(clause, '_for_update_arg', None) is None
+
+
+def _is_write(clause):
+    """Core insert/update/delete or non-SELECT text(); ORM flushes are caught by after_flush."""
+    if clause is None:
+        return False
+    if isinstance(clause, TextClause):
+        return not _is_read_text(clause)
+    return getattr(clause, 'is_dml', False)
+
+
+class RoutingSession(Session):
+    """Flask-SQLAlchemy session that sends eligible reads to a replica (see module docstring)."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if _is_write(clause):
+            # Sticks the browser session to the primary once this commits
+            self.info['wrote'] = True
+        elif bind is None and _mode.get() == 'replica' and _is_plain_select(clause):
+            engine = self._replica_engine()
+            if engine is not None:
+                ROUTED_READS.labels('replica').inc()
+                self.info['routed'] = self.info['replica']
+                return engine
+            ROUTED_READS.labels('primary').inc()
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _execute_internal(self, *args, **kwargs):
+        # Every execute()/scalars()/Query goes through here
+        self.info.pop('routed', None)
+        try:
+            return super()._execute_internal(*args, **kwargs)
+        except OperationalError:
+            key = self.info.pop('routed', None)
+            if key is None:
+                raise
+            # The replica passed its connect check but failed the query: skip it and read the primary.
+            # Replica reads only happen before this session writes, so the rollback discards nothing.
+            replica_router.mark_down(key)
+            self.rollback()
+            return super()._execute_internal(*args, **kwargs)
+
+    def _replica_engine(self):
+        if self.info.get('wrote') or self._flushing or self.new or self.dirty or self.deleted:
+            return None
+        if _sticky_to_primary():
+            return None
+        engines = self._db.engines
+        # One replica per session, so a request sees a single consistent snapshot
+        key = self.info.get('replica')
+        if key is not None and key in engines and replica_router._down_until.get(key, 0) <= time.monotonic():
+            return engines[key]
+        key, engine = replica_router.pick(engines)
+        if key is not None:
+            self.info['replica'] = key
+        return engine
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _note_write(session, flush_context):
+    session.info['wrote'] = True
+
+
+def stick_to_primary():
+    """Send this browser session's reads to the primary for REPLICA_STICKY_SECONDS (call after a write commits)."""
+    if not has_request_context():
+        return
+    sticky = current_app.config.get('REPLICA_STICKY_SECONDS', 0)
+    if sticky:
+        flask_session[STICKY_KEY] = time.time() + sticky
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _stick_after_write(session):
+    if session.info.pop('wrote', False):
+        stick_to_primary()
+
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _forget_write(session):
+    session.info.pop('wrote', None)
@@ -0,0 +1,223 @@
+"""
+Bulk export of a tank's history as Arrow IPC streams or Parquet files.
+
+Rows are read with a streaming (server-side) cursor and written one record
+batch / row group at a time, so memory stays bounded by EXPORT_BATCH_ROWS no
+matter how large the table is. Column types come from the SQLAlchemy models,
+so dates stay dates and floats stay floats on the pandas/polars side.
+
+test_results exports include rows already moved to the columnar archive
+(modules.archive): they are read one monthly segment at a time and written
+ahead of the live rows, so the file holds the tank's full history.
+"""
+import decimal
+import enum
+import logging
+from datetime import datetime
+
+from sqlalchemy import select
+
+from app import app, db
+from modules.models import TestResults, Dosing, DSchedule, Coral
+
+logger = logging.getLogger("export")
+
+FORMATS = {
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrows'),
+}
+EXPORT_TABLES = ('test_results', 'dosing', 'corals')
+
+
+def _arrow_type(column):
+    import pyarrow as pa
+    sa_type = column.type
+    if isinstance(sa_type, db.Enum):
+        return pa.dictionary(pa.int8(), pa.string())
+    if isinstance(sa_type, db.Boolean):
+        return pa.bool_()
+    if isinstance(sa_type, db.Integer):
+        return pa.int64()
+    if isinstance(sa_type, (db.Float, db.Numeric)):
+        return pa.float64()
+    if isinstance(sa_type, db.DateTime):
+        return pa.timestamp('ms')
+    if isinstance(sa_type, db.Date):
+        return pa.date32()
+    if isinstance(sa_type, db.Time):
+        return pa.time64('us')
+    return pa.string()
+
+
+def _convert(value):
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    return value
+
+
+def export_query(table_name, tank_id):
+    """Return (select statement, [columns]) for one exportable table scoped to a tank."""
+    if table_name == 'test_results':
+        columns = list(TestResults.__table__.columns)
+        stmt = select(*columns).where(TestResults.tank_id == tank_id).order_by(TestResults.id)
+    elif table_name == 'dosing':
+        # dosing has no tank_id in the model; the tank comes from its schedule
+        columns = list(Dosing.__table__.columns) + [DSchedule.__table__.c.tank_id]
+        stmt = (
+            select(*columns)
+            .join(DSchedule, Dosing.schedule_id == DSchedule.id)
+            .where(DSchedule.tank_id == tank_id)
+            .order_by(Dosing.id)
+        )
+    elif table_name == 'corals':
+        columns = list(Coral.__table__.columns)
+        stmt = select(*columns).where(Coral.tank_id == tank_id).order_by(Coral.id)
+    else:
+        raise ValueError(f"Table '{table_name}' cannot be exported.")
+    return stmt, columns
+
+
+def schema_for(columns):
+    import pyarrow as pa
+    return pa.schema([pa.field(c.name, _arrow_type(c)) for c in columns])
+
+
+def _record_batch(schema, rows):
+    import pyarrow as pa
+    arrays = []
+    for i, field in enumerate(schema):
+        values = [_convert(r[i]) for r in rows]
+        if pa.types.is_dictionary(field.type):
+            arrays.append(pa.array(values, type=pa.string()).dictionary_encode().cast(field.type))
+        else:
+            arrays.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def _archived_test_rows(tank_id, columns, batch_rows):
+    """Yield lists of archived test_results rows (as tuples in `columns` order), oldest segment first."""
+    from modules import archive
+    from modules.utils.timeseries import TEST_PARAMETERS
+    for path in archive.list_segments(archive.TEST_SOURCE, tank_id):
+        _, data = archive.read_segment(path, ['id'] + list(TEST_PARAMETERS))
+        ts = data['ts'].tolist()
+        ids = data['id'].tolist() if 'id' in data else [None] * len(ts)
+        values = {p: data[p].tolist() for p in TEST_PARAMETERS if p in data}
+        rows = []
+        for i, t in enumerate(ts):
+            taken_at = datetime.utcfromtimestamp(t / 1000)
+            row = {'id': ids[i], 'tank_id': tank_id, 'test_date': taken_at.date(), 'test_time': taken_at.time()}
+            for param, column in values.items():
+                value = column[i]
+                row[param] = None if value != value else value
+            rows.append(tuple(row.get(c.name) for c in columns))
+            if len(rows) >= batch_rows:
+                yield rows
+                rows = []
+        if rows:
+            yield rows
+
+
+def iter_record_batches(table_name, tank_id, batch_rows=None):
+    """Yield (schema, RecordBatch) pairs: archived test results first, then a streaming cursor."""
+    batch_rows = batch_rows or app.config['EXPORT_BATCH_ROWS']
+    stmt, columns = export_query(table_name, tank_id)
+    schema = schema_for(columns)
+    if table_name == 'test_results':
+        for rows in _archived_test_rows(tank_id, columns, batch_rows):
+            yield schema, _record_batch(schema, rows)
+    result = db.session.execute(stmt.execution_options(stream_results=True, yield_per=batch_rows))
+    try:
+        for rows in result.partitions(batch_rows):
+            yield schema, _record_batch(schema, rows)
+    finally:
+        result.close()
+
+
+class _ChunkSink:
+    """Minimal writable file object that hands back whatever was written since the last drain()."""
+
+    def __init__(self):
+        self._chunks = []
+        self._pos = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self._chunks.append(data)
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._pos
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        out = b''.join(self._chunks)
+        self._chunks = []
+        return out
+
+
+def _open_writer(fmt, sink, schema):
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        return pq.ParquetWriter(sink, schema, compression='zstd')
+    import pyarrow as pa
+    return pa.ipc.new_stream(sink, schema, options=pa.ipc.IpcWriteOptions(compression='zstd'))
+
+
+def write_export(table_name, tank_id, fmt, sink, batch_rows=None):
+    """
+    Write one table for a tank to `sink` (path or file object).
+    Each record batch becomes one Parquet row group / IPC message. Returns rows written.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format '{fmt}'.")
+    writer = None
+    rows = 0
+    try:
+        for schema, batch in iter_record_batches(table_name, tank_id, batch_rows):
+            if writer is None:
+                writer = _open_writer(fmt, sink, schema)
+            writer.write_batch(batch)
+            rows += batch.num_rows
+        if writer is None:
+            # Empty table: still produce a valid file with the schema
+            _, columns = export_query(table_name, tank_id)
+            writer = _open_writer(fmt, sink, schema_for(columns))
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def stream_export(table_name, tank_id, fmt, batch_rows=None):
+    """Generator of encoded bytes for an HTTP response, flushed after every batch."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format '{fmt}'.")
+    sink = _ChunkSink()
+    writer = None
+    try:
+        for schema, batch in iter_record_batches(table_name, tank_id, batch_rows):
+            if writer is None:
+                writer = _open_writer(fmt, sink, schema)
+            writer.write_batch(batch)
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+        if writer is None:
+            _, columns = export_query(table_name, tank_id)
+            writer = _open_writer(fmt, sink, schema_for(columns))
+    finally:
+        if writer is not None:
+            writer.close()
+    tail = sink.drain()
+    if tail:
+        yield tail
@@ -0,0 +1,280 @@
+"""
+Content-addressed photo storage with downscaled renditions.
+
+Uploads are streamed to disk in chunks while hashing and filed under the
+SHA-256 of their bytes, so the same photo uploaded twice is stored once:
+
+    <UPLOAD_DIR>/originals/<ab>/<digest>.<ext>
+    <UPLOAD_DIR>/renditions/<ab>/<digest>/<width>.<webp|jpg>
+
+Renditions are rendered by a small thread pool after the upload returns.
+Under gevent that pool's threads are greenlets, so the CPU-bound Pillow work
+itself runs on the hub's native threadpool and only the DB write stays on
+the greenlet; otherwise one resize would stall every request in the worker.
+A digest never changes meaning, so rendition URLs are served with a one-year
+immutable Cache-Control. If a browser asks before the worker is done, the
+request waits for (or runs) the render instead of failing.
+"""
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from prometheus_client import Counter, Histogram
+
+from app import app
+
+logger = logging.getLogger("media")
+
+RENDITION_WIDTHS = (320, 640, 1280)
+RENDITION_FORMATS = {
+    'webp': ('WEBP', 'image/webp', {'quality': 80, 'method': 4}),
+    'jpg': ('JPEG', 'image/jpeg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+IMAGE_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'bmp', 'webp'}
+DIGEST_RE = re.compile(r'^[0-9a-f]{64}$')
+CHUNK_SIZE = 1024 * 1024
+
+RENDERS = Counter('media_renders_total', 'Photos rendered into thumbnails')
+RENDER_FAILURES = Counter('media_render_failures_total', 'Photos that failed to render')
+UPLOAD_DUPLICATES = Counter('media_upload_duplicates_total', 'Uploads skipped because the same bytes were already stored')
+RENDER_SECONDS = Histogram('media_render_seconds', 'Time spent rendering all renditions of one photo')
+
+
+class InvalidImage(ValueError):
+    """Raised when an upload is not a readable image."""
+
+
+def upload_dir():
+    return app.config['UPLOAD_DIR']
+
+
+def original_path(digest, ext):
+    return os.path.join(upload_dir(), 'originals', digest[:2], f"{digest}.{ext}")
+
+
+def find_original(digest):
+    folder = os.path.join(upload_dir(), 'originals', digest[:2])
+    if os.path.isdir(folder):
+        for name in os.listdir(folder):
+            if name.startswith(digest + '.'):
+                return os.path.join(folder, name)
+    return None
+
+
+def rendition_path(digest, width, fmt):
+    return os.path.join(upload_dir(), 'renditions', digest[:2], digest, f"{width}.{fmt}")
+
+
+def rendition_url(digest, width, fmt):
+    return f"/web/fn/media/{digest}/{width}.{fmt}"
+
+
+def rendition_urls(digest):
+    """URLs and srcsets for templates/JS: <img src=... srcset=...> or a <picture> with a webp source."""
+    return {
+        'thumbnail': rendition_url(digest, RENDITION_WIDTHS[0], 'webp'),
+        'src': rendition_url(digest, RENDITION_WIDTHS[1], 'jpg'),
+        'srcset_webp': ", ".join(f"{rendition_url(digest, w, 'webp')} {w}w" for w in RENDITION_WIDTHS),
+        'srcset_jpg': ", ".join(f"{rendition_url(digest, w, 'jpg')} {w}w" for w in RENDITION_WIDTHS),
+    }
+
+
+def _atomic_write(path, write):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # mkstemp gives a name unique across threads and worker processes
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def store_original(file_storage, chunk_size=CHUNK_SIZE):
+    """
+    Stream an uploaded image to disk while hashing it, then file it under its SHA-256.
+    Returns (digest, ext, duplicate); a duplicate upload is discarded, not stored twice.
+    Raises InvalidImage if the type is not allowed or Pillow cannot read it.
+    """
+    from PIL import Image, UnidentifiedImageError
+    filename = file_storage.filename or ''
+    ext = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    if ext not in IMAGE_EXTENSIONS:
+        raise InvalidImage(f"Unsupported file type '{ext}'")
+    if ext == 'jpeg':
+        ext = 'jpg'
+
+    incoming = os.path.join(upload_dir(), 'incoming')
+    os.makedirs(incoming, exist_ok=True)
+    sha = hashlib.sha256()
+    fd, tmp_path = tempfile.mkstemp(dir=incoming, suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            stream = file_storage.stream
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+                sha.update(chunk)
+                out.write(chunk)
+        try:
+            with Image.open(tmp_path) as img:
+                img.verify()
+        except (UnidentifiedImageError, OSError, SyntaxError) as e:
+            raise InvalidImage(f"Not a readable image: {e}")
+
+        digest = sha.hexdigest()
+        existing = find_original(digest)
+        if existing is not None:
+            UPLOAD_DUPLICATES.inc()
+            return digest, existing.rsplit('.', 1)[-1], True
+        path = original_path(digest, ext)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp_path, path)
+        return digest, ext, False
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def renditions_complete(digest):
+    return all(
+        os.path.exists(rendition_path(digest, w, fmt)) for w in RENDITION_WIDTHS for fmt in RENDITION_FORMATS
+    )
+
+
+def save_upload(file_storage):
+    """
+    Store an upload and queue its renditions unless they already exist.
+    Returns (digest, duplicate).
+    """
+    digest, _, duplicate = store_original(file_storage)
+    if not (duplicate and renditions_complete(digest)):
+        rendition_worker.submit(digest)
+    return digest, duplicate
+
+
+def _render_files(digest):
+    """
+    CPU-bound part of render_renditions: write every width/format and compute the
+    perceptual hash. Touches no DB or gevent state, so it can run on a native thread.
+    Returns (dhash, width, height) of the original, or None if hashing failed.
+    """
+    from PIL import Image, ImageOps
+    from modules.photo_similarity import dhash
+    source = find_original(digest)
+    if source is None:
+        raise FileNotFoundError(f"No original stored for {digest}")
+    hashed = None
+    with Image.open(source) as img:
+        # Phone photos carry their rotation in EXIF; bake it in before resizing
+        img = ImageOps.exif_transpose(img)
+        if img.mode not in ('RGB', 'L'):
+            img = img.convert('RGB')
+        try:
+            hashed = (dhash(img), img.width, img.height)
+        except Exception as e:
+            # Similarity search is best-effort; thumbnails still get rendered
+            logger.error(f"Hashing {digest} failed: {e}")
+        # Largest first, each step resized from the previous one
+        for width in sorted(RENDITION_WIDTHS, reverse=True):
+            if img.width > width:
+                img = img.resize((width, max(1, round(img.height * width / img.width))), Image.LANCZOS)
+            for fmt, (pil_format, _, options) in RENDITION_FORMATS.items():
+                path = rendition_path(digest, width, fmt)
+                if not os.path.exists(path):
+                    _atomic_write(path, lambda f: img.save(f, pil_format, **options))
+    return hashed
+
+
+def _off_hub(fn, *args):
+    """Run fn on gevent's native threadpool when gevent is patched, so it cannot block the hub."""
+    try:
+        from gevent import monkey
+        if monkey.is_module_patched('threading'):
+            import gevent
+            return gevent.get_hub().threadpool.apply(fn, args)
+    except ImportError:
+        pass
+    return fn(*args)
+
+
+def render_renditions(digest):
+    """Render every width/format for one stored original and record its perceptual hash. Never upscales."""
+    with RENDER_SECONDS.time():
+        hashed = _off_hub(_render_files, digest)
+        if hashed is not None:
+            try:
+                from modules.photo_similarity import save_photo_hash
+                save_photo_hash(digest, *hashed)
+            except Exception as e:
+                logger.error(f"Hashing {digest} failed: {e}")
+    RENDERS.inc()
+
+
+class RenditionWorker:
+    """Thread pool that renders uploads off the request thread; one job per digest."""
+
+    def __init__(self, max_workers):
+        self.max_workers = max_workers
+        self._executor = None
+        self._pid = None
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        # Created lazily (and again after fork) so each gunicorn worker owns its threads
+        if self._executor is None or self._pid != os.getpid():
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='media-render')
+            self._pid = os.getpid()
+            self._jobs = {}
+        return self._executor
+
+    def submit(self, digest):
+        with self._lock:
+            job = self._jobs.get(digest)
+            if job is None or job.done():
+                job = self._pool().submit(self._run, digest)
+                self._jobs[digest] = job
+            return job
+
+    def _run(self, digest):
+        try:
+            render_renditions(digest)
+        except Exception as e:
+            RENDER_FAILURES.inc()
+            logger.error(f"Rendering {digest} failed: {e}")
+            raise
+        finally:
+            with self._lock:
+                self._jobs.pop(digest, None)
+
+    def wait(self, digest, timeout=None):
+        """Block until the digest's pending render finishes (no-op if none is queued)."""
+        with self._lock:
+            job = self._jobs.get(digest)
+        if job is not None:
+            job.result(timeout=timeout)
+
+
+rendition_worker = RenditionWorker(max_workers=app.config.get('MEDIA_WORKERS', 2))
+
+
+def ensure_rendition(digest, width, fmt, timeout=30):
+    """Path to a rendition, waiting for or running its render if needed. None if unknown."""
+    path = rendition_path(digest, width, fmt)
+    if os.path.exists(path):
+        return path
+    try:
+        rendition_worker.wait(digest, timeout=timeout)
+    except Exception:
+        pass
+    if not os.path.exists(path) and find_original(digest) is not None:
+        render_renditions(digest)
+    return path if os.path.exists(path) else None
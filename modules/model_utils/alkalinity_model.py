@@ -1,7 +1,9 @@
-import numpy as np
 import logging
 from datetime import datetime
 from modules.models import db, AlkalinityDoseModel
+from modules.utils.lazy import lazy_import
+
+np = lazy_import('numpy')
 
 logger = logging.getLogger("alkalinity_model")
 
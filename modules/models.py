@@ -10,7 +10,6 @@ from wtforms.fields import DateTimeField
 
 from flask_sqlalchemy import SQLAlchemy
 
-import numpy as np
 from datetime import datetime
 from flask import session
 
@@ -51,6 +50,42 @@ class TestResults(db.Model):
     
               
 
+class ProbeReading(db.Model):
+    """High-frequency probe samples (e.g. pH every 15s), written in batches by modules.probe_buffer."""
+    __tablename__ = 'probe_readings'
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True, autoincrement=True)
+    tank_id = db.Column(db.Integer, db.ForeignKey('tanks.id'), nullable=False)
+    probe = db.Column(db.String(16), nullable=False)
+    reading_time = db.Column(db.DateTime(3), nullable=False)
+    value = db.Column(db.Float, nullable=False)
+    __table_args__ = (
+        db.Index('ix_probe_readings_tank_probe_time', 'tank_id', 'probe', 'reading_time'),
+    )
+
+    def __repr__(self):
+        return f"<ProbeReading tank={self.tank_id} {self.probe}={self.value} @ {self.reading_time}>"
+
+
+class TestRollup(db.Model):
+    """Pre-aggregated test parameter values per tank, parameter and hour/day bucket."""
+    __tablename__ = 'test_rollups'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    tank_id = db.Column(db.Integer, db.ForeignKey('tanks.id'), nullable=False)
+    param = db.Column(db.String(16), nullable=False)
+    granularity = db.Column(db.Enum('hour', 'day'), nullable=False)
+    bucket_start = db.Column(db.DateTime, nullable=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Float, nullable=False, default=0)
+    min_value = db.Column(db.Float)
+    max_value = db.Column(db.Float)
+    __table_args__ = (
+        db.UniqueConstraint('tank_id', 'param', 'granularity', 'bucket_start', name='uq_test_rollup_bucket'),
+    )
+
+    def __repr__(self):
+        return f"<TestRollup tank={self.tank_id} {self.param} {self.granularity} {self.bucket_start}>"
+
+
 class Products(db.Model):
     __tablename__ = 'products'
 
@@ -146,6 +181,23 @@ class DSchedule(db.Model):
     def __repr__(self):
         return f"<DSchedule {self.id} (Tank {self.tank_id}, Product {self.product_id})>"
 
+class DosingRollup(db.Model):
+    """Pre-aggregated dosed volume per tank, product and hour/day bucket."""
+    __tablename__ = 'dosing_rollups'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    tank_id = db.Column(db.Integer, db.ForeignKey('tanks.id'), nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
+    granularity = db.Column(db.Enum('hour', 'day'), nullable=False)
+    bucket_start = db.Column(db.DateTime, nullable=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Float, nullable=False, default=0)
+    __table_args__ = (
+        db.UniqueConstraint('tank_id', 'product_id', 'granularity', 'bucket_start', name='uq_dosing_rollup_bucket'),
+    )
+
+    def __repr__(self):
+        return f"<DosingRollup tank={self.tank_id} product={self.product_id} {self.granularity} {self.bucket_start}>"
+
 def get_d_schedule_dict(d_schedule):
     """Helper to serialize DSchedule model to dict."""
     return {
@@ -195,6 +247,38 @@ class Coral(db.Model):
     vendor = db.relationship('Vendors', backref='corals', lazy=True)
     color_morph = db.relationship('ColorMorphs', backref='corals', lazy=True)
 
+    # Gallery filters are always tank-scoped and keyset-paged by id
+    __table_args__ = (
+        db.Index('ix_corals_tank_id_id', 'tank_id', 'id'),
+        db.Index('ix_corals_tank_health_id', 'tank_id', 'health_status', 'id'),
+        db.Index('ix_corals_tank_placement_id', 'tank_id', 'placement', 'id'),
+        db.Index('ix_corals_tank_flow_id', 'tank_id', 'flow', 'id'),
+        db.Index('ix_corals_tank_vendor_id', 'tank_id', 'vendors_id', 'id'),
+    )
+
+class PhotoHash(db.Model):
+    """Perceptual hash of a stored upload, keyed by the upload's SHA-256 (see modules/photo_similarity.py)."""
+    __tablename__ = 'photo_hashes'
+    digest = db.Column(db.String(64), primary_key=True)
+    dhash = db.Column(db.BigInteger, nullable=False)  # 64-bit dHash stored as signed
+    width = db.Column(db.Integer)
+    height = db.Column(db.Integer)
+    created_at = db.Column(db.TIMESTAMP, server_default=db.func.current_timestamp())
+
+    def __repr__(self):
+        return f"<PhotoHash {self.digest[:12]} {self.dhash & 0xFFFFFFFFFFFFFFFF:016x}>"
+
+class WebSession(db.Model):
+    """Server-side session for SESSION_BACKEND=sql (see modules/session_store.py)."""
+    __tablename__ = 'web_sessions'
+    id = db.Column(db.String(64), primary_key=True)
+    data = db.Column(db.Text, nullable=False)  # JSON
+    version = db.Column(db.Integer, nullable=False, default=1)  # bumped on every write; also in the cookie
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<WebSession {self.id[:8]} v{self.version}>"
+
 class Tank(db.Model):
     __tablename__ = 'tanks'
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
@@ -331,12 +415,14 @@ def update_alkalinity_model(tank_id, product_id, dose_history, alk_history, weig
     """
     if len(dose_history) != len(alk_history) or len(dose_history) < 2:
         raise ValueError("Need at least 2 matching dose and alk values.")
+    # numpy/sklearn are only needed here; importing them lazily keeps worker boot light
+    import numpy as np
+    from sklearn.linear_model import LinearRegression
     # Exponential weights: most recent = highest weight
     weights = np.array([weight_decay ** (len(dose_history) - i - 1) for i in range(len(dose_history))])
     X = np.array(dose_history).reshape(-1, 1)
     y = np.array(alk_history)
     # Weighted linear regression
-    from sklearn.linear_model import LinearRegression
     model = LinearRegression()
     model.fit(X, y, sample_weight=weights)
     slope = float(model.coef_[0])
@@ -0,0 +1,239 @@
+"""
+Perceptual-hash similarity search over uploaded photos.
+
+Each stored original gets a 64-bit dHash (difference hash of a 9x8 grayscale
+thumbnail). Near-identical photos - re-encodes, resizes, small crops or
+colour tweaks - land within a few bits of each other. Hashes live in the
+photo_hashes table and in a per-process BK-tree, which prunes the Hamming
+search with the triangle inequality. A radius-10 lookup touches a small
+fraction of the nodes, so it stays in the low milliseconds at tens of
+thousands of photos.
+"""
+import logging
+import threading
+import time
+
+from sqlalchemy.exc import IntegrityError
+
+from app import app, db
+
+logger = logging.getLogger("photo_similarity")
+
+HASH_BITS = 64
+DEFAULT_MAX_DISTANCE = 10
+_MASK = (1 << HASH_BITS) - 1
+
+
+def dhash(image, size=8):
+    """64-bit difference hash: one bit per horizontally adjacent pixel pair of a (size+1) x size thumbnail."""
+    from PIL import Image
+    gray = image.convert('L').resize((size + 1, size), Image.LANCZOS)
+    pixels = gray.tobytes()
+    value = 0
+    for row in range(size):
+        offset = row * (size + 1)
+        for col in range(size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hamming(a, b):
+    return (a ^ b).bit_count()
+
+
+def to_signed(value):
+    # BIGINT is signed in MySQL; store the unsigned 64-bit hash in two's complement
+    return value - (1 << HASH_BITS) if value >= 1 << (HASH_BITS - 1) else value
+
+
+def to_unsigned(value):
+    return value & _MASK
+
+
+class BKTree:
+    """Burkhard-Keller tree over 64-bit hashes with Hamming distance; each node holds every key sharing its hash."""
+
+    def __init__(self):
+        self._root = None  # [hash, [keys], {distance: child}]
+        self.size = 0
+
+    def add(self, value, key):
+        self.size += 1
+        if self._root is None:
+            self._root = [value, [key], {}]
+            return
+        node = self._root
+        while True:
+            d = hamming(value, node[0])
+            if d == 0:
+                node[1].append(key)
+                return
+            child = node[2].get(d)
+            if child is None:
+                node[2][d] = [value, [key], {}]
+                return
+            node = child
+
+    def remove(self, value, key):
+        """Drop a key. The node stays in place so the tree shape (and pruning) remains valid."""
+        node = self._root
+        while node is not None:
+            d = hamming(value, node[0])
+            if d == 0:
+                if key in node[1]:
+                    node[1].remove(key)
+                    self.size -= 1
+                return
+            node = node[2].get(d)
+
+    def search(self, value, max_distance):
+        """Return [(distance, key)] for every key within max_distance, closest first."""
+        if self._root is None:
+            return []
+        found = []
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            d = hamming(value, node[0])
+            if d <= max_distance:
+                found.extend((d, key) for key in node[1])
+            lo, hi = d - max_distance, d + max_distance
+            for edge, child in node[2].items():
+                if lo <= edge <= hi:
+                    stack.append(child)
+        found.sort()
+        return found
+
+
+class SimilarityIndex:
+    """
+    Per-process BK-tree of photo_hashes, extended as uploads are hashed here.
+
+    Uploads hashed by other worker processes are picked up by a full reload
+    every `reload_seconds`, and a digest missing from the tree is looked up
+    in the table directly, so hash_of() never misses a stored photo.
+    """
+
+    def __init__(self, reload_seconds):
+        self.reload_seconds = reload_seconds
+        self._lock = threading.Lock()
+        self._tree = None
+        self._hashes = {}
+        self._loaded_at = 0.0
+        self._loading = False
+        self._pending = None  # adds made while a reload runs, replayed onto the new tree
+        self._generation = 0
+
+    def _stale(self):
+        return self._tree is None or time.monotonic() - self._loaded_at > self.reload_seconds
+
+    def _ensure_loaded(self):
+        if not self._stale():
+            return
+        with self._lock:
+            # One reload at a time; meanwhile other callers keep using the old tree
+            if not self._stale() or (self._loading and self._tree is not None):
+                return
+            self._loading = True
+            self._pending = {}
+            generation = self._generation
+        try:
+            # Query and build without the lock; a slow table scan must not block add()/search()
+            from modules.models import PhotoHash
+            rows = db.session.query(PhotoHash.digest, PhotoHash.dhash).all()
+            tree = BKTree()
+            hashes = {}
+            for digest, value in rows:
+                value = to_unsigned(value)
+                tree.add(value, digest)
+                hashes[digest] = value
+            with self._lock:
+                if self._generation == generation:
+                    self._tree, self._hashes = tree, hashes
+                    self._loaded_at = time.monotonic()
+                    for digest, value in self._pending.items():
+                        self._add_locked(digest, value)
+        finally:
+            with self._lock:
+                self._loading = False
+                self._pending = None
+
+    def _add_locked(self, digest, value):
+        old = self._hashes.get(digest)
+        if old == value:
+            return
+        if old is not None:
+            self._tree.remove(old, digest)
+        self._tree.add(value, digest)
+        self._hashes[digest] = value
+
+    def add(self, digest, value):
+        with self._lock:
+            if self._pending is not None:
+                self._pending[digest] = value  # the running reload may have read the table before this row
+            if self._tree is not None:
+                self._add_locked(digest, value)
+
+    def hash_of(self, digest):
+        self._ensure_loaded()
+        with self._lock:
+            value = self._hashes.get(digest)
+        if value is None:
+            # Hashed by another worker since the last reload
+            from modules.models import PhotoHash
+            row = db.session.get(PhotoHash, digest)
+            if row is not None:
+                value = to_unsigned(row.dhash)
+                self.add(digest, value)
+        return value
+
+    def search(self, value, max_distance=DEFAULT_MAX_DISTANCE, exclude=None):
+        self._ensure_loaded()
+        with self._lock:
+            if self._tree is None:
+                return []  # reset() while loading
+            return [(d, key) for d, key in self._tree.search(value, max_distance) if key != exclude]
+
+    def reset(self):
+        with self._lock:
+            self._tree = None
+            self._hashes = {}
+            self._generation += 1
+
+    def __len__(self):
+        return self._tree.size if self._tree is not None else 0
+
+
+similarity_index = SimilarityIndex(reload_seconds=app.config.get('SIMILARITY_RELOAD_SECONDS', 300))
+
+
+def record_photo_hash(digest, image):
+    """Hash an opened original and persist it. Safe to call from worker threads."""
+    value = dhash(image)
+    save_photo_hash(digest, value, image.width, image.height)
+    return value
+
+
+def save_photo_hash(digest, value, width, height):
+    """Persist an already computed hash and add it to this process's index."""
+    from modules.models import PhotoHash
+    with app.app_context():
+        row = db.session.get(PhotoHash, digest)
+        if row is None:
+            db.session.add(PhotoHash(digest=digest, dhash=to_signed(value), width=width, height=height))
+        else:
+            row.dhash = to_signed(value)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Another worker hashed the same upload first
+            db.session.rollback()
+    similarity_index.add(digest, value)
+
+
+def similar_photos(digest, max_distance=DEFAULT_MAX_DISTANCE, limit=20):
+    """[(distance, digest)] for stored photos that look like `digest`, closest first (None if unhashed)."""
+    value = similarity_index.hash_of(digest)
+    if value is None:
+        return None
+    return similarity_index.search(value, max_distance, exclude=digest)[:limit]
@@ -0,0 +1,223 @@
+"""
+In-memory buffer for probe readings.
+
+Readings are queued per worker and written with multi-row INSERTs once
+PROBE_FLUSH_ROWS are pending or PROBE_FLUSH_SECONDS have passed. The queue is
+bounded by PROBE_BUFFER_SIZE; when it is full, submit() rejects the whole batch
+so the caller can apply back-pressure (HTTP 503 + Retry-After) instead of the
+worker growing without limit.
+
+If a flush fails because the database is unreachable the batch is put back
+and retried later. Any other failure (a row the database refuses) retries the
+batch row by row and moves the rows that still fail to a bounded dead-letter
+list, so one bad reading cannot block the queue forever.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import deque
+
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import insert
+from sqlalchemy.exc import OperationalError
+
+from app import app, db
+from modules.models import ProbeReading
+
+logger = logging.getLogger("probe_buffer")
+
+BUFFER_DEPTH = Gauge('probe_buffer_depth', 'Probe readings waiting to be flushed')
+READINGS_ACCEPTED = Counter('probe_readings_accepted_total', 'Probe readings accepted into the buffer')
+READINGS_REJECTED = Counter('probe_readings_rejected_total', 'Probe readings rejected because the buffer was full')
+READINGS_FLUSHED = Counter('probe_readings_flushed_total', 'Probe readings written to the database')
+FLUSH_FAILURES = Counter('probe_flush_failures_total', 'Failed probe buffer flushes')
+READINGS_DEAD_LETTERED = Counter('probe_readings_dead_lettered_total', 'Probe readings the database refused to store')
+FLUSH_SECONDS = Histogram('probe_flush_seconds', 'Time spent writing one probe buffer flush')
+
+
+class BufferFull(Exception):
+    """Raised when a batch does not fit in the probe buffer."""
+
+
+class ProbeBuffer:
+    def __init__(self, max_size, flush_rows, flush_seconds, dead_letter_size=1000):
+        self.max_size = max_size
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self._queue = deque()
+        self.dead_letters = deque(maxlen=dead_letter_size)  # (row, error), oldest dropped first
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._last_flush = time.monotonic()
+        self.accepted = 0
+        self.rejected = 0
+        self.flushed = 0
+        self.flushes = 0
+        self.failures = 0
+        self.dead_lettered = 0
+        self.last_flush_seconds = None
+
+    def __len__(self):
+        return len(self._queue)
+
+    def submit(self, rows):
+        """
+        Queue a batch of readings (dicts with tank_id, probe, reading_time, value).
+        All-or-nothing: raises BufferFull if the batch does not fit.
+        """
+        with self._cond:
+            if len(self._queue) + len(rows) > self.max_size:
+                self.rejected += len(rows)
+                READINGS_REJECTED.inc(len(rows))
+                raise BufferFull(f"Probe buffer full ({len(self._queue)}/{self.max_size})")
+            self._queue.extend(rows)
+            self.accepted += len(rows)
+            READINGS_ACCEPTED.inc(len(rows))
+            BUFFER_DEPTH.set(len(self._queue))
+            if len(self._queue) >= self.flush_rows:
+                self._cond.notify()
+        self._ensure_worker()
+        return len(rows)
+
+    def flush(self):
+        """Write everything queued so far in multi-row inserts. Returns rows written."""
+        with self._flush_lock:
+            with self._cond:
+                rows = list(self._queue)
+                self._queue.clear()
+            self._last_flush = time.monotonic()
+            if not rows:
+                return 0
+            started = time.perf_counter()
+            pending = deque(rows)
+            try:
+                with app.app_context():
+                    try:
+                        self._insert(rows)
+                        self._count_written(len(rows))
+                        written = len(rows)
+                    except OperationalError:
+                        db.session.rollback()
+                        raise
+                    except Exception as e:
+                        db.session.rollback()
+                        self.failures += 1
+                        FLUSH_FAILURES.inc()
+                        logger.warning(f"Probe buffer flush of {len(rows)} rows failed ({e}); retrying row by row")
+                        written = self._insert_each(pending)
+            except OperationalError as e:
+                # Database unreachable: keep the unwritten rows and try again on the next flush.
+                # Rows committed before the failure were already counted by _insert_each.
+                self.failures += 1
+                FLUSH_FAILURES.inc()
+                logger.error(f"Probe buffer flush failed with {len(pending)} of {len(rows)} rows unwritten: {e}")
+                rows = list(pending)
+                with self._cond:
+                    # Put the rows back in front, dropping the oldest if new ones filled the gap
+                    room = self.max_size - len(self._queue)
+                    if room < len(rows):
+                        self.rejected += len(rows) - room
+                        READINGS_REJECTED.inc(len(rows) - room)
+                        rows = rows[len(rows) - room:] if room > 0 else []
+                    self._queue.extendleft(reversed(rows))
+                    BUFFER_DEPTH.set(len(self._queue))
+                raise
+            elapsed = time.perf_counter() - started
+            self.flushes += 1
+            self.last_flush_seconds = elapsed
+            FLUSH_SECONDS.observe(elapsed)
+            BUFFER_DEPTH.set(len(self._queue))
+            return written
+
+    def _count_written(self, n):
+        self.flushed += n
+        READINGS_FLUSHED.inc(n)
+
+    def _insert(self, rows):
+        for i in range(0, len(rows), self.flush_rows):
+            db.session.execute(insert(ProbeReading), rows[i:i + self.flush_rows])
+        db.session.commit()
+
+    def _insert_each(self, pending):
+        """
+        Insert rows one at a time, dead-lettering the ones the database refuses.
+        Consumes `pending` from the left and counts each row as it commits, so on
+        OperationalError `pending` holds exactly the rows not yet handled and the
+        rows already written are in `flushed`. Returns the number of rows written.
+        """
+        written = 0
+        while pending:
+            row = pending[0]
+            try:
+                db.session.execute(insert(ProbeReading), [row])
+                db.session.commit()
+            except OperationalError:
+                db.session.rollback()
+                raise
+            except Exception as e:
+                db.session.rollback()
+                self.dead_letters.append((row, str(e)))
+                self.dead_lettered += 1
+                READINGS_DEAD_LETTERED.inc()
+                logger.error(f"Probe reading dead-lettered: {row} ({e})")
+            else:
+                written += 1
+                self._count_written(1)
+            pending.popleft()
+        return written
+
+    def stats(self):
+        return {
+            'depth': len(self._queue),
+            'capacity': self.max_size,
+            'utilization': len(self._queue) / self.max_size if self.max_size else None,
+            'accepted': self.accepted,
+            'rejected': self.rejected,
+            'flushed': self.flushed,
+            'flushes': self.flushes,
+            'failures': self.failures,
+            'dead_lettered': self.dead_lettered,
+            'last_flush_seconds': self.last_flush_seconds,
+            'flush_rows': self.flush_rows,
+            'flush_seconds': self.flush_seconds,
+        }
+
+    def _ensure_worker(self):
+        # Started lazily so each forked gunicorn worker gets its own flusher
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='probe-buffer-flush', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                due = self._last_flush + self.flush_seconds
+                while len(self._queue) < self.flush_rows and time.monotonic() < due:
+                    self._cond.wait(timeout=max(0.0, due - time.monotonic()))
+            try:
+                self.flush()
+            except Exception:
+                # Already logged and requeued; back off before retrying
+                time.sleep(self.flush_seconds)
+
+
+probe_buffer = ProbeBuffer(
+    max_size=app.config['PROBE_BUFFER_SIZE'],
+    flush_rows=app.config['PROBE_FLUSH_ROWS'],
+    flush_seconds=app.config['PROBE_FLUSH_SECONDS'],
+    dead_letter_size=app.config['PROBE_DEAD_LETTER_SIZE'],
+)
+
+
+@atexit.register
+def _flush_on_exit():
+    try:
+        probe_buffer.flush()
+    except Exception:
+        pass
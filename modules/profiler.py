@@ -0,0 +1,243 @@
+"""
+Opt-in sampling profiler.
+
+A sampler runs in a real OS thread (also under gevent's monkey patching). It
+reads sys._current_frames() every PROFILER_INTERVAL_MS and counts the
+collapsed stacks. The output is the "collapsed" text format that
+flamegraph.pl, speedscope and inferno read:
+
+    app.routes.web.table_ops.get_table_data;modules.utils.helper.datatables_response 42
+
+Two ways to use it, both gated by PROFILER_TOKEN (sent as the
+X-Profile-Token header or a `token` argument):
+
+* Per request: append ?__profile=1 to any URL. The response body is
+  replaced by the collapsed stacks of that request (&__profile_format=json
+  for JSON). Sync workers sample the request's OS thread. Under gevent every
+  request shares the hub's thread, so the sampler follows the request's
+  greenlet instead: its live frame while it runs, gr_frame while it waits.
+  X-Profile-Mode says which was used.
+* Whole worker: POST /api/v1/profiler/start?seconds=20 samples every
+  thread of this process for up to PROFILER_MAX_SECONDS. Fetch the result
+  with GET /api/v1/profiler/result.
+
+When PROFILER_TOKEN is empty nothing is sampled, and the only cost is one
+request.args membership test per request.
+"""
+import _thread
+import hmac
+import os
+import sys
+import time
+from collections import Counter
+
+from flask import Response, current_app, jsonify, request
+
+PROFILE_ARG = '__profile'
+
+
+def _real_threading():
+    """start_new_thread / sleep / get_ident that bypass gevent's monkey patching."""
+    try:
+        from gevent import monkey
+        if monkey.is_module_patched('threading'):
+            return (
+                monkey.get_original('_thread', 'start_new_thread'),
+                monkey.get_original('time', 'sleep'),
+                monkey.get_original('_thread', 'get_ident'),
+                monkey.get_original('_thread', 'allocate_lock'),
+            )
+    except ImportError:
+        pass
+    return _thread.start_new_thread, time.sleep, _thread.get_ident, _thread.allocate_lock
+
+
+_start_thread, _sleep, _get_ident, _allocate_lock = _real_threading()
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    module = frame.f_globals.get('__name__') or os.path.basename(code.co_filename)
+    return f"{module}.{getattr(code, 'co_qualname', code.co_name)}"
+
+
+def collapse(frame):
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+
+class Profile:
+    def __init__(self, stacks, samples, interval, started, finished):
+        self.stacks = stacks
+        self.samples = samples
+        self.interval = interval
+        self.started = started
+        self.finished = finished
+
+    def collapsed(self):
+        return '\n'.join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + '\n'
+
+    def to_dict(self, top=None):
+        return {
+            'samples': self.samples,
+            'interval_ms': self.interval * 1000,
+            'duration_seconds': round(self.finished - self.started, 3),
+            'stacks': [{'stack': s, 'count': c} for s, c in self.stacks.most_common(top)],
+        }
+
+
+class Sampler:
+    """
+    Samples the given OS threads (or all but itself) until stopped or max_seconds elapse.
+    With `greenlet` (and its OS thread in thread_ids) only that greenlet's stack is counted.
+    """
+
+    def __init__(self, interval, max_seconds, thread_ids=None, greenlet=None):
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.thread_ids = set(thread_ids) if thread_ids else None
+        self.greenlet = greenlet
+        self.stacks = Counter()
+        self.samples = 0
+        self.started = None
+        self.finished = None
+        self._stop = False
+        self._lock = _allocate_lock()
+        self._ident = None
+
+    @property
+    def running(self):
+        return self.started is not None and self.finished is None
+
+    def start(self):
+        self.started = time.monotonic()
+        _start_thread(self._run, ())
+        return self
+
+    def _run(self):
+        self._ident = _get_ident()
+        deadline = self.started + self.max_seconds
+        try:
+            while not self._stop and time.monotonic() < deadline:
+                frames = sys._current_frames()
+                with self._lock:
+                    if self.greenlet is not None:
+                        frame = self._greenlet_frame(frames)
+                        if frame is not None:
+                            self.stacks[collapse(frame)] += 1
+                    else:
+                        for tid, frame in frames.items():
+                            if tid == self._ident or (self.thread_ids is not None and tid not in self.thread_ids):
+                                continue
+                            self.stacks[collapse(frame)] += 1
+                    self.samples += 1
+                    frame = None
+                del frames
+                _sleep(self.interval)
+        finally:
+            self.finished = time.monotonic()
+
+    def _greenlet_frame(self, frames):
+        g = self.greenlet
+        if g.dead:
+            return None
+        # gr_frame is None only while the greenlet is the one running on its thread
+        frame = g.gr_frame
+        if frame is None and self.thread_ids:
+            for tid in self.thread_ids:
+                frame = frames.get(tid)
+        return frame
+
+    def stop(self):
+        self._stop = True
+        with self._lock:
+            return Profile(Counter(self.stacks), self.samples, self.interval, self.started,
+                           self.finished or time.monotonic())
+
+    def result(self):
+        with self._lock:
+            return Profile(Counter(self.stacks), self.samples, self.interval, self.started,
+                           self.finished or time.monotonic())
+
+
+class WorkerProfiler:
+    """At most one time-boxed whole-process sampling run per worker."""
+
+    def __init__(self):
+        self._sampler = None
+        self._lock = _allocate_lock()
+
+    def start(self, seconds, interval):
+        with self._lock:
+            if self._sampler is not None and self._sampler.running:
+                return None
+            self._sampler = Sampler(interval, seconds).start()
+            return self._sampler
+
+    def status(self):
+        sampler = self._sampler
+        if sampler is None:
+            return None, None
+        return sampler.running, sampler.result()
+
+
+worker_profiler = WorkerProfiler()
+
+
+def authorized():
+    """True if profiling is enabled and the request carries the right token."""
+    expected = current_app.config.get('PROFILER_TOKEN') or ''
+    if not expected:
+        return False
+    given = request.headers.get('X-Profile-Token') or request.args.get('token') or ''
+    return hmac.compare_digest(given.encode(), expected.encode())
+
+
+def _interval():
+    return max(current_app.config.get('PROFILER_INTERVAL_MS', 5), 1) / 1000
+
+
+def _request_greenlet():
+    """The current greenlet when gevent has patched threading (requests share one OS thread), else None."""
+    try:
+        from gevent import monkey
+        if not monkey.is_module_patched('threading'):
+            return None
+        import greenlet
+    except ImportError:
+        return None
+    return greenlet.getcurrent()
+
+
+def _start_request_profile():
+    if PROFILE_ARG not in request.args or not authorized():
+        return
+    request.environ['reef.profiler'] = Sampler(
+        _interval(), current_app.config.get('PROFILER_MAX_SECONDS', 60), thread_ids=[_get_ident()],
+        greenlet=_request_greenlet(),
+    ).start()
+
+
+def _finish_request_profile(response):
+    sampler = request.environ.pop('reef.profiler', None)
+    if sampler is None:
+        return response
+    profile = sampler.stop()
+    status = response.status_code
+    if request.args.get('__profile_format') == 'json':
+        out = jsonify(dict(profile.to_dict(), endpoint=request.endpoint, status=status))
+    else:
+        out = Response(profile.collapsed(), mimetype='text/plain')
+    out.headers['X-Profile-Samples'] = str(profile.samples)
+    out.headers['X-Profile-Mode'] = 'thread' if sampler.greenlet is None else 'greenlet'
+    out.headers['X-Profile-Status'] = str(status)
+    out.headers['Cache-Control'] = 'no-store'
+    return out
+
+
+def init_profiler(app):
+    app.before_request(_start_request_profile)
+    app.after_request(_finish_request_profile)
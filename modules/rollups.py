@@ -0,0 +1,322 @@
+"""
+Hourly/daily rollups of test parameters and dosed volume.
+
+Rollups are updated incrementally in the same transaction as the raw insert,
+so dashboards (Grafana) read a handful of pre-aggregated rows instead of
+scanning test_results/dosing. When raw rows are edited or deleted,
+`refresh_days` recomputes the affected days from raw data, and
+`rebuild_rollups` recomputes everything for backfills.
+
+A dose counts toward the tank of its schedule. Doses without a schedule
+cannot be attributed to a tank (dosing has no tank column), so they are
+left out of the rollups on every path.
+"""
+import logging
+from datetime import datetime, date, time, timedelta
+
+from sqlalchemy import case, select, update, delete, insert
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from modules.models import TestResults, Dosing, DSchedule, TestRollup, DosingRollup
+from modules.utils.timeseries import TEST_PARAMETERS, to_epoch_ms
+
+logger = logging.getLogger("rollups")
+
+GRANULARITIES = ('hour', 'day')
+GRANULARITY_SECONDS = {'hour': 3600, 'day': 86400}
+
+
+def truncate(dt, granularity):
+    """Return the start of the hour/day bucket containing dt."""
+    if granularity == 'hour':
+        return dt.replace(minute=0, second=0, microsecond=0)
+    return dt.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _bump(model, key, value, track_extremes, session=None):
+    """Add one value to the bucket identified by key, creating the bucket if needed."""
+    session = session or db.session
+    where = [getattr(model, k) == v for k, v in key.items()]
+    values = {'count': model.count + 1, 'total': model.total + value}
+    if track_extremes:
+        values['min_value'] = case((model.min_value > value, value), else_=model.min_value)
+        values['max_value'] = case((model.max_value < value, value), else_=model.max_value)
+    row = dict(key, count=1, total=value)
+    if track_extremes:
+        row.update(min_value=value, max_value=value)
+    # A failed bump only rolls back its own savepoint, never the caller's raw insert
+    try:
+        with session.begin_nested():
+            if session.execute(update(model).where(*where).values(**values)).rowcount:
+                return
+            session.execute(insert(model).values(**row))
+    except IntegrityError:
+        # Another worker created the bucket between our update and insert
+        with session.begin_nested():
+            session.execute(update(model).where(*where).values(**values))
+
+
+def _fold_test(buckets, tank_id, taken_at, values):
+    """Add one test result's (param, value) pairs to in-memory hour/day buckets."""
+    for param, value in values:
+        if value is None or value != value:
+            continue
+        for granularity in GRANULARITIES:
+            key = (tank_id, param, granularity, truncate(taken_at, granularity))
+            agg = buckets.get(key)
+            if agg is None:
+                buckets[key] = [1, value, value, value]
+            else:
+                agg[0] += 1
+                agg[1] += value
+                agg[2] = min(agg[2], value)
+                agg[3] = max(agg[3], value)
+
+
+def _fold_dose(buckets, tank_id, product_id, trigger_time, amount):
+    if not product_id or trigger_time is None or amount is None:
+        return
+    for granularity in GRANULARITIES:
+        key = (tank_id, product_id, granularity, truncate(trigger_time, granularity))
+        agg = buckets.setdefault(key, [0, 0.0])
+        agg[0] += 1
+        agg[1] += amount
+
+
+def _write_buckets(test_buckets, dose_buckets, batch_size=5000, session=None):
+    session = session or db.session
+    test_rows = [
+        {'tank_id': k[0], 'param': k[1], 'granularity': k[2], 'bucket_start': k[3],
+         'count': v[0], 'total': v[1], 'min_value': v[2], 'max_value': v[3]}
+        for k, v in test_buckets.items()
+    ]
+    dose_rows = [
+        {'tank_id': k[0], 'product_id': k[1], 'granularity': k[2], 'bucket_start': k[3],
+         'count': v[0], 'total': v[1]}
+        for k, v in dose_buckets.items()
+    ]
+    for i in range(0, len(test_rows), batch_size):
+        session.execute(insert(TestRollup), test_rows[i:i + batch_size])
+    for i in range(0, len(dose_rows), batch_size):
+        session.execute(insert(DosingRollup), dose_rows[i:i + batch_size])
+
+
+def dose_tank(schedule_id, session=None):
+    """The tank a dose counts toward: its schedule's tank (None for unscheduled doses)."""
+    if not schedule_id:
+        return None
+    session = session or db.session
+    return session.execute(select(DSchedule.tank_id).where(DSchedule.id == schedule_id)).scalar()
+
+
+def record_test_result(tank_id, test_date, test_time, values, session=None):
+    """
+    Fold a newly inserted test result into the rollups. Does not commit.
+
+    :param values: dict of parameter name -> value (unknown keys/None are ignored)
+    :param session: session of the raw insert (default db.session)
+    """
+    if not tank_id or not test_date:
+        return
+    try:
+        if isinstance(test_date, str):
+            test_date = date.fromisoformat(test_date)
+        if isinstance(test_time, str):
+            test_time = time.fromisoformat(test_time)
+        taken_at = datetime.combine(test_date, test_time or time.min)
+        for param in TEST_PARAMETERS:
+            value = values.get(param)
+            if value is None or value == '':
+                continue
+            for granularity in GRANULARITIES:
+                _bump(TestRollup, {
+                    'tank_id': tank_id,
+                    'param': param,
+                    'granularity': granularity,
+                    'bucket_start': truncate(taken_at, granularity),
+                }, float(value), track_extremes=True, session=session)
+    except Exception as e:
+        # Never fail the raw insert because of a rollup; `flask rollups rebuild` repairs them
+        logger.warning(f"Failed to update test rollups for tank {tank_id}: {e}")
+
+
+def record_dose(schedule_id, product_id, trigger_time, amount):
+    """Fold a newly inserted dose into its schedule's tank rollups. Does not commit."""
+    tank_id = dose_tank(schedule_id)
+    if not tank_id or not product_id or amount is None or trigger_time is None:
+        return
+    try:
+        if isinstance(trigger_time, str):
+            trigger_time = datetime.fromisoformat(trigger_time)
+        for granularity in GRANULARITIES:
+            _bump(DosingRollup, {
+                'tank_id': tank_id,
+                'product_id': product_id,
+                'granularity': granularity,
+                'bucket_start': truncate(trigger_time, granularity),
+            }, float(amount), track_extremes=False)
+    except Exception as e:
+        logger.warning(f"Failed to update dosing rollups for tank {tank_id}: {e}")
+
+
+def record_insert(table_class, data):
+    """Dispatch a generic table insert (see db_functions.create_row) to the matching rollup."""
+    if table_class is TestResults:
+        record_test_result(data.get('tank_id'), data.get('test_date'), data.get('test_time'), data)
+    elif table_class is Dosing:
+        record_dose(data.get('schedule_id'), data.get('product_id'), data.get('trigger_time'), data.get('amount'))
+
+
+def affected_days(row, session=None):
+    """
+    The rollup days a raw row contributes to, as ('test'|'dose', tank_id, date) keys.
+    Collect them before and after editing or deleting the row, then pass them to refresh_days.
+    """
+    if isinstance(row, TestResults):
+        test_date = row.test_date
+        if isinstance(test_date, str):
+            test_date = date.fromisoformat(test_date)
+        if row.tank_id and test_date:
+            return [('test', row.tank_id, test_date)]
+    elif isinstance(row, Dosing):
+        trigger_time = row.trigger_time
+        if isinstance(trigger_time, str):
+            trigger_time = datetime.fromisoformat(trigger_time)
+        tank_id = dose_tank(row.schedule_id, session)
+        if tank_id and trigger_time is not None:
+            return [('dose', tank_id, trigger_time.date())]
+    return []
+
+
+def refresh_days(days, session=None):
+    """
+    Recompute the hour and day rollups of the given affected_days() keys from raw
+    rows (and archived test results). Flush pending raw changes first. Does not commit.
+
+    Example usage:
+        days = rollups.affected_days(row)
+        db.session.delete(row)
+        db.session.flush()
+        rollups.refresh_days(days)
+    """
+    session = session or db.session
+    from modules import archive
+    for kind, tank_id, day in set(days):
+        start = datetime.combine(day, time.min)
+        end = start + timedelta(days=1)
+        test_buckets, dose_buckets = {}, {}
+        if kind == 'test':
+            rows = session.execute(
+                select(TestResults.test_time, *[getattr(TestResults, p) for p in TEST_PARAMETERS])
+                .where(TestResults.tank_id == tank_id, TestResults.test_date == day)
+            )
+            for row in rows:
+                _fold_test(test_buckets, tank_id, datetime.combine(day, row[0] or time.min),
+                           zip(TEST_PARAMETERS, row[1:]))
+            ts, values = archive.read_range(archive.TEST_SOURCE, tank_id, list(TEST_PARAMETERS),
+                                            to_epoch_ms(start), to_epoch_ms(end) - 1)
+            for i, t in enumerate(ts.tolist()):
+                _fold_test(test_buckets, tank_id, datetime.utcfromtimestamp(t / 1000),
+                           ((p, values[p][i]) for p in TEST_PARAMETERS))
+            session.execute(delete(TestRollup).where(
+                TestRollup.tank_id == tank_id, TestRollup.bucket_start >= start, TestRollup.bucket_start < end,
+            ))
+        else:
+            doses = session.execute(
+                select(Dosing.product_id, Dosing.trigger_time, Dosing.amount)
+                .join(DSchedule, Dosing.schedule_id == DSchedule.id)
+                .where(DSchedule.tank_id == tank_id, Dosing.trigger_time >= start, Dosing.trigger_time < end)
+            )
+            for product_id, trigger_time, amount in doses:
+                _fold_dose(dose_buckets, tank_id, product_id, trigger_time, amount)
+            session.execute(delete(DosingRollup).where(
+                DosingRollup.tank_id == tank_id, DosingRollup.bucket_start >= start, DosingRollup.bucket_start < end,
+            ))
+        _write_buckets(test_buckets, dose_buckets, session=session)
+
+
+def rebuild_rollups(batch_size=5000):
+    """
+    Recompute all rollups from raw test_results and dosing rows, then commit.
+    Raw rows are streamed and aggregated in memory, then written back in bulk.
+    """
+    test_buckets = {}
+    tests = db.session.execute(
+        select(TestResults.tank_id, TestResults.test_date, TestResults.test_time,
+               *[getattr(TestResults, p) for p in TEST_PARAMETERS])
+        .execution_options(yield_per=batch_size)
+    )
+    n_tests = 0
+    for row in tests:
+        n_tests += 1
+        if not row[0] or not row[1]:
+            continue
+        _fold_test(test_buckets, row[0], datetime.combine(row[1], row[2] or time.min),
+                   zip(TEST_PARAMETERS, row[3:]))
+
+    # Rows moved to the columnar archive still belong in the rollups
+    from modules import archive
+    for tank_id in archive.archived_tanks(archive.TEST_SOURCE):
+        ts, values = archive.read_range(archive.TEST_SOURCE, tank_id, list(TEST_PARAMETERS))
+        for i, t in enumerate(ts.tolist()):
+            n_tests += 1
+            _fold_test(test_buckets, tank_id, datetime.utcfromtimestamp(t / 1000),
+                       ((p, values[p][i]) for p in TEST_PARAMETERS))
+
+    dose_buckets = {}
+    doses = db.session.execute(
+        select(DSchedule.tank_id, Dosing.product_id, Dosing.trigger_time, Dosing.amount)
+        .join(DSchedule, Dosing.schedule_id == DSchedule.id)
+        .execution_options(yield_per=batch_size)
+    )
+    n_doses = 0
+    for tank_id, product_id, trigger_time, amount in doses:
+        n_doses += 1
+        _fold_dose(dose_buckets, tank_id, product_id, trigger_time, amount)
+
+    db.session.execute(delete(TestRollup))
+    db.session.execute(delete(DosingRollup))
+    _write_buckets(test_buckets, dose_buckets, batch_size)
+    db.session.commit()
+    logger.info(f"Rebuilt rollups from {n_tests} test results and {n_doses} doses")
+    return n_tests, n_doses
+
+
+def pick_granularity(start, end, max_points):
+    """Use hourly buckets when they fit in max_points, otherwise daily."""
+    span = (end - start).total_seconds()
+    if span / GRANULARITY_SECONDS['hour'] <= max_points:
+        return 'hour'
+    return 'day'
+
+
+def get_test_series(tank_id, param, granularity, start, end):
+    """Return [(bucket_start, count, total, min, max)] rollup rows in [start, end]."""
+    return db.session.execute(
+        select(TestRollup.bucket_start, TestRollup.count, TestRollup.total,
+               TestRollup.min_value, TestRollup.max_value)
+        .where(
+            TestRollup.tank_id == tank_id,
+            TestRollup.param == param,
+            TestRollup.granularity == granularity,
+            TestRollup.bucket_start >= truncate(start, granularity),
+            TestRollup.bucket_start <= end,
+        )
+        .order_by(TestRollup.bucket_start)
+    ).all()
+
+
+def get_dose_series(tank_id, product_id, granularity, start, end):
+    """Return [(bucket_start, count, total)] rollup rows in [start, end]."""
+    return db.session.execute(
+        select(DosingRollup.bucket_start, DosingRollup.count, DosingRollup.total)
+        .where(
+            DosingRollup.tank_id == tank_id,
+            DosingRollup.product_id == product_id,
+            DosingRollup.granularity == granularity,
+            DosingRollup.bucket_start >= truncate(start, granularity),
+            DosingRollup.bucket_start <= end,
+        )
+        .order_by(DosingRollup.bucket_start)
+    ).all()
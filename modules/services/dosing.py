@@ -0,0 +1,149 @@
+"""
+Dosing domain operations: create products, schedules and doses.
+
+Used directly by the HTTP routes (/web/fn/ops/new/<table>, /doser/submit)
+instead of routes calling each other through a test client. Functions add
+and flush rows in the current session but never commit, so a caller can
+combine several steps (e.g. a new product plus its schedule) into one
+transaction:
+
+    with unit_of_work():
+        product = create_product({'name': 'Alk', 'total_volume': 4000})
+        create_schedule(tank_id, {'product_id': product.id, 'amount': 5, 'trigger_interval': 3600})
+
+Invalid input raises ServiceError, which carries the HTTP status the route
+should answer with.
+"""
+from contextlib import contextmanager
+from datetime import datetime
+
+from app import db
+from modules import rollups
+from modules.models import DSchedule, Dosing, Products
+from modules.utils.helper import process_dosing_data, process_product_data, process_schedule_data
+
+
+class ServiceError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+@contextmanager
+def unit_of_work():
+    """Commit when the block succeeds, roll back (and re-raise) when it fails."""
+    try:
+        yield db.session
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def _columns(model, data):
+    names = model.__table__.columns.keys()
+    return {k: v for k, v in data.items() if k in names and k != 'id'}
+
+
+def create_product(data):
+    values = _columns(Products, process_product_data(data))
+    if not values.get('name'):
+        raise ServiceError('Product name is required')
+    product = Products(**values)
+    db.session.add(product)
+    db.session.flush()
+    return product
+
+
+def create_schedule(tank_id, data):
+    values = _columns(DSchedule, process_schedule_data(dict(data, tank_id=tank_id)))
+    missing = [f for f in ('tank_id', 'product_id', 'amount', 'trigger_interval') if values.get(f) is None]
+    if missing:
+        raise ServiceError(f"Missing required fields for schedule: {', '.join(missing)}")
+    exists = db.session.query(DSchedule.id).filter_by(
+        product_id=values['product_id'], tank_id=values['tank_id']
+    ).first()
+    if exists:
+        raise ServiceError('A schedule already exists for this tank and product.')
+    if values.get('suspended') is None:
+        values['suspended'] = False
+    schedule = DSchedule(**values)
+    db.session.add(schedule)
+    db.session.flush()
+    return schedule
+
+
+def _parse_time(value):
+    if value is None or isinstance(value, datetime):
+        return value
+    for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%dT%H:%M', '%Y-%m-%d %H:%M', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    raise ServiceError(f"Invalid dose time '{value}'")
+
+
+def create_dose(tank_id, data):
+    """
+    Record one dose. The time may be given as trigger_time or _time (the form field).
+    tank_id is not a dosing column; the rollups count a dose toward its schedule's
+    tank, so doses without a schedule_id are not rolled up (see modules.rollups).
+    """
+    raw_time = data.get('trigger_time') or data.get('_time')
+    values = process_dosing_data({k: v for k, v in data.items() if k not in ('_time', 'trigger_time')})
+    values = _columns(Dosing, values)
+    values['trigger_time'] = _parse_time(raw_time)
+    missing = [f for f in ('amount', 'product_id') if values.get(f) is None]
+    if missing:
+        raise ServiceError(f"Missing required fields for dose: {', '.join(missing)}")
+    dose = Dosing(**values)
+    db.session.add(dose)
+    db.session.flush()
+    rollups.record_dose(dose.schedule_id, dose.product_id, dose.trigger_time, dose.amount)
+    return dose
+
+
+def submit_doser_form(tank_id, data):
+    """
+    The /doser/submit form: optionally a new product, then a recurring schedule or a
+    single/intermittent dose, all in one transaction. Returns (row, product_or_None).
+    """
+    form_type = data.get('form_type')
+    if not form_type:
+        raise ServiceError('Missing form_type')
+    if form_type not in ('recurring', 'single', 'intermittent'):
+        raise ServiceError('Unknown form_type')
+    data = dict(data)
+    if 'schedule_time' in data:
+        data['_time'] = data.pop('schedule_time')
+
+    with unit_of_work():
+        product = None
+        if data.get('product_id') == 'add_new_product':
+            product = create_product(data)
+            data['product_id'] = product.id
+        if not data.get('product_id'):
+            raise ServiceError('Product ID is required')
+
+        if form_type == 'recurring':
+            missing = [f for f in ('amount', 'product_id', 'trigger_interval', '_time') if not data.get(f)]
+            if missing:
+                raise ServiceError(f"Missing required fields for recurring: {', '.join(missing)}")
+            row = create_schedule(tank_id, {
+                'amount': data['amount'],
+                'product_id': data['product_id'],
+                'trigger_interval': data['trigger_interval'],
+                'suspended': data.get('suspended', False),
+            })
+        else:
+            missing = [f for f in ('amount', 'product_id', '_time') if not data.get(f)]
+            if missing:
+                raise ServiceError(f"Missing required fields for {form_type}: {', '.join(missing)}")
+            row = create_dose(tank_id, {
+                'amount': data['amount'],
+                'product_id': data['product_id'],
+                '_time': data['_time'],
+            })
+    return row, product
@@ -0,0 +1,237 @@
+"""
+Session backends with an in-process LRU front cache.
+
+SESSION_BACKEND selects how the (small) session - mostly tank_id - is kept:
+
+* cookie      signed cookie (Flask's own format). Decoded payloads are cached by
+              cookie value, so repeat requests skip the HMAC check and JSON decode.
+* sql         server-side rows in web_sessions. The cookie carries a signed
+              "<sid>.<version>". The LRU is keyed by (sid, version), so a hit
+              can never be stale, even when another host wrote the session.
+* filesystem  the previous Flask-Session directory store, kept for compatibility.
+
+Neither cached backend writes anything (cookie, row or file) unless the view
+changed the session. Expired web_sessions rows are removed by
+`flask sessions purge`.
+"""
+import copy
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from flask.sessions import SecureCookieSessionInterface, SessionInterface, SessionMixin
+from itsdangerous import BadSignature, Signer
+from prometheus_client import Counter
+from werkzeug.datastructures import CallbackDict
+
+SESSION_CACHE_HITS = Counter('session_cache_hits_total', 'Sessions served from the in-process cache', ['backend'])
+SESSION_CACHE_MISSES = Counter('session_cache_misses_total', 'Sessions decoded or loaded from the store', ['backend'])
+SESSION_WRITES = Counter('session_writes_total', 'Sessions persisted because they changed', ['backend'])
+
+BACKENDS = ('cookie', 'sql', 'filesystem')
+
+
+class LRUCache:
+    """Thread-safe LRU mapping with a per-entry deadline (monotonic seconds)."""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, deadline = item
+            if deadline < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class CachedCookieSessionInterface(SecureCookieSessionInterface):
+    """Flask's signed-cookie sessions, with decoded payloads cached by cookie value."""
+
+    def __init__(self, cache_size, cache_seconds):
+        self.cache = LRUCache(cache_size)
+        self.cache_seconds = cache_seconds
+
+    def open_session(self, app, request):
+        val = request.cookies.get(self.get_cookie_name(app))
+        if not val:
+            return self.session_class()
+        data = self.cache.get(val)
+        if data is not None:
+            SESSION_CACHE_HITS.labels('cookie').inc()
+            # Copy so in-place edits in a view never leak into the cache
+            return self.session_class(copy.deepcopy(data))
+        SESSION_CACHE_MISSES.labels('cookie').inc()
+        s = self.get_signing_serializer(app)
+        if s is None:
+            return None
+        max_age = int(app.permanent_session_lifetime.total_seconds())
+        try:
+            data, signed_at = s.loads(val, max_age=max_age, return_timestamp=True)
+        except BadSignature:
+            return self.session_class()
+        # Never serve a cookie from cache past the point where its signature expires
+        remaining = max_age - (datetime.now(timezone.utc) - signed_at).total_seconds()
+        self.cache.set(val, copy.deepcopy(data), min(self.cache_seconds, remaining))
+        return self.session_class(data)
+
+    def save_session(self, app, session, response):
+        if session.modified:
+            SESSION_WRITES.labels('cookie').inc()
+        super().save_session(app, session, response)
+
+
+class SqlSession(CallbackDict, SessionMixin):
+    def __init__(self, initial=None, sid=None, version=0, new=False):
+        def on_update(self):
+            self.modified = True
+            self.accessed = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.version = version
+        self.new = new
+        self.modified = False
+
+
+class SqlSessionInterface(SessionInterface):
+    """Server-side sessions in the web_sessions table, fronted by an LRU keyed on (sid, version)."""
+
+    session_class = SqlSession
+    salt = 'reef-sql-session'
+
+    def __init__(self, db, cache_size, cache_seconds):
+        self.db = db
+        self.cache = LRUCache(cache_size)
+        self.cache_seconds = cache_seconds
+
+    def _signer(self, app):
+        return Signer(app.secret_key, salt=self.salt)
+
+    @staticmethod
+    def _table():
+        from modules.models import WebSession
+        return WebSession.__table__
+
+    def _new_session(self):
+        return self.session_class(sid=secrets.token_urlsafe(32), new=True)
+
+    def open_session(self, app, request):
+        val = request.cookies.get(self.get_cookie_name(app))
+        if not val:
+            return self._new_session()
+        try:
+            sid, version = self._signer(app).unsign(val).decode().rsplit('.', 1)
+            version = int(version)
+        except (BadSignature, ValueError):
+            return self._new_session()
+
+        data = self.cache.get((sid, version))
+        if data is not None:
+            SESSION_CACHE_HITS.labels('sql').inc()
+            return self.session_class(copy.deepcopy(data), sid=sid, version=version)
+        SESSION_CACHE_MISSES.labels('sql').inc()
+
+        table = self._table()
+        with self.db.engine.connect() as conn:
+            row = conn.execute(
+                table.select().with_only_columns(table.c.data, table.c.version, table.c.expires_at)
+                .where(table.c.id == sid)
+            ).first()
+        if row is None or row.expires_at < datetime.utcnow():
+            return self._new_session()
+        data = app.json.loads(row.data)
+        self.cache.set((sid, row.version), copy.deepcopy(data), self.cache_seconds)
+        return self.session_class(data, sid=sid, version=row.version)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        if session.accessed:
+            response.vary.add('Cookie')
+        if not session.modified:
+            return  # unchanged: no row write, no Set-Cookie
+
+        table = self._table()
+        self.cache.pop((session.sid, session.version))
+        if not session:
+            if not session.new:
+                with self.db.engine.begin() as conn:
+                    conn.execute(table.delete().where(table.c.id == session.sid))
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        version = session.version + 1
+        expires = self.get_expiration_time(app, session)
+        row = {
+            'data': app.json.dumps(dict(session)),
+            'version': version,
+            'expires_at': datetime.utcnow() + app.permanent_session_lifetime,
+        }
+        with self.db.engine.begin() as conn:
+            updated = 0
+            if not session.new:
+                updated = conn.execute(table.update().where(table.c.id == session.sid).values(**row)).rowcount
+            if not updated:
+                conn.execute(table.insert().values(id=session.sid, **row))
+        SESSION_WRITES.labels('sql').inc()
+        self.cache.set((session.sid, version), copy.deepcopy(dict(session)), self.cache_seconds)
+
+        val = self._signer(app).sign(f"{session.sid}.{version}").decode()
+        response.set_cookie(
+            name, val, expires=expires, httponly=self.get_cookie_httponly(app), domain=domain, path=path,
+            secure=self.get_cookie_secure(app), samesite=self.get_cookie_samesite(app),
+        )
+        response.vary.add('Cookie')
+
+    def purge_expired(self):
+        table = self._table()
+        with self.db.engine.begin() as conn:
+            return conn.execute(table.delete().where(table.c.expires_at < datetime.utcnow())).rowcount
+
+
+def init_sessions(app, db):
+    """Install the session interface chosen by SESSION_BACKEND."""
+    backend = app.config.get('SESSION_BACKEND', 'cookie')
+    size = app.config.get('SESSION_CACHE_SIZE', 10000)
+    seconds = app.config.get('SESSION_CACHE_SECONDS', 300)
+    if backend == 'cookie':
+        app.session_interface = CachedCookieSessionInterface(size, seconds)
+    elif backend == 'sql':
+        app.session_interface = SqlSessionInterface(db, size, seconds)
+    elif backend == 'filesystem':
+        from flask_session import Session
+        Session(app)
+    else:
+        raise RuntimeError(f"Unknown SESSION_BACKEND '{backend}' (expected one of {', '.join(BACKENDS)})")
+    return app.session_interface
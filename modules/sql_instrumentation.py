@@ -0,0 +1,164 @@
+"""
+Per-request SQL instrumentation.
+
+Cursor-execute hooks on every SQLAlchemy engine (primary and replicas) time
+each statement and add it to the current request's tally. When the request
+ends, the tally is:
+
+* observed into Prometheus histograms labelled by Flask endpoint
+  (sql_queries_per_request, sql_time_per_request_seconds,
+  sql_slowest_query_seconds),
+* returned as a Server-Timing header that browser dev tools display:
+      Server-Timing: db;dur=12.4;desc="7 queries", app;dur=31.0
+* folded into a per-endpoint summary (count, DB time, slowest statement),
+  served at /api/v1/db/queries.
+
+Statements slower than SQL_SLOW_QUERY_MS are logged with their endpoint.
+Statements that run outside a request (CLI, worker threads) are timed for
+the slow log only.
+"""
+import logging
+import threading
+import time
+
+from flask import g, has_request_context, request
+from prometheus_client import Histogram
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger("sql")
+
+SQL_QUERIES = Histogram(
+    'sql_queries_per_request', 'SQL statements issued per request', ['endpoint'],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 250),
+)
+SQL_TIME = Histogram(
+    'sql_time_per_request_seconds', 'Total SQL time per request', ['endpoint'],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+SQL_SLOWEST = Histogram(
+    'sql_slowest_query_seconds', 'Slowest SQL statement per request', ['endpoint'],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+
+STATEMENT_PREVIEW = 500  # characters of SQL kept for the slow log / summary
+
+
+class _RequestTally:
+    __slots__ = ('started', 'count', 'seconds', 'slowest', 'slowest_sql')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.count = 0
+        self.seconds = 0.0
+        self.slowest = 0.0
+        self.slowest_sql = None
+
+
+class QueryStats:
+    """Per-endpoint running totals since process start (or the last reset)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def record(self, endpoint, tally):
+        with self._lock:
+            s = self._endpoints.get(endpoint)
+            if s is None:
+                s = self._endpoints[endpoint] = {
+                    'requests': 0, 'queries': 0, 'db_seconds': 0.0, 'max_queries': 0,
+                    'slowest_ms': 0.0, 'slowest_sql': None,
+                }
+            s['requests'] += 1
+            s['queries'] += tally.count
+            s['db_seconds'] += tally.seconds
+            s['max_queries'] = max(s['max_queries'], tally.count)
+            if tally.slowest * 1000 > s['slowest_ms']:
+                s['slowest_ms'] = round(tally.slowest * 1000, 3)
+                s['slowest_sql'] = tally.slowest_sql
+
+    def snapshot(self, sort='db_seconds', limit=50):
+        with self._lock:
+            rows = [dict(s, endpoint=e) for e, s in self._endpoints.items()]
+        for row in rows:
+            row['avg_queries'] = round(row['queries'] / row['requests'], 2)
+            row['avg_db_ms'] = round(row['db_seconds'] * 1000 / row['requests'], 3)
+            row['db_seconds'] = round(row['db_seconds'], 6)
+        rows.sort(key=lambda r: r.get(sort) or 0, reverse=True)
+        return rows[:limit]
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+
+query_stats = QueryStats()
+
+_settings = {'slow_ms': 200.0, 'server_timing': True}
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('_query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('_query_start')
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    endpoint = None
+    if has_request_context():
+        endpoint = request.endpoint or 'unmatched'
+        tally = g.get('_sql_tally')
+        if tally is not None:
+            tally.count += 1
+            tally.seconds += elapsed
+            if elapsed > tally.slowest:
+                tally.slowest = elapsed
+                tally.slowest_sql = statement[:STATEMENT_PREVIEW]
+    if elapsed * 1000 >= _settings['slow_ms']:
+        logger.warning(f"Slow query ({elapsed * 1000:.1f} ms, endpoint={endpoint or '-'}): "
+                       f"{' '.join(statement.split())[:STATEMENT_PREVIEW]}")
+
+
+def _handle_error(exception_context):
+    # after_cursor_execute never fires for a failed statement; drop its start time
+    conn = exception_context.connection
+    if conn is not None and conn.info.get('_query_start'):
+        conn.info['_query_start'].pop()
+
+
+def _start_tally():
+    g._sql_tally = _RequestTally()
+
+
+def _finish_tally(response):
+    tally = g.pop('_sql_tally', None)
+    if tally is None:
+        return response
+    endpoint = request.endpoint or 'unmatched'
+    SQL_QUERIES.labels(endpoint).observe(tally.count)
+    SQL_TIME.labels(endpoint).observe(tally.seconds)
+    if tally.count:
+        SQL_SLOWEST.labels(endpoint).observe(tally.slowest)
+    query_stats.record(endpoint, tally)
+    if _settings['server_timing']:
+        total_ms = (time.perf_counter() - tally.started) * 1000
+        response.headers.add(
+            'Server-Timing',
+            f'db;dur={tally.seconds * 1000:.1f};desc="{tally.count} queries", app;dur={total_ms:.1f}',
+        )
+    return response
+
+
+def init_sql_instrumentation(app):
+    """Install the engine hooks (once per process) and the request hooks on `app`."""
+    _settings['slow_ms'] = app.config.get('SQL_SLOW_QUERY_MS', 200)
+    _settings['server_timing'] = app.config.get('SQL_SERVER_TIMING', True)
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(Engine, 'handle_error', _handle_error)
+    app.before_request(_start_tally)
+    app.after_request(_finish_tally)
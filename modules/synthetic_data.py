@@ -0,0 +1,345 @@
+"""
+Seedable synthetic dataset for load and performance testing.
+
+Builds tanks, products, dosing schedules, the dosing events those schedules
+produce, test results, vendors, taxonomy/color morphs and corals. Columns
+are generated as whole NumPy arrays and written with executemany inserts,
+so millions of rows take seconds rather than per-row ORM adds.
+
+The data is correlated the way real tanks are:
+
+* each schedule doses every `86400 / doses_per_day` seconds, except for an
+  occasional suspended window;
+* alkalinity follows the '+Alk' dosing balance (it dips while a schedule is
+  suspended), and calcium/magnesium loosely follow alkalinity;
+* product stock (current_avail, last_refill) reflects what was dosed;
+* corals reference existing taxonomy, color morph and vendor rows, and a
+  morph always belongs to the coral's taxonomy.
+
+Rows are appended after the current max id of each table, so the generator
+can run against a database that already has data. The same spec, seed and
+end date always give the same rows.
+
+Example usage:
+    flask synth generate --scale large --seed 7
+    flask synth generate --scale small --set tanks=20 --set days=3650 --rollups
+
+    from modules.synthetic_data import generate, resolve_scale
+    counts = generate(db.engine, resolve_scale('medium'), seed=1)
+"""
+import logging
+import time
+from datetime import date, time as dtime, timedelta
+
+from sqlalchemy import bindparam, func, select
+
+from modules.utils.lazy import lazy_import
+
+np = lazy_import('numpy')
+logger = logging.getLogger("synthetic_data")
+
+SCALES = {
+    'small': dict(tanks=2, days=180, tests_per_day=1, products=6, schedules_per_tank=3, doses_per_day=24,
+                  genera=40, species_per_genus=5, morphs_per_taxon=3, corals_per_tank=300, vendors=10),
+    'medium': dict(tanks=3, days=365, tests_per_day=2, products=10, schedules_per_tank=4, doses_per_day=24,
+                   genera=120, species_per_genus=8, morphs_per_taxon=4, corals_per_tank=2000, vendors=25),
+    'large': dict(tanks=5, days=730, tests_per_day=4, products=20, schedules_per_tank=6, doses_per_day=48,
+                  genera=300, species_per_genus=10, morphs_per_taxon=6, corals_per_tank=10000, vendors=50),
+    'xl': dict(tanks=10, days=1825, tests_per_day=4, products=30, schedules_per_tank=6, doses_per_day=96,
+               genera=300, species_per_genus=10, morphs_per_taxon=6, corals_per_tank=20000, vendors=100),
+}
+
+CHUNK = 10000
+PRODUCT_VOLUME = 4000.0  # ml per container
+USES = ('+Alk', '+Ca', '+Mg', '-NO3', 'Trace')
+TYPES = ('SPS', 'LPS', 'Soft', 'Mushroom', 'Zoanthid')
+HEALTH = ('Healthy', 'Recovering', 'New', 'Stressed', 'Dying', 'Dead', 'Other')
+HEALTH_P = (0.62, 0.1, 0.1, 0.08, 0.03, 0.04, 0.03)
+PLACEMENTS = ('Top', 'Middle', 'Bottom')
+PAR_LOW, PAR_HIGH = (250, 150, 50), (400, 250, 150)  # per placement
+FLOWS = ('Low', 'Medium', 'High')
+RARITY = ('Common', 'Uncommon', 'Rare', 'Ultra')
+RARITY_P = (0.55, 0.25, 0.15, 0.05)
+SYLLABLES = ('ac', 'ro', 'po', 'ra', 'mon', 'ti', 'por', 'ea', 'ser', 'ia', 'to', 'phyl', 'lia', 'eu', 'sty',
+             'an', 'go', 'ca', 'lo', 'fa', 'vi', 'zo', 'an', 'thus', 'cy', 'pho', 'ri', 'din', 'ma', 'la')
+ALK_TARGET = 8.5
+ALK_DKH_PER_ML_GAL = 0.07  # dKH added by 1 ml of '+Alk' product in 1 gallon (illustrative)
+MEMORY_DAYS = 20  # how long a daily imbalance keeps moving a parameter
+
+
+def resolve_scale(scale, overrides=None):
+    """Return the row-count spec for a named scale with `overrides` (key -> int) applied."""
+    if scale not in SCALES:
+        raise ValueError(f"Unknown scale '{scale}' (expected one of {', '.join(SCALES)})")
+    spec = dict(SCALES[scale])
+    for key, value in (overrides or {}).items():
+        if key not in spec:
+            raise ValueError(f"Unknown scale setting '{key}' (expected one of {', '.join(spec)})")
+        spec[key] = int(value)
+    return spec
+
+
+def _words(rng, n, parts):
+    syllables = np.array(SYLLABLES)
+    out = syllables[rng.integers(0, len(syllables), n)]
+    for _ in range(parts - 1):
+        out = np.char.add(out, syllables[rng.integers(0, len(syllables), n)])
+    return out
+
+
+def _title(words):
+    return np.char.capitalize(words)
+
+
+def _objects(values, mask=None):
+    """Python objects for executemany; entries where mask is True become None."""
+    out = np.array(values.tolist() if hasattr(values, 'tolist') else values, dtype=object)
+    if mask is not None:
+        out[mask] = None
+    return out
+
+
+def _insert(conn, table, columns):
+    """executemany insert of equal-length column arrays, CHUNK rows at a time."""
+    names = list(columns)
+    n = len(columns[names[0]]) if names else 0
+    for start in range(0, n, CHUNK):
+        stop = min(start + CHUNK, n)
+        values = [columns[name][start:stop] for name in names]
+        values = [v.tolist() if hasattr(v, 'tolist') else list(v) for v in values]
+        conn.execute(table.insert(), [dict(zip(names, row)) for row in zip(*values)])
+    return n
+
+
+def _update(conn, table, ids, columns):
+    """executemany UPDATE ... WHERE id = ? of equal-length column arrays, CHUNK rows at a time."""
+    names = list(columns)
+    values = {name: bindparam(f'_{name}') for name in names}
+    # Keep onupdate timestamps as inserted, so the same seed still gives the same rows
+    values.update({c.name: c for c in table.c if c.onupdate is not None and c.name not in values})
+    stmt = table.update().where(table.c.id == bindparam('_id')).values(values)
+    for start in range(0, len(ids), CHUNK):
+        stop = min(start + CHUNK, len(ids))
+        values = [ids[start:stop].tolist()] + [columns[name][start:stop].tolist() for name in names]
+        conn.execute(stmt, [dict(zip(['_id'] + [f'_{name}' for name in names], row)) for row in zip(*values)])
+    return len(ids)
+
+
+def _next_id(conn, table):
+    return (conn.execute(select(func.max(table.c.id))).scalar() or 0) + 1
+
+
+def _drift(daily):
+    """Mean-reverting walk: each day's change decays over MEMORY_DAYS (AR(1) as a truncated convolution)."""
+    phi = 1 - 1 / MEMORY_DAYS
+    kernel = phi ** np.arange(5 * MEMORY_DAYS)
+    return np.convolve(daily, kernel)[:len(daily)]
+
+
+def generate(engine, spec, seed=0, end=None):
+    """
+    Append a synthetic dataset described by `spec` (see SCALES) in one transaction.
+
+    `end` is the last generated day (default today). Returns {table: rows inserted}.
+    """
+    from modules.models import (
+        ColorMorphs, Coral, Dosing, DSchedule, Products, Tank, Taxonomy, TestResults, Vendors,
+    )
+
+    rng = np.random.default_rng(seed)
+    end = end or date.today()
+    days = spec['days']
+    start_day = np.datetime64(end - timedelta(days=days - 1), 'D')
+    start_ms = start_day.astype('datetime64[ms]')
+    counts = {}
+    started = time.perf_counter()
+
+    with engine.begin() as conn:
+        # --- tanks / products ---------------------------------------------------------------
+        n_tanks = spec['tanks']
+        tank_ids = np.arange(n_tanks) + _next_id(conn, Tank.__table__)
+        gross = rng.integers(40, 300, n_tanks)
+        net = (gross * rng.uniform(0.7, 0.9, n_tanks)).astype(int)
+        counts['tanks'] = _insert(conn, Tank.__table__, {
+            'id': tank_ids,
+            'name': np.char.add('Synthetic tank ', tank_ids.astype(str)),
+            'gross_water_vol': gross,
+            'net_water_vol': net,
+            'live_rock_lbs': np.round(gross * rng.uniform(0.5, 1.2, n_tanks), 1),
+        })
+
+        n_products = max(spec['products'], 1)
+        product_ids = np.arange(n_products) + _next_id(conn, Products.__table__)
+        uses = np.array(USES)[np.arange(n_products) % len(USES)]
+        product_names = np.char.add(np.char.add(_title(_words(rng, n_products, 2)), ' '), uses)
+
+        # --- schedules ----------------------------------------------------------------------
+        per_tank = min(spec['schedules_per_tank'], n_products)
+        alk_products = np.flatnonzero(uses == '+Alk')
+        sched_tank, sched_product = [], []
+        for i in range(n_tanks):
+            # every tank doses alkalinity, so test results have something to follow
+            chosen = [rng.choice(alk_products)]
+            pool = np.setdiff1d(np.arange(n_products), chosen)
+            chosen += list(rng.choice(pool, per_tank - 1, replace=False)) if per_tank > 1 else []
+            sched_tank += [i] * len(chosen)
+            sched_product += chosen
+        sched_tank = np.array(sched_tank, dtype=int)
+        sched_product = np.array(sched_product, dtype=int)
+        n_sched = len(sched_tank)
+        sched_ids = np.arange(n_sched) + _next_id(conn, DSchedule.__table__)
+        interval = 86400 // spec['doses_per_day']
+        # ml per dose scales with the tank's volume
+        sched_amount = np.round(net[sched_tank] / 100 * rng.uniform(0.5, 3.0, n_sched) * 24 / spec['doses_per_day'], 2)
+        suspended_from = np.where(rng.random(n_sched) < 0.3, rng.integers(0, max(days - 14, 1), n_sched), -1)
+        suspended_days = rng.integers(3, 15, n_sched)
+
+        # Parents first so the inserts satisfy foreign keys; the stock columns depend on what
+        # gets dosed, so they start full and are updated once the dosing events exist.
+        counts['products'] = _insert(conn, Products.__table__, {
+            'id': product_ids,
+            'name': product_names,
+            'uses': uses,
+            'total_volume': np.full(n_products, PRODUCT_VOLUME),
+            'current_avail': np.full(n_products, PRODUCT_VOLUME),
+            'dry_refill': np.full(n_products, 500.0),
+        })
+        counts['d_schedule'] = _insert(conn, DSchedule.__table__, {
+            'id': sched_ids,
+            'tank_id': tank_ids[sched_tank],
+            'product_id': product_ids[sched_product],
+            'trigger_interval': np.full(n_sched, interval),
+            'amount': sched_amount,
+            'suspended': np.zeros(n_sched, dtype=bool),
+            'last_refill': np.full(n_sched, np.datetime64(end, 's')),
+        })
+
+        # --- dosing events ------------------------------------------------------------------
+        doses_per_sched = days * spec['doses_per_day']
+        step = np.arange(doses_per_sched)
+        dose_day = step // spec['doses_per_day']
+        daily_dosed = np.zeros((n_sched, days))
+        product_used = np.zeros(n_products)
+        n_doses = 0
+        dosing_next = _next_id(conn, Dosing.__table__)
+        for s in range(n_sched):
+            active = np.ones(doses_per_sched, dtype=bool)
+            if suspended_from[s] >= 0:
+                active &= (dose_day < suspended_from[s]) | (dose_day >= suspended_from[s] + suspended_days[s])
+            k = int(active.sum())
+            trigger = (start_ms + (step[active] * interval * 1000 + rng.integers(0, 2000, k)).astype('timedelta64[ms]'))
+            amount = np.round(sched_amount[s] * rng.normal(1, 0.02, k), 3)
+            daily_dosed[s] = np.bincount(dose_day[active], weights=amount, minlength=days)
+            product_used[sched_product[s]] += amount.sum()
+            n_doses += _insert(conn, Dosing.__table__, {
+                'id': np.arange(k) + dosing_next + n_doses,
+                'trigger_time': trigger,
+                'amount': amount,
+                'product_id': np.full(k, product_ids[sched_product[s]]),
+                'schedule_id': np.full(k, sched_ids[s]),
+            })
+        counts['dosing'] = n_doses
+
+        # stock: containers are refilled whenever they run out
+        remaining = PRODUCT_VOLUME - np.mod(product_used, PRODUCT_VOLUME)
+        _update(conn, Products.__table__, product_ids, {'current_avail': np.round(remaining, 1)})
+        daily_use = np.maximum(product_used[sched_product] / days, 1e-9)
+        since_refill = np.minimum((PRODUCT_VOLUME - remaining[sched_product]) / daily_use, days)
+        last_refill = (np.datetime64(end, 'D') + np.timedelta64(1, 'D')).astype('datetime64[s]') \
+            - (since_refill * 86400).astype('timedelta64[s]')
+        _update(conn, DSchedule.__table__, sched_ids, {'last_refill': last_refill})
+
+        # --- test results -------------------------------------------------------------------
+        per_day = spec['tests_per_day']
+        test_day = np.repeat(np.arange(days), per_day)
+        minute = np.sort(rng.integers(8 * 60, 21 * 60, (days, per_day)), axis=1).ravel()
+        clock = np.array([dtime(m // 60, m % 60) for m in range(24 * 60)], dtype=object)
+        test_dates = (start_day + test_day.astype('timedelta64[D]'))
+        n_tests = 0
+        tests_next = _next_id(conn, TestResults.__table__)
+        for i in range(n_tanks):
+            mine = sched_tank == i
+            alk_in = daily_dosed[mine & (uses[sched_product] == '+Alk')].sum(axis=0)
+            # consumption balances the mean dose, so alk only moves when dosing changes (e.g. suspended)
+            imbalance = (alk_in - alk_in.mean()) * ALK_DKH_PER_ML_GAL / max(net[i], 1)
+            alk_daily = ALK_TARGET + rng.normal(0, 0.3) + _drift(imbalance + rng.normal(0, 0.04, days))
+            no3_daily = 8 + _drift(rng.normal(0, 0.4, days))
+            n = len(test_day)
+            alk = np.clip(alk_daily[test_day] + rng.normal(0, 0.08, n), 5.5, 12.5)
+            po4 = np.round(np.clip(rng.lognormal(np.log(0.05), 0.4, n), 0.0, 0.5), 3)
+            n_tests += _insert(conn, TestResults.__table__, {
+                'id': np.arange(n) + tests_next + n_tests,
+                'tank_id': np.full(n, tank_ids[i]),
+                'test_date': test_dates,
+                'test_time': clock[minute],
+                'alk': np.round(alk, 2),
+                'cal': np.round(420 + 15 * (alk - ALK_TARGET) + rng.normal(0, 8, n)).astype(int),
+                'mg': np.round(1340 + 10 * (alk - ALK_TARGET) + rng.normal(0, 25, n), 1),
+                'no3_ppm': np.clip(np.round(no3_daily[test_day] + rng.normal(0, 1, n)), 0, 40).astype(int),
+                'po4_ppm': po4,
+                'po4_ppb': np.round(po4 * 1000).astype(int),
+                'sg': np.round(rng.normal(1.0255, 0.0005, n), 4),
+            })
+        counts['test_results'] = n_tests
+
+        # --- vendors / taxonomy / morphs ----------------------------------------------------
+        n_vendors = max(spec['vendors'], 1)
+        vendor_ids = np.arange(n_vendors) + _next_id(conn, Vendors.__table__)
+        counts['vendors'] = _insert(conn, Vendors.__table__, {
+            'id': vendor_ids,
+            'tag': np.char.add('V', vendor_ids.astype(str)),
+            'name': np.char.add(_title(_words(rng, n_vendors, 3)), ' Reef'),
+        })
+
+        n_genera = max(spec['genera'], 1)
+        n_taxa = n_genera * max(spec['species_per_genus'], 1)
+        genus_of = np.arange(n_taxa) // max(spec['species_per_genus'], 1)
+        genera = _title(_words(rng, n_genera, 3))
+        taxon_types = np.array(TYPES)[genus_of % len(TYPES)]
+        taxon_ids = np.arange(n_taxa) + _next_id(conn, Taxonomy.__table__)
+        counts['taxonomy'] = _insert(conn, Taxonomy.__table__, {
+            'id': taxon_ids,
+            'genus': genera[genus_of],
+            'species': _words(rng, n_taxa, 3),
+            'type': taxon_types,
+            'common_name': np.char.add(np.char.add(_title(_words(rng, n_taxa, 2)), ' '), np.char.lower(taxon_types)),
+        })
+
+        n_morphs = n_taxa * spec['morphs_per_taxon']
+        morph_taxon = np.arange(n_morphs) // max(spec['morphs_per_taxon'], 1)
+        morph_ids = np.arange(n_morphs) + _next_id(conn, ColorMorphs.__table__)
+        morph_names = np.char.add(np.char.add(_title(_words(rng, n_morphs, 2)), ' '), _title(_words(rng, n_morphs, 2)))
+        counts['color_morphs'] = _insert(conn, ColorMorphs.__table__, {
+            'id': morph_ids,
+            'taxonomy_id': taxon_ids[morph_taxon],
+            'morph_name': morph_names,
+            'rarity': np.array(RARITY)[rng.choice(len(RARITY), n_morphs, p=RARITY_P)],
+        })
+
+        # --- corals -------------------------------------------------------------------------
+        n_corals = n_tanks * spec['corals_per_tank']
+        has_morph = (rng.random(n_corals) < 0.7) & (n_morphs > 0)
+        morph_pick = rng.integers(0, max(n_morphs, 1), n_corals)
+        taxon_pick = np.where(has_morph, morph_taxon[morph_pick] if n_morphs else 0, rng.integers(0, n_taxa, n_corals))
+        placement = rng.integers(0, len(PLACEMENTS), n_corals)
+        acquired = start_day + rng.integers(0, days, n_corals).astype('timedelta64[D]')
+        names = np.where(has_morph, morph_names[morph_pick] if n_morphs else '', genera[genus_of[taxon_pick]])
+        coral_next = _next_id(conn, Coral.__table__)
+        counts['corals'] = _insert(conn, Coral.__table__, {
+            'id': np.arange(n_corals) + coral_next,
+            'tank_id': tank_ids[np.repeat(np.arange(n_tanks), spec['corals_per_tank'])],
+            'coral_name': np.char.add(np.char.add(names, ' #'), np.arange(n_corals).astype(str)),
+            'date_acquired': acquired,
+            'taxonomy_id': taxon_ids[taxon_pick],
+            'color_morphs_id': _objects(morph_ids[morph_pick] if n_morphs else np.zeros(n_corals, int), ~has_morph),
+            'vendors_id': _objects(vendor_ids[rng.integers(0, n_vendors, n_corals)], rng.random(n_corals) < 0.1),
+            'health_status': np.array(HEALTH)[rng.choice(len(HEALTH), n_corals, p=HEALTH_P)],
+            'placement': np.array(PLACEMENTS)[placement],
+            'flow': np.array(FLOWS)[rng.integers(0, len(FLOWS), n_corals)],
+            'par': rng.integers(np.array(PAR_LOW)[placement], np.array(PAR_HIGH)[placement]),
+            'frag_colony': np.where(rng.random(n_corals) < 0.75, 'Frag', 'Colony'),
+            'current_size': np.char.add(rng.integers(1, 13, n_corals).astype(str), ' in'),
+        })
+
+    logger.info(f"Generated {sum(counts.values())} rows in {time.perf_counter() - started:.1f} s: {counts}")
+    return counts
@@ -1,11 +1,93 @@
+import threading
+import time
+from collections import namedtuple
+
 from flask import session
+from prometheus_client import Counter
+
+from modules.db_routing import primary_reads
+
+TANK_CACHE_HITS = Counter('tank_cache_hits_total', 'Tank catalogue lookups served from the per-process cache')
+TANK_CACHE_MISSES = Counter('tank_cache_misses_total', 'Tank catalogue lookups that queried the database')
+
 
 def get_current_tank_id():
     """Return the current tank_id from the session, or None if not set."""
     return session.get('tank_id')
 
-# Future: Add more tank context utilities here (e.g., set_tank_id, require_tank_context, etc.)
-def get_current_tank_id():
-    return session.get('tank_id')
+
+class TankCatalogue:
+    """
+    Per-process cache of the tank list used by the navbar tank picker.
+
+    Holds plain read-only snapshots (not ORM instances), so entries are safe to
+    share between requests and threads. Writes to `tanks` through table_ops call
+    invalidate(); the TTL bounds staleness in other worker processes.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._tanks = None
+        self._loaded_at = 0.0
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self):
+        """Return the cached tank list, loading it if empty or older than the TTL."""
+        tanks = self._tanks
+        if tanks is not None and time.monotonic() - self._loaded_at < self.ttl:
+            self.hits += 1
+            TANK_CACHE_HITS.inc()
+            return tanks
+        with self._lock:
+            # Another thread may have refreshed while we waited
+            if self._tanks is not None and time.monotonic() - self._loaded_at < self.ttl:
+                self.hits += 1
+                TANK_CACHE_HITS.inc()
+                return self._tanks
+            generation = self._generation
+        self.misses += 1
+        TANK_CACHE_MISSES.inc()
+        # Query outside the lock so a slow DB never stalls other threads/greenlets.
+        # Shared by every request in the process; never fill it from a lagging replica
+        with primary_reads():
+            tanks = self._load()
+        with self._lock:
+            # An invalidate() during the load means the rows may predate the write
+            if self._generation == generation:
+                self._tanks = tanks
+                self._loaded_at = time.monotonic()
+        return tanks
+
+    def invalidate(self):
+        with self._lock:
+            self._tanks = None
+            self._generation += 1
+
+    def stats(self):
+        return {
+            'cached': self._tanks is not None,
+            'size': len(self._tanks) if self._tanks is not None else 0,
+            'age_seconds': time.monotonic() - self._loaded_at if self._tanks is not None else None,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+    @staticmethod
+    def _load():
+        from modules.models import Tank
+        columns = [c.name for c in Tank.__table__.columns]
+        TankInfo = namedtuple('TankInfo', columns)
+        rows = Tank.query.with_entities(*Tank.__table__.columns).order_by(Tank.id).all()
+        return tuple(TankInfo(*row) for row in rows)
+
+
+def _default_ttl():
+    from app import app
+    return app.config.get('TANK_CACHE_SECONDS', 300)
 
 
+tank_catalogue = TankCatalogue(ttl=_default_ttl())
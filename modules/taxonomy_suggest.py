@@ -0,0 +1,334 @@
+"""
+Autocomplete index over genus, species, common_name and color morph names.
+
+Every entry is split into lowercase word tokens kept in one sorted list, so a
+prefix lookup is two bisects plus a short scan regardless of catalogue size.
+Whole names are also kept in one sorted list per kind, so entries whose name
+starts with the query (the best-ranked matches) are collected before the
+token scan and can never be crowded out of it.
+Queries that match no prefix fall back to trigram overlap, which tolerates
+typos ("acorpora"). The index is built lazily on the first query and then
+patched row by row when table_ops writes taxonomy/color_morphs, so an edit
+never triggers a full rebuild. Other workers pick up such edits on their next
+periodic rebuild (SUGGEST_REBUILD_SECONDS, same default as the taxonomy tree).
+"""
+import heapq
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import defaultdict, namedtuple
+
+from app import app, db
+from modules.db_routing import primary_reads
+
+Entry = namedtuple('Entry', 'key kind text norm tokens grams payload')
+
+KIND_BONUS = {'genus': 4, 'species': 3, 'common_name': 2, 'morph': 1}
+SCAN_LIMIT = 256  # prefix matches scored per query and list; keeps one-letter queries cheap
+COMMON_GRAM = 5000  # trigrams shared by more entries than this carry no signal
+MAX_LIMIT = 50
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def normalize(text):
+    return " ".join(_TOKEN_RE.findall((text or "").lower()))
+
+
+def trigrams(norm):
+    padded = f"  {norm} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SuggestIndex:
+    def __init__(self, rebuild_seconds):
+        self.rebuild_seconds = rebuild_seconds
+        self._lock = threading.RLock()
+        self._reset()
+        self._built_at = None
+        self._building = False
+
+    def _reset(self):
+        self._entries = {}
+        self._tokens = []  # sorted (token, key)
+        self._names = {kind: [] for kind in KIND_BONUS}  # kind -> sorted (norm, key)
+        self._grams = defaultdict(set)
+        self._taxa = {}  # taxonomy id -> (genus, species, common_name, type)
+        self._genus_taxa = defaultdict(set)
+        self._morphs = {}  # morph id -> (name, taxonomy id)
+        self._taxon_morphs = defaultdict(set)
+        self._bulk = False
+
+    def __len__(self):
+        return len(self._entries)
+
+    # -- building -----------------------------------------------------------
+
+    def build(self):
+        """Load the full catalogue (two queries) and replace the index."""
+        from modules.models import Taxonomy, ColorMorphs
+        with primary_reads():
+            taxa = db.session.query(
+                Taxonomy.id, Taxonomy.genus, Taxonomy.species, Taxonomy.common_name, Taxonomy.type
+            ).all()
+            morphs = db.session.query(ColorMorphs.id, ColorMorphs.morph_name, ColorMorphs.taxonomy_id).all()
+        return self.load(taxa, morphs)
+
+    def load(self, taxa, morphs):
+        """
+        Replace the index contents.
+
+        :param taxa: iterable of (id, genus, species, common_name, type)
+        :param morphs: iterable of (id, morph_name, taxonomy_id)
+        """
+        with self._lock:
+            self._reset()
+            # Append tokens unsorted and sort once; insort per entry is quadratic at 100k rows
+            self._bulk = True
+            try:
+                for row in taxa:
+                    self.upsert_taxon(*row)
+                for row in morphs:
+                    self.upsert_morph(*row)
+            finally:
+                self._bulk = False
+                self._tokens.sort()
+                for names in self._names.values():
+                    names.sort()
+            # One entry per genus, added once the member taxa are known
+            for genus in list(self._genus_taxa):
+                self._refresh_genus(genus)
+            self._built_at = time.monotonic()
+        return len(self._entries)
+
+    def _stale(self):
+        return self._built_at is None or time.monotonic() - self._built_at > self.rebuild_seconds
+
+    def ensure_built(self):
+        if not self._stale():
+            return
+        with self._lock:
+            # One rebuild at a time; meanwhile other callers keep searching the old index
+            if not self._stale() or (self._building and self._built_at is not None):
+                return
+            self._building = True
+        try:
+            # build() queries without the lock and only takes it to swap the contents in
+            self.build()
+        finally:
+            with self._lock:
+                self._building = False
+
+    def refresh(self, table_name, row_id):
+        """Re-read one taxonomy/color_morphs row after a write and patch the index."""
+        if self._built_at is None or row_id is None:
+            return  # not built yet; the first query loads everything
+        from modules.models import Taxonomy, ColorMorphs
+        # Read the row before locking; upsert/remove take the lock themselves
+        if table_name == 'taxonomy':
+            row = db.session.get(Taxonomy, row_id)
+            if row is None:
+                self.remove_taxon(row_id)
+            else:
+                self.upsert_taxon(row.id, row.genus, row.species, row.common_name, row.type)
+        elif table_name == 'color_morphs':
+            row = db.session.get(ColorMorphs, row_id)
+            if row is None:
+                self.remove_morph(row_id)
+            else:
+                self.upsert_morph(row.id, row.morph_name, row.taxonomy_id)
+
+    # -- incremental updates ------------------------------------------------
+
+    def upsert_taxon(self, taxonomy_id, genus, species, common_name, type_):
+        with self._lock:
+            old = self._taxa.get(taxonomy_id)
+            if old is not None:
+                self.remove_taxon(taxonomy_id, keep_morphs=True)
+            self._taxa[taxonomy_id] = (genus, species, common_name, type_)
+            self._genus_taxa[genus].add(taxonomy_id)
+            self._refresh_genus(genus)
+            base = {'taxonomy_id': taxonomy_id, 'genus': genus, 'species': species, 'type': type_}
+            if species:
+                self._add(('species', taxonomy_id), 'species', f"{genus} {species}",
+                          dict(base, label=f"{genus} {species}"))
+            if common_name:
+                self._add(('common_name', taxonomy_id), 'common_name', common_name,
+                          dict(base, label=common_name))
+            # Morph payloads carry genus/species, so re-add them when the parent changes
+            for morph_id in list(self._taxon_morphs.get(taxonomy_id, ())):
+                self.upsert_morph(morph_id, self._morphs[morph_id][0], taxonomy_id)
+
+    def remove_taxon(self, taxonomy_id, keep_morphs=False):
+        with self._lock:
+            old = self._taxa.pop(taxonomy_id, None)
+            if old is None:
+                return
+            self._remove(('species', taxonomy_id))
+            self._remove(('common_name', taxonomy_id))
+            genus = old[0]
+            self._genus_taxa[genus].discard(taxonomy_id)
+            self._refresh_genus(genus)
+            if not keep_morphs:
+                for morph_id in list(self._taxon_morphs.get(taxonomy_id, ())):
+                    self.remove_morph(morph_id)
+
+    def upsert_morph(self, morph_id, name, taxonomy_id):
+        with self._lock:
+            self.remove_morph(morph_id)
+            self._morphs[morph_id] = (name, taxonomy_id)
+            self._taxon_morphs[taxonomy_id].add(morph_id)
+            taxon = self._taxa.get(taxonomy_id)
+            if not name or taxon is None:
+                return
+            genus, species, _, type_ = taxon
+            self._add(('morph', morph_id), 'morph', name, {
+                'id': morph_id, 'taxonomy_id': taxonomy_id, 'genus': genus,
+                'species': species, 'type': type_, 'label': name,
+            })
+
+    def remove_morph(self, morph_id):
+        with self._lock:
+            old = self._morphs.pop(morph_id, None)
+            if old is not None:
+                self._taxon_morphs[old[1]].discard(morph_id)
+            self._remove(('morph', morph_id))
+
+    def _refresh_genus(self, genus):
+        if self._bulk:
+            return  # build() adds genus entries after the bulk load
+        key = ('genus', genus)
+        self._remove(key)
+        members = self._genus_taxa.get(genus)
+        if not members:
+            self._genus_taxa.pop(genus, None)
+            return
+        first = min(members)
+        self._add(key, 'genus', genus, {
+            'taxonomy_id': first, 'genus': genus, 'species': None,
+            'type': self._taxa[first][3], 'label': genus,
+        })
+
+    def _add(self, key, kind, text, payload):
+        norm = normalize(text)
+        if not norm:
+            return
+        payload = dict(payload, kind=kind)
+        payload.setdefault('id', payload.get('taxonomy_id'))
+        tokens = tuple(dict.fromkeys(norm.split()))
+        grams = trigrams(norm)
+        self._entries[key] = Entry(key, kind, text, norm, tokens, grams, payload)
+        names = self._names[kind]
+        if self._bulk:
+            names.append((norm, key))
+        else:
+            insort(names, (norm, key))
+        for token in tokens:
+            if self._bulk:
+                self._tokens.append((token, key))
+            else:
+                insort(self._tokens, (token, key))
+        for gram in grams:
+            self._grams[gram].add(key)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        names = self._names[entry.kind]
+        i = bisect_left(names, (entry.norm, key))
+        if i < len(names) and names[i] == (entry.norm, key):
+            del names[i]
+        for token in entry.tokens:
+            i = bisect_left(self._tokens, (token, key))
+            if i < len(self._tokens) and self._tokens[i] == (token, key):
+                del self._tokens[i]
+        for gram in entry.grams:
+            keys = self._grams.get(gram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._grams[gram]
+
+    # -- querying -----------------------------------------------------------
+
+    def _prefix_range(self, token, items=None):
+        items = self._tokens if items is None else items
+        lo = bisect_left(items, (token,))
+        hi = bisect_left(items, (token + "\uffff",))
+        return lo, hi
+
+    def search(self, query, limit=10):
+        """Return up to `limit` payload dicts ranked by match quality, each with a 'score'."""
+        norm = normalize(query)
+        if not norm:
+            return []
+        limit = max(1, min(limit, MAX_LIMIT))
+        q_tokens = norm.split()
+        with self._lock:
+            scored = {}
+            # Names starting with the query outrank any later-word match; exact names sort first
+            for kind, names in self._names.items():
+                lo, hi = self._prefix_range(norm, names)
+                for i in range(lo, min(hi, lo + SCAN_LIMIT)):
+                    key = names[i][1]
+                    scored[key] = self._score_prefix(self._entries[key], norm)
+            ranges = [self._prefix_range(t) for t in q_tokens]
+            # Drive the scan from the most selective token, verify the others per entry
+            lo, hi = min(ranges, key=lambda r: r[1] - r[0])
+            for i in range(lo, min(hi, lo + SCAN_LIMIT)):
+                key = self._tokens[i][1]
+                if key in scored:
+                    continue
+                entry = self._entries[key]
+                if len(q_tokens) == 1 or all(any(tok.startswith(qt) for tok in entry.tokens) for qt in q_tokens):
+                    scored[key] = self._score_prefix(entry, norm)
+            if len(scored) < limit and len(norm) >= 3:
+                for key, score in self._fuzzy(norm).items():
+                    scored.setdefault(key, score)
+            best = heapq.nlargest(limit, scored.items(), key=lambda kv: (kv[1], -len(self._entries[kv[0]].norm)))
+            return [dict(self._entries[key].payload, score=round(score, 3)) for key, score in best]
+
+    @staticmethod
+    def _score_prefix(entry, norm):
+        if entry.norm == norm:
+            base = 100
+        elif entry.norm.startswith(norm):
+            base = 80
+        else:
+            base = 60
+        return base + KIND_BONUS[entry.kind] - min(len(entry.norm), 50) / 50
+
+    def _fuzzy(self, norm):
+        q_grams = trigrams(norm)
+        counts = defaultdict(int)
+        for gram in q_grams:
+            keys = self._grams.get(gram)
+            if keys and len(keys) <= COMMON_GRAM:
+                for key in keys:
+                    counts[key] += 1
+        threshold = max(2, len(q_grams) // 3)
+        out = {}
+        for key, overlap in counts.items():
+            if overlap < threshold:
+                continue
+            entry = self._entries[key]
+            # Similarity against the best-matching token, so long names are not penalised
+            jaccard = max(
+                len(q_grams & trigrams(tok)) / len(q_grams | trigrams(tok)) for tok in entry.tokens + (entry.norm,)
+            )
+            if jaccard >= 0.3:
+                out[key] = jaccard * 50 + KIND_BONUS[entry.kind]
+        return out
+
+    def stats(self):
+        return {
+            'entries': len(self._entries),
+            'tokens': len(self._tokens),
+            'trigrams': len(self._grams),
+            'built': self._built_at is not None,
+        }
+
+
+suggest_index = SuggestIndex(rebuild_seconds=app.config.get('SUGGEST_REBUILD_SECONDS', 600))
@@ -0,0 +1,224 @@
+"""
+In-memory taxonomy tree (genus -> species -> color morphs) for the coral form pickers.
+
+The tree is loaded with one joined query, serialized once per resource and served
+with a strong ETag so browsers revalidate with If-None-Match and get a 304.
+The version is a hash of the tree contents, so every worker process hands out
+the same ETag for the same data. Writes to taxonomy/color_morphs through
+table_ops call invalidate(); TAXONOMY_CACHE_SECONDS bounds staleness for edits
+made elsewhere (seed scripts, other workers).
+
+Genus keys are casefolded to match MySQL's case-insensitive collation:
+"acropora" and "Acropora" are one genus, shown under the spelling of its
+lowest-id row, and lookups by either spelling find it.
+"""
+import hashlib
+import threading
+import time
+
+from flask import Response, request
+from prometheus_client import Counter
+
+from app import app, db
+from modules.db_routing import primary_reads
+
+TAXONOMY_CACHE_HITS = Counter('taxonomy_cache_hits_total', 'Taxonomy picker responses served from the in-memory tree')
+TAXONOMY_CACHE_REBUILDS = Counter('taxonomy_cache_rebuilds_total', 'Taxonomy tree rebuilds')
+TAXONOMY_NOT_MODIFIED = Counter('taxonomy_not_modified_total', 'Taxonomy picker requests answered with 304')
+
+
+def _species_key(row):
+    # Match SQL "ORDER BY species": NULLs first, then by name, ties by id
+    return (row['species'] is not None, row['species'] or '', row['id'])
+
+
+def genus_key(genus):
+    return (genus or '').casefold()
+
+
+class _Snapshot:
+    def __init__(self, genus_list, genera, genus_names):
+        self.genus_list = genus_list
+        self.genera = genera  # genus_key -> {'species': [...], 'color_morphs': [...]}
+        self.genus_names = genus_names  # genus_key -> display spelling
+        self.version = hashlib.sha1(app.json.dumps([genus_list, genera]).encode()).hexdigest()[:16]
+        self._bodies = {}
+        self._lock = threading.Lock()
+
+    def body(self, resource, build):
+        """Serialized JSON + ETag for one resource, computed once per snapshot."""
+        cached = self._bodies.get(resource)
+        if cached is None:
+            body = app.json.dumps(build(self)) + "\n"
+            etag = hashlib.sha1(f"{self.version}:{resource}".encode()).hexdigest()
+            cached = (body, etag)
+            with self._lock:
+                self._bodies[resource] = cached
+        return cached
+
+
+class TaxonomyTree:
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._snapshot = None
+        self._loaded_at = 0.0
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.rebuilds = 0
+
+    def snapshot(self):
+        snap = self._snapshot
+        if snap is not None and time.monotonic() - self._loaded_at < self.ttl:
+            self.hits += 1
+            TAXONOMY_CACHE_HITS.inc()
+            return snap
+        with self._lock:
+            if self._snapshot is not None and time.monotonic() - self._loaded_at < self.ttl:
+                return self._snapshot
+            generation = self._generation
+        # Build outside the lock; invalidated right after writes, so read the primary, not a lagging replica
+        with primary_reads():
+            snap = self._build()
+        with self._lock:
+            # Drop the result if a write invalidated the tree while it was loading
+            if self._generation == generation:
+                self._snapshot = snap
+                self._loaded_at = time.monotonic()
+        self.rebuilds += 1
+        TAXONOMY_CACHE_REBUILDS.inc()
+        return snap
+
+    def invalidate(self):
+        with self._lock:
+            self._snapshot = None
+            self._generation += 1
+
+    def stats(self):
+        snap = self._snapshot
+        return {
+            'version': snap.version if snap else None,
+            'genera': len(snap.genera) if snap else 0,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'rebuilds': self.rebuilds,
+        }
+
+    @staticmethod
+    def _build():
+        from modules.models import Taxonomy, ColorMorphs
+        # One joined query: a taxonomy row repeats once per morph, or once with NULL morph columns
+        rows = (
+            db.session.query(
+                Taxonomy.id, Taxonomy.genus, Taxonomy.species, Taxonomy.common_name, Taxonomy.type,
+                ColorMorphs.id, ColorMorphs.morph_name,
+            )
+            .outerjoin(ColorMorphs, ColorMorphs.taxonomy_id == Taxonomy.id)
+            .all()
+        )
+
+        genera = {}
+        genus_names = {}  # genus_key -> (lowest id, spelling)
+        genus_types = {}
+        seen_taxa = set()
+        for tid, genus, species, common_name, type_, morph_id, morph_name in rows:
+            fold = genus_key(genus)
+            node = genera.setdefault(fold, {'species': [], 'color_morphs': []})
+            if tid not in seen_taxa:
+                seen_taxa.add(tid)
+                node['species'].append({'id': tid, 'species': species, 'common_name': common_name})
+                genus_names[fold] = min((tid, genus), genus_names.get(fold, (tid, genus)))
+                key = (fold, type_)
+                genus_types[key] = min(tid, genus_types.get(key, tid))
+            if morph_id is not None:
+                node['color_morphs'].append({'id': morph_id, 'name': morph_name, 'taxonomy_id': tid})
+
+        for node in genera.values():
+            node['species'].sort(key=_species_key)
+            node['color_morphs'].sort(key=lambda m: (m['name'] is not None, m['name'] or '', m['id']))
+        genus_names = {fold: name for fold, (_, name) in genus_names.items()}
+        genus_list = [
+            {'genus': genus_names[fold], 'type': type_, 'id': tid}
+            for (fold, type_), tid in sorted(genus_types.items(), key=lambda kv: (kv[0][0], kv[0][1] or ''))
+        ]
+        return _Snapshot(genus_list, genera, genus_names)
+
+
+taxonomy_tree = TaxonomyTree(ttl=app.config.get('TAXONOMY_CACHE_SECONDS', 600))
+
+
+def _conditional_json(resource, build, genus=None):
+    snap = taxonomy_tree.snapshot()
+    if genus is not None and genus_key(genus) not in snap.genera:
+        # Unknown genera share one cached empty body instead of growing the cache per typo
+        resource = f"{resource}:?"
+    elif genus is not None:
+        resource = f"{resource}:{genus_key(genus)}"
+    body, etag = snap.body(resource, build)
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    # Always revalidate; unchanged data costs a 304 with no body
+    response.cache_control.no_cache = True
+    response.make_conditional(request)
+    if response.status_code == 304:
+        TAXONOMY_NOT_MODIFIED.inc()
+    return response
+
+
+def genus_list_response():
+    return _conditional_json('genus', lambda s: s.genus_list)
+
+
+def species_response(genus):
+    def build(s):
+        name = s.genus_names.get(genus_key(genus), genus)
+        return [
+            {'id': sp['id'], 'genus': name, 'species': sp['species'], 'common_name': sp['common_name']}
+            for sp in s.genera.get(genus_key(genus), {}).get('species', [])
+        ]
+    return _conditional_json('species', build, genus)
+
+
+def color_morphs_response(genus):
+    def build(s):
+        return [{'id': m['id'], 'name': m['name']} for m in s.genera.get(genus_key(genus), {}).get('color_morphs', [])]
+    return _conditional_json('morphs', build, genus)
+
+
+def genus_details_response(genus):
+    def build(s):
+        return s.genera.get(genus_key(genus), {'species': [], 'color_morphs': []})
+    return _conditional_json('details', build, genus)
+
+
+BOOTSTRAP_FIELDS = {
+    'genera': ['genus', 'type', 'id'],
+    'species': ['id', 'genus', 'species', 'common_name'],
+    'morphs': ['id', 'name', 'taxonomy_id'],
+}
+
+
+def bootstrap_response(genus=None):
+    """
+    Whole picker dataset (or one genus's slice) in a compact row encoding:
+    each list holds plain arrays whose columns are named once in "fields".
+    """
+    def build(s):
+        genus_rows = [g for g in s.genus_list if genus is None or genus_key(g['genus']) == genus_key(genus)]
+        folds = [genus_key(genus)] if genus is not None else list(s.genera)
+        species, morphs = [], []
+        for fold in folds:
+            node = s.genera.get(fold)
+            if node is None:
+                continue
+            name = s.genus_names[fold]
+            species.extend([sp['id'], name, sp['species'], sp['common_name']] for sp in node['species'])
+            morphs.extend([m['id'], m['name'], m['taxonomy_id']] for m in node['color_morphs'])
+        return {
+            'v': s.version,
+            'fields': BOOTSTRAP_FIELDS,
+            'genera': [[g['genus'], g['type'], g['id']] for g in genus_rows],
+            'species': species,
+            'morphs': morphs,
+        }
+    return _conditional_json('bootstrap', build, genus)
@@ -116,6 +116,28 @@ def process_product_data(input):
             output[key] = value
     return output
 
+def process_tank_data(input):
+    output = {}
+    allowed = {'name', 'gross_water_vol', 'net_water_vol', 'live_rock_lbs'}
+    for key, value in input.items():
+        if key not in allowed:
+            continue
+        if value == '' or value is None:
+            output[key] = None
+        elif key in ['gross_water_vol', 'net_water_vol']:
+            try:
+                output[key] = int(value)
+            except Exception:
+                output[key] = None
+        elif key == 'live_rock_lbs':
+            try:
+                output[key] = float(value)
+            except Exception:
+                output[key] = None
+        else:
+            output[key] = value
+    return output
+
 def process_schedule_data(input):
     output = {}
     allowed = {'product_id', 'amount', 'last_trigger', 'trigger_interval', 'suspended', 'last_refill', 'tank_id'}
@@ -233,6 +255,8 @@ def validate_and_process_data(model, data):
             return process_product_data(data)
         elif model.__tablename__ == 'd_schedule':
             return process_schedule_data(data)
+        elif model.__tablename__ == 'tanks':
+            return process_tank_data(data)
         else:
             raise ValueError(f"No validation function defined for model: {model.__tablename__}")
     except Exception as e:
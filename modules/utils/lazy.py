@@ -0,0 +1,54 @@
+"""
+Deferred imports for the numeric stack.
+
+numpy (and sklearn behind the alkalinity model) cost more at import than the
+rest of the app combined, yet only the chart, archive and model code paths use
+them. Modules bind them through lazy_import() so booting a worker does not
+pay for them:
+
+    np = lazy_import('numpy')
+
+The real module is imported on first attribute access and cached in
+sys.modules as usual, so later lookups are plain attribute reads.
+"""
+import importlib
+import sys
+import threading
+import types
+
+_lock = threading.Lock()
+
+
+class _LazyModule(types.ModuleType):
+    def __init__(self, name):
+        super().__init__(name)
+        self.__dict__['_module'] = None
+
+    def _load(self):
+        module = self.__dict__['_module']
+        if module is None:
+            with _lock:
+                module = self.__dict__['_module']
+                if module is None:
+                    module = importlib.import_module(self.__name__)
+                    self.__dict__['_module'] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = 'loaded' if self.__dict__['_module'] is not None else 'not loaded'
+        return f"<lazy module '{self.__name__}' ({state})>"
+
+
+def lazy_import(name):
+    """Return `name` if it is already imported, else a proxy that imports it on first use."""
+    return sys.modules.get(name) or _LazyModule(name)
+
+
+def is_loaded(name):
+    return name in sys.modules
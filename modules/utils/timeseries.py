@@ -0,0 +1,133 @@
+import calendar
+from datetime import datetime, date, time
+
+from modules.utils.lazy import lazy_import
+
+np = lazy_import('numpy')
+
+
+# Numeric columns on TestResults that can be charted
+TEST_PARAMETERS = ('alk', 'po4_ppm', 'po4_ppb', 'no3_ppm', 'cal', 'mg', 'sg')
+# Probe-backed parameters stored in probe_readings
+PROBE_PARAMETERS = ('ph',)
+SERIES_PARAMETERS = TEST_PARAMETERS + PROBE_PARAMETERS
+
+DEFAULT_POINTS = 500
+MAX_POINTS = 5000
+
+
+def to_epoch_ms(value, at=None):
+    """
+    Convert a datetime (or a date plus optional time) to epoch milliseconds.
+    Naive values are treated as wall-clock UTC, matching how they are stored.
+    """
+    if isinstance(value, datetime):
+        dt = value
+    elif isinstance(value, date):
+        dt = datetime.combine(value, at or time.min)
+    else:
+        raise TypeError(f"Cannot convert {type(value)} to epoch ms")
+    return calendar.timegm(dt.utctimetuple()) * 1000 + dt.microsecond // 1000
+
+
+def parse_range_arg(value, end_of_day=False):
+    """
+    Parse an ISO date/datetime or epoch-ms query argument. Returns a naive datetime or None.
+    A bare date used as a range end covers the whole day when end_of_day is set.
+    """
+    if value in (None, ''):
+        return None
+    if value.isdigit():
+        return datetime.utcfromtimestamp(int(value) / 1000)
+    if end_of_day and len(value) == 10:
+        return datetime.combine(date.fromisoformat(value), time.max)
+    return datetime.fromisoformat(value.replace('Z', ''))
+
+
+def _clean(ts, values):
+    ts = np.asarray(ts, dtype=np.int64)
+    values = np.asarray(values, dtype=np.float64)
+    keep = ~np.isnan(values)
+    return ts[keep], values[keep]
+
+
+def lttb(ts, values, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling.
+
+    :param ts: sorted timestamps (epoch ms)
+    :param values: values aligned with ts; NaN entries are dropped
+    :param threshold: maximum number of points to return
+    :return: (ts, values) numpy arrays with at most `threshold` points
+    """
+    ts, values = _clean(ts, values)
+    n = len(ts)
+    if threshold >= n or threshold < 3:
+        return ts, values
+
+    x = ts.astype(np.float64)
+    out = np.empty(threshold, dtype=np.int64)
+    out[0] = 0
+    out[-1] = n - 1
+    # Bucket edges for the points between the fixed first and last
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], max(edges[i + 1], edges[i] + 1)
+        # Average of the next bucket (or the last point for the final bucket)
+        if i + 2 < len(edges):
+            n_start, n_end = edges[i + 1], max(edges[i + 2], edges[i + 1] + 1)
+            avg_x = x[n_start:n_end].mean()
+            avg_y = values[n_start:n_end].mean()
+        else:
+            avg_x, avg_y = x[-1], values[-1]
+        area = np.abs(
+            (x[a] - avg_x) * (values[start:end] - values[a])
+            - (x[a] - x[start:end]) * (avg_y - values[a])
+        )
+        a = start + int(np.argmax(area))
+        out[i + 1] = a
+    return ts[out], values[out]
+
+
+def bucket_aggregate(ts, values, buckets, start=None, end=None):
+    """
+    Aggregate values into equal-width time buckets.
+
+    :param ts: sorted timestamps (epoch ms)
+    :param values: values aligned with ts; NaN entries are dropped
+    :param buckets: number of buckets to split [start, end] into
+    :return: list of [bucket_start_ms, min, max, avg, count] for non-empty buckets
+    """
+    ts, values = _clean(ts, values)
+    if len(ts) == 0:
+        return []
+    start = int(ts[0]) if start is None else int(start)
+    end = int(ts[-1]) if end is None else int(end)
+    buckets = max(1, int(buckets))
+    width = max(1, -(-(end - start + 1) // buckets))
+    idx = (ts - start) // width
+    # ts is sorted, so each bucket is a contiguous run
+    starts = np.flatnonzero(np.r_[True, idx[1:] != idx[:-1]])
+    counts = np.diff(np.r_[starts, len(ts)])
+    mins = np.minimum.reduceat(values, starts)
+    maxs = np.maximum.reduceat(values, starts)
+    avgs = np.add.reduceat(values, starts) / counts
+    bucket_ts = start + idx[starts] * width
+    return [
+        [int(t), float(lo), float(hi), float(avg), int(c)]
+        for t, lo, hi, avg, c in zip(bucket_ts, mins, maxs, avgs, counts)
+    ]
+
+
+def downsample(ts, values, points, mode='lttb', start=None, end=None):
+    """
+    Downsample one series for charting.
+
+    :param mode: 'lttb' returns [ts, value] pairs, 'bucket' returns
+                 [ts, min, max, avg, count] rows
+    """
+    if mode == 'bucket':
+        return bucket_aggregate(ts, values, points, start, end)
+    out_ts, out_values = lttb(ts, values, points)
+    return [[int(t), float(v)] for t, v in zip(out_ts, out_values)]
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Endpoint benchmarks against a seeded SQLite database.
+
+Seeds a fresh SQLite file (see tests/perf/seed.py), then times the hot
+endpoints through the Flask test client: table_ops reads, advanced_join,
+schedule stats, coral stats/gallery/grid, the test series API, taxonomy
+bootstrap/suggest, and alkalinity model fitting. Each case reports median,
+p95 and min wall time and the SQL statement count (from the Server-Timing
+header).
+
+Results are compared with tests/perf/baseline.json (per scale). A case
+regresses if its median exceeds baseline * --tolerance + --slack-ms, or if
+it issues more queries than the baseline. Any regression exits 1.
+
+Example usage:
+    python tests/perf/bench.py                          # small scale, compare to baseline
+    python tests/perf/bench.py --scale medium --set corals_per_tank=5000
+    python tests/perf/bench.py --only advanced_join,schedule_stats --repeat 50
+    python tests/perf/bench.py --update-baseline        # after an intended change
+    python tests/perf/bench.py --json > bench.json
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(os.path.dirname(HERE))
+BASELINE = os.path.join(HERE, 'baseline.json')
+SERVER_TIMING_RE = re.compile(r'db;dur=([\d.]+);desc="(\d+) queries"')
+
+JOIN_CONDITIONS = json.dumps([["products.id", "dosing.product_id"]])
+JOIN_ORDER = json.dumps([["dosing", "trigger_time", "desc"]])
+
+# name -> request path (tank 1 is selected in the session)
+CASES = {
+    'ops_test_results': '/web/fn/ops/get/test_results',
+    'ops_corals': '/web/fn/ops/get/corals',
+    'ops_dosing_datatable': '/web/fn/ops/datatable/dosing?draw=1&page=1&rows=100&sidx=trigger_time&sord=desc',
+    'advanced_join': ('/web/fn/get/advanced_join?tables=products,dosing&join_type=inner'
+                      f'&conditions={JOIN_CONDITIONS}&order_by={JOIN_ORDER}&limit=500&offset=0'),
+    'schedule_stats': '/web/fn/schedule/get/stats',
+    'coral_stats': '/web/fn/corals/stats',
+    'coral_gallery': '/web/fn/corals/gallery',
+    'coral_grid': '/web/fn/get/corals',
+    'tests_series': '/api/v1/tests/series?tank_id=1&params=alk,cal,mg&points=300&mode=lttb',
+    'taxonomy_bootstrap': '/web/fn/taxonomy/bootstrap',
+    'taxonomy_suggest': '/web/fn/taxonomy/suggest?q=acro&limit=10',
+}
+
+
+def parse_set(values):
+    overrides = {}
+    for item in values or ():
+        key, _, value = item.partition('=')
+        if not value:
+            sys.exit(f"--set expects key=value, got '{item}'")
+        overrides[key] = value
+    return overrides
+
+
+def measure(fn, warmup, repeat):
+    for _ in range(warmup):
+        fn()
+    times, queries = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        q = fn()
+        times.append((time.perf_counter() - started) * 1000)
+        queries = q if q is not None else queries
+    times.sort()
+    return {
+        'median_ms': round(statistics.median(times), 3),
+        'p95_ms': round(times[min(len(times) - 1, int(len(times) * 0.95))], 3),
+        'min_ms': round(times[0], 3),
+        'queries': queries,
+    }
+
+
+def http_case(client, path):
+    def run():
+        resp = client.get(path)
+        if resp.status_code != 200:
+            raise RuntimeError(f"GET {path} -> {resp.status_code}: {resp.get_data(as_text=True)[:300]}")
+        m = SERVER_TIMING_RE.search(resp.headers.get('Server-Timing', ''))
+        return int(m.group(2)) if m else None
+    return run
+
+
+def model_fit_case(app):
+    from modules.models import TestResults, update_alkalinity_model
+
+    with app.app_context():
+        alk = [r.alk for r in TestResults.query.filter_by(tank_id=1).order_by(TestResults.id).all()]
+    doses = [round(5 + (i % 7) * 0.5, 2) for i in range(len(alk))]
+
+    def run():
+        with app.app_context():
+            update_alkalinity_model(1, 1, doses, alk, notes='bench')
+    return run
+
+
+def run_benchmarks(scale, overrides, seed, warmup, repeat, only):
+    db_file = os.path.join(tempfile.mkdtemp(prefix='reef-bench-'), 'bench.db')
+    # Must be set before the app module is imported
+    os.environ['TESTING'] = 'true'
+    os.environ['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{db_file}"
+    sys.path.insert(0, ROOT)
+    sys.path.insert(0, HERE)
+    from app import app, db
+    from seed import seed as seed_db
+
+    with app.app_context():
+        started = time.perf_counter()
+        rows = seed_db(db, scale, overrides, seed)
+        seed_seconds = time.perf_counter() - started
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['tank_id'] = 1
+
+    cases = {name: http_case(client, path) for name, path in CASES.items()}
+    cases['model_fit'] = model_fit_case(app)
+    if only:
+        unknown = set(only) - set(cases)
+        if unknown:
+            sys.exit(f"Unknown case(s): {', '.join(sorted(unknown))} (known: {', '.join(cases)})")
+        cases = {name: fn for name, fn in cases.items() if name in only}
+
+    results = {name: measure(fn, warmup, repeat) for name, fn in cases.items()}
+    return {
+        'scale': scale,
+        'overrides': overrides,
+        'seed': seed,
+        'rows': rows,
+        'seed_seconds': round(seed_seconds, 2),
+        'python': sys.version.split()[0],
+        'results': results,
+    }
+
+
+def compare(results, baseline, tolerance, slack_ms):
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        limit = base['median_ms'] * tolerance + slack_ms
+        if current['median_ms'] > limit:
+            regressions.append(f"{name}: median {current['median_ms']:.2f} ms > {limit:.2f} ms "
+                               f"(baseline {base['median_ms']:.2f} ms)")
+        if base.get('queries') is not None and current['queries'] is not None and current['queries'] > base['queries']:
+            regressions.append(f"{name}: {current['queries']} queries > baseline {base['queries']}")
+    return regressions
+
+
+def load_baseline():
+    if not os.path.exists(BASELINE):
+        return {}
+    with open(BASELINE) as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', default='small', help='small, medium or large (see seed.SCALES)')
+    parser.add_argument('--set', action='append', metavar='KEY=VALUE', help='override one scale setting')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--repeat', type=int, default=15)
+    parser.add_argument('--only', help='comma separated case names')
+    parser.add_argument('--tolerance', type=float, default=1.5, help='allowed median slowdown factor')
+    parser.add_argument('--slack-ms', type=float, default=5.0, help='absolute slack added to the limit')
+    parser.add_argument('--update-baseline', action='store_true', help='write these results as the baseline')
+    parser.add_argument('--json', action='store_true', help='print a JSON report')
+    args = parser.parse_args()
+
+    overrides = parse_set(args.set)
+    only = [c for c in (args.only or '').split(',') if c]
+    report = run_benchmarks(args.scale, overrides, args.seed, args.warmup, args.repeat, only)
+
+    # Baselines are only comparable for the same dataset
+    key = args.scale if not overrides and args.seed == 42 else None
+    baseline = load_baseline()
+    regressions = []
+    if key and key in baseline and not args.update_baseline:
+        regressions = compare(report['results'], baseline[key]['results'], args.tolerance, args.slack_ms)
+    report['regressions'] = regressions
+
+    if args.update_baseline:
+        if key is None:
+            sys.exit("--update-baseline only records the default dataset (no --set, --seed 42)")
+        entry = baseline.get(key, {'results': {}})
+        entry.update({k: report[k] for k in ('rows', 'python')})
+        entry['results'].update(report['results'])
+        baseline[key] = entry
+        with open(BASELINE, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write('\n')
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        rows = ', '.join(f"{n}={c}" for n, c in report['rows'].items())
+        print(f"scale {args.scale}: seeded in {report['seed_seconds']} s ({rows})")
+        base = baseline.get(key, {}).get('results', {}) if key else {}
+        print(f"  {'case':24} {'median':>9} {'p95':>9} {'min':>9} {'queries':>8} {'baseline':>9}")
+        for name, r in report['results'].items():
+            b = base.get(name, {}).get('median_ms')
+            print(f"  {name:24} {r['median_ms']:9.2f} {r['p95_ms']:9.2f} {r['min_ms']:9.2f} "
+                  f"{'-' if r['queries'] is None else r['queries']:>8} {'-' if b is None else f'{b:.2f}':>9}")
+        if args.update_baseline:
+            print(f"Baseline '{key}' written to {os.path.relpath(BASELINE, ROOT)}")
+        for line in regressions:
+            print(f"REGRESSION {line}")
+
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
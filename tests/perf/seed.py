@@ -0,0 +1,28 @@
+"""
+Deterministic SQLite dataset for the benchmarks in tests/perf/bench.py.
+
+    seed(db, scale='small', overrides={'corals_per_tank': 5000}, seed=42)
+
+Rows come from modules.synthetic_data with a fixed end date, so the same
+scale and seed always produce the same rows and timings are comparable
+between runs and machines.
+"""
+from datetime import date
+
+from sqlalchemy import text
+
+from modules.synthetic_data import SCALES, generate, resolve_scale  # noqa: F401  (SCALES re-exported for --help)
+
+END_DATE = date(2025, 6, 1)
+
+
+def seed(db, scale='small', overrides=None, seed=42):
+    """Create all tables in an empty SQLite database and fill them. Returns row counts per table."""
+    spec = resolve_scale(scale, overrides)
+    db.create_all(bind_key=None)
+    # products.used_amt is a generated column in MySQL and not mapped on the model
+    db.session.execute(text(
+        "ALTER TABLE products ADD COLUMN used_amt FLOAT GENERATED ALWAYS AS (total_volume - current_avail) VIRTUAL"
+    ))
+    db.session.commit()
+    return generate(db.engine, spec, seed=seed, end=END_DATE)
@@ -0,0 +1,88 @@
+from datetime import date, datetime, time, timedelta
+
+import pytest
+from app import app, db
+from modules import archive, models
+
+
+@pytest.fixture
+def archive_dir(tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, 'ARCHIVE_DIR', str(tmp_path))
+    return tmp_path
+
+
+def test_compact_moves_old_rows_and_series_merges_them(archive_dir):
+    with app.app_context():
+        tank = models.Tank(name="archive-tank")
+        db.session.add(tank)
+        db.session.commit()
+        tank_id = tank.id
+        start = date(2024, 1, 1)
+        db.session.add_all([
+            models.TestResults(tank_id=tank_id, test_date=start + timedelta(days=i), test_time=time(9, 0), alk=8.0 + i / 100)
+            for i in range(90)
+        ])
+        db.session.add_all([
+            models.ProbeReading(tank_id=tank_id, probe='ph', reading_time=datetime(2024, 1, 1) + timedelta(minutes=i), value=8.1)
+            for i in range(100)
+        ])
+        db.session.commit()
+
+        result = archive.compact(older_than_days=30, tank_id=tank_id, now=datetime(2024, 3, 31))
+        assert result['test_results'] == 31 + 29  # January and February
+        assert result['probe_readings'] == 100
+        assert models.TestResults.query.filter_by(tank_id=tank_id).count() == 30
+
+        segments = archive.list_segments(archive.TEST_SOURCE, tank_id)
+        assert [p.rsplit('/', 1)[1] for p in segments] == ['2024-01.seg', '2024-02.seg']
+        header, data = archive.read_segment(segments[0], ['alk'])
+        assert header['rows'] == 31
+        assert data['alk'][0] == pytest.approx(8.0)
+
+        # Compacting again is a no-op and never duplicates archived rows
+        archive.compact(older_than_days=30, tank_id=tank_id, now=datetime(2024, 3, 31))
+        assert archive.read_segment(segments[0])[0]['rows'] == 31
+
+    with app.test_client() as client:
+        body = client.get(f"/api/v1/tests/series?tank_id={tank_id}&params=alk,ph&points=1000").get_json()
+        assert body['series']['alk']['raw_count'] == 90
+        assert body['series']['ph']['raw_count'] == 100
+        ts = [p[0] for p in body['series']['alk']['data']]
+        assert ts == sorted(ts)
+
+        body = client.get(
+            f"/api/v1/tests/series?tank_id={tank_id}&params=alk&start=2024-01-10&end=2024-02-05&points=1000"
+        ).get_json()
+        assert body['series']['alk']['raw_count'] == 27
+
+
+def test_compact_streams_in_bounded_batches(archive_dir, monkeypatch):
+    monkeypatch.setitem(app.config, 'ARCHIVE_BATCH_ROWS', 7)
+    with app.app_context():
+        tank = models.Tank(name="archive-batch-tank")
+        db.session.add(tank)
+        db.session.commit()
+        tank_id = tank.id
+        # Inserted newest first, so id order and time order disagree across batches
+        db.session.add_all([
+            models.TestResults(tank_id=tank_id, test_date=date(2024, 2, 29) - timedelta(days=i), test_time=time(9, 0), alk=8.0)
+            for i in range(60)
+        ])
+        db.session.add_all([
+            models.ProbeReading(tank_id=tank_id, probe='ph', reading_time=datetime(2024, 1, 1) + timedelta(hours=12 * i), value=8.1)
+            for i in range(100)
+        ])
+        db.session.commit()
+
+        fetched = []
+        original = archive._write_month_groups
+        monkeypatch.setattr(archive, '_write_month_groups', lambda *a: fetched.append(len(a[2])) or original(*a))
+        result = archive.compact(older_than_days=30, tank_id=tank_id, now=datetime(2024, 3, 31))
+        assert result['test_results'] == 60
+        assert result['probe_readings'] == 100
+        assert max(fetched) <= 7
+
+        headers = [archive.read_segment(p)[0] for p in archive.list_segments(archive.TEST_SOURCE, tank_id)]
+        assert [h['rows'] for h in headers] == [31, 29]
+        _, data = archive.read_segment(archive.list_segments(archive.TEST_SOURCE, tank_id)[0], ['ts'])
+        assert list(data['ts']) == sorted(data['ts'])
@@ -0,0 +1,113 @@
+import asyncio
+from datetime import date, datetime, time
+
+from flask import session as flask_session
+from sqlalchemy import create_engine, event
+
+from app import app, db
+from modules import async_db, models
+from modules.db_functions import delete_row, read_rows, update_row
+from modules.db_pool import pool_stats
+from modules.db_routing import STICKY_KEY
+
+
+def test_async_uri_swaps_in_asyncio_drivers():
+    uri = async_db.async_database_uri
+    assert uri({'SQLALCHEMY_DATABASE_URI': 'mysql+pymysql://u:p@h:3306/reef'}) == 'mysql+aiomysql://u:p@h:3306/reef'
+    assert uri({'SQLALCHEMY_DATABASE_URI': 'sqlite:////tmp/reef.db'}) == 'sqlite+aiosqlite:////tmp/reef.db'
+    assert uri({'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:'}) is None  # cannot be shared
+    assert uri({'SQLALCHEMY_DATABASE_URI': 'sqlite:///x.db', 'ASYNC_SQLALCHEMY_DATABASE_URI': 'sqlite+aiosqlite:///y.db'}) \
+        == 'sqlite+aiosqlite:///y.db'
+
+
+def test_db_functions_run_on_the_async_engine(tmp_path, monkeypatch):
+    path = tmp_path / 'async.db'
+    sync_engine = create_engine(f"sqlite:///{path}")
+    db.metadata.create_all(sync_engine)
+    with sync_engine.begin() as conn:
+        conn.execute(models.Tank.__table__.insert(), [{'id': 1, 'name': 'async tank'}])
+        conn.execute(models.Products.__table__.insert(), [{'id': 1, 'name': 'Alk'}, {'id': 2, 'name': 'Cal'}])
+        conn.execute(models.DSchedule.__table__.insert(), [
+            {'id': i, 'tank_id': 1, 'product_id': i, 'trigger_interval': 3600, 'amount': 2.0} for i in (1, 2)
+        ])
+        conn.execute(models.TestResults.__table__.insert(), [
+            {'tank_id': 1, 'test_date': date(2025, 1, d), 'test_time': time(8), 'alk': 8.0 + d / 10} for d in range(1, 6)
+        ])
+    monkeypatch.setitem(app.config, 'ASYNC_SQLALCHEMY_DATABASE_URI', f"sqlite+aiosqlite:///{path}")
+
+    with app.app_context():
+        engine = async_db.get_async_engine()
+        open_now, most = [0], [0]
+
+        def checkout(*args):
+            open_now[0] += 1
+            most[0] = max(most[0], open_now[0])
+
+        def checkin(*args):
+            open_now[0] -= 1
+
+        event.listen(engine.sync_engine, 'checkout', checkout)
+        event.listen(engine.sync_engine, 'checkin', checkin)
+
+        async def scenario():
+            assert await update_row(models.DSchedule, {'id': 2}, {'amount': 7.5})
+            schedules, tests = await asyncio.gather(
+                read_rows(models.DSchedule, {'tank_id': 1}),
+                read_rows(models.TestResults, {'tank_id': 1}),
+            )
+            assert await delete_row(models.TestResults, {'alk': 8.1})
+            return schedules, tests, await read_rows(models.TestResults)
+
+        schedules, tests, remaining = asyncio.run(scenario())
+        assert sorted(s.amount for s in schedules) == [2.0, 7.5]
+        assert len(tests) == 5 and len(remaining) == 4
+        assert most[0] >= 2  # the gathered reads held separate connections at the same time
+
+        resp = app.test_client().get('/api/v1/dashboard/summary?tank_id=1&tests=3')
+        body = resp.get_json()
+        assert resp.status_code == 200
+        assert [t['alk'] for t in body['tests']] == [8.5, 8.4, 8.3]
+        assert len(body['schedules']) == 2 and body['alkalinity_models'] == []
+
+        # Later "requests" (each its own event loop, as Flask runs async views) reuse pooled connections
+        connects = [0]
+        event.listen(engine.sync_engine, 'connect', lambda *args: connects.__setitem__(0, connects[0] + 1))
+        for _ in range(5):
+            asyncio.run(read_rows(models.DSchedule, {'tank_id': 1}))
+        assert connects[0] == 0
+        assert pool_stats()['async_default']['class'] == 'InstrumentedAsyncQueuePool'
+
+        # A committed write pins this browser session to the primary, as RoutingSession commits do
+        monkeypatch.setitem(app.config, 'REPLICA_STICKY_SECONDS', 30)
+        with app.test_request_context():
+            asyncio.run(read_rows(models.DSchedule))
+            assert STICKY_KEY not in flask_session
+            asyncio.run(update_row(models.DSchedule, {'id': 1}, {'amount': 3.0}))
+            assert flask_session[STICKY_KEY] > datetime.now().timestamp()
+        asyncio.run(async_db.dispose_engines())
+
+
+def test_dashboard_falls_back_to_session_for_memory_db():
+    with app.app_context():
+        tank = models.Tank(name='async-fallback')
+        db.session.add(tank)
+        db.session.commit()
+        tank_id = tank.id
+    client = app.test_client()
+    assert client.get('/api/v1/dashboard/summary').status_code == 400
+    resp = client.get(f'/api/v1/dashboard/summary?tank_id={tank_id}')
+    assert resp.status_code == 200
+    assert resp.get_json() == {'tank_id': tank_id, 'tests': [], 'schedules': [], 'alkalinity_models': []}
+
+
+def test_gevent_workers_use_the_pooled_session(tmp_path, monkeypatch):
+    # The async engine points at an empty database; the result proves db.session was used
+    monkeypatch.setitem(app.config, 'ASYNC_SQLALCHEMY_DATABASE_URI', f"sqlite+aiosqlite:///{tmp_path / 'unused.db'}")
+    monkeypatch.setattr(async_db, '_gevent_patched', lambda: True)
+    with app.app_context():
+        tank = models.Tank(name='async-gevent')
+        db.session.add(tank)
+        db.session.commit()
+        names = [t.name for t in asyncio.run(read_rows(models.Tank))]
+    assert 'async-gevent' in names
+    assert not (tmp_path / 'unused.db').exists()
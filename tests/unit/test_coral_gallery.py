@@ -0,0 +1,98 @@
+from datetime import date
+
+from app import app, db
+from modules import models
+
+
+def _seed(suffix):
+    with app.app_context():
+        tank = models.Tank(name="gallery-tank")
+        sps = models.Taxonomy(genus='Seriatopora', species=f'hystrix {suffix}', type='SPS')
+        lps = models.Taxonomy(genus='Duncanopsammia', species=f'axifuga {suffix}', type='LPS')
+        vendor = models.Vendors(tag='GV', name='Gallery Vendor')
+        db.session.add_all([tank, sps, lps, vendor])
+        db.session.commit()
+        db.session.add_all([
+            models.Coral(coral_name=f"Coral {i}", date_acquired=date(2025, 2, 1), tank_id=tank.id,
+                         taxonomy_id=(sps if i % 2 else lps).id, health_status='Healthy' if i % 3 else 'Stressed',
+                         placement='Top', vendors_id=vendor.id if i < 5 else None,
+                         photo=f"coral{i}.jpg" if i == 9 else None)
+            for i in range(10)
+        ])
+        db.session.commit()
+        return tank.id, vendor.id
+
+
+def test_gallery_cursor_pages_and_filters():
+    tank_id, vendor_id = _seed('cursor')
+    with app.test_client() as client:
+        seen = []
+        cursor = None
+        while True:
+            url = f"/web/fn/corals/gallery?tank_id={tank_id}&limit=4" + (f"&cursor={cursor}" if cursor else "")
+            body = client.get(url).get_json()
+            seen += [c['name'] for c in body['cards']]
+            cursor = body['next_cursor']
+            if not cursor:
+                break
+        assert seen == [f"Coral {i}" for i in range(9, -1, -1)]
+
+        first = client.get(f"/web/fn/corals/gallery?tank_id={tank_id}&limit=1").get_json()['cards'][0]
+        assert first['thumbnail_url'].endswith('coral9.jpg')
+        assert (first['genus'], first['type'], first['vendor']) == ('Seriatopora', 'SPS', None)
+
+        body = client.get(f"/web/fn/corals/gallery?tank_id={tank_id}&type=SPS&health_status=Healthy&vendor={vendor_id}").get_json()
+        assert [c['name'] for c in body['cards']] == ['Coral 1']
+
+        assert client.get(f"/web/fn/corals/gallery?tank_id={tank_id}&flow=Torrential").status_code == 400
+        assert client.get(f"/web/fn/corals/gallery?tank_id={tank_id}&cursor=garbage").status_code == 400
+
+
+def test_datatables_corals_page_in_sql():
+    tank_id, _ = _seed('datatables')
+    with app.test_client() as client:
+        with client.session_transaction() as sess:
+            sess['tank_id'] = tank_id
+        body = client.get("/web/fn/get/corals?page=2&rows=3&sidx=coral_name&sord=desc&search=stressed").get_json()
+        assert body['recordsTotal'] == 10
+        assert body['recordsFiltered'] == 4  # 0, 3, 6, 9
+        assert [r['coral_name'] for r in body['data']] == ['Coral 0']
+
+
+def test_datatables_corals_search_matches_dates_and_numbers():
+    tank_id, _ = _seed('search-cast')
+    with app.app_context():
+        coral = models.Coral.query.filter_by(tank_id=tank_id, coral_name='Coral 4').one()
+        coral.par = 4321
+        coral.last_fragged = date(2019, 7, 14)
+        db.session.commit()
+    with app.test_client() as client:
+        with client.session_transaction() as sess:
+            sess['tank_id'] = tank_id
+        for search in ('4321', '2019-07-14'):
+            body = client.get(f"/web/fn/get/corals?search={search}").get_json()
+            assert [r['coral_name'] for r in body['data']] == ['Coral 4']
+        assert client.get("/web/fn/get/corals?search=2025-02-01").get_json()['recordsFiltered'] == 10
+
+
+def test_schema_indexes_adds_missing_coral_indexes_idempotently():
+    from sqlalchemy import inspect, text
+
+    def coral_indexes():
+        return {ix['name'] for ix in inspect(db.engine).get_indexes('corals')}
+
+    with app.app_context():
+        db.session.execute(text("DROP INDEX ix_corals_tank_flow_id"))
+        db.session.commit()
+        assert 'ix_corals_tank_flow_id' not in coral_indexes()
+
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=['schema', 'indexes', '--dry-run'])
+    assert 'corals: missing ix_corals_tank_flow_id' in result.output
+    result = runner.invoke(args=['schema', 'indexes'])
+    assert result.exit_code == 0, result.output
+    assert 'corals: creating ix_corals_tank_flow_id' in result.output
+    with app.app_context():
+        assert {'ix_corals_tank_id_id', 'ix_corals_tank_flow_id', 'ix_corals_tank_vendor_id'} <= coral_indexes()
+
+    assert runner.invoke(args=['schema', 'indexes']).output.strip() == 'Created 0 index(es).'
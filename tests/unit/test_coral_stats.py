@@ -0,0 +1,63 @@
+from datetime import date
+
+from sqlalchemy import event
+
+from app import app, db
+from modules import models
+
+
+def test_coral_stats_is_one_query_scoped_and_paged():
+    with app.app_context():
+        tank = models.Tank(name="stats-tank")
+        other = models.Tank(name="stats-other")
+        taxon = models.Taxonomy(genus='Montipora', species='capricornis', type='SPS', common_name='Cap')
+        db.session.add_all([tank, other, taxon])
+        db.session.commit()
+        morph = models.ColorMorphs(taxonomy_id=taxon.id, morph_name='Red')
+        db.session.add(morph)
+        db.session.commit()
+        db.session.add_all([
+            models.Coral(coral_name=f"Cap {i}", date_acquired=date(2025, 1, 1), tank_id=tank.id,
+                         taxonomy_id=taxon.id, color_morphs_id=morph.id if i % 2 else None)
+            for i in range(7)
+        ])
+        db.session.add(models.Coral(coral_name="Elsewhere", date_acquired=date(2025, 1, 1),
+                                    tank_id=other.id, taxonomy_id=taxon.id))
+        db.session.commit()
+        tank_id = tank.id
+
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            with app.test_client() as client:
+                with client.session_transaction() as sess:
+                    sess['tank_id'] = tank_id
+                first = client.get('/web/fn/corals/stats?per_page=5')
+                second = client.get('/web/fn/corals/stats?per_page=5&page=2')
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+
+    # One SELECT per request in total: lazy loads of tanks/taxonomy/color_morphs would add more
+    selects = [s for s in statements if s.lstrip().upper().startswith(('SELECT', 'WITH'))]
+    assert len(selects) == 2, selects
+    assert first.headers['X-Total-Count'] == '7'
+    cards = first.get_json() + second.get_json()
+    assert [c['card_title'][1] for c in cards] == [f"Cap {i}" for i in range(7)]
+    assert [c['color_morph'][1] for c in cards[:2]] == ['', 'Red']
+    assert {c['tank'][1] for c in cards} == {'stats-tank'}
+    assert cards[0]['common_name'][1] == 'Cap'
+
+
+def test_coral_stats_needs_a_tank():
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            resp = app.test_client().get('/web/fn/corals/stats')
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+    assert resp.get_json() == []
+    assert resp.headers['X-Total-Count'] == '0'
+    assert not [s for s in statements if 'corals' in s]
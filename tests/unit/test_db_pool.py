@@ -0,0 +1,70 @@
+import os
+
+import pytest
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+
+from app import app
+from modules.db_pool import InstrumentedQueuePool, engine_options, register_engines, pool_stats
+
+
+def _sample(name, pool):
+    return REGISTRY.get_sample_value(name, {'pool': pool})
+
+
+def test_pool_options_and_metrics(tmp_path):
+    options = engine_options(dict(app.config, DB_POOL_SIZE=1, DB_MAX_OVERFLOW=0, DB_POOL_TIMEOUT=0.05))
+    assert options['poolclass'] is InstrumentedQueuePool
+    assert options['pool_pre_ping'] is True and options['pool_recycle'] == app.config['DB_POOL_RECYCLE']
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", **options)
+    register_engines({'unit': engine})
+    timeouts_before = _sample('db_pool_timeouts_total', 'unit') or 0
+
+    held = engine.connect()
+    held.execute(text("select 1"))
+    assert pool_stats()['unit']['checked_out'] == 1
+    assert _sample('db_pool_checked_out', 'unit') == 1
+    with pytest.raises(PoolTimeout):
+        engine.connect()
+    assert _sample('db_pool_timeouts_total', 'unit') == timeouts_before + 1
+    held.close()
+
+    assert pool_stats()['unit']['checked_in'] == 1
+    assert _sample('db_pool_checkout_seconds_count', 'unit') >= 2
+
+    # Disposing (as gunicorn's post_fork does) keeps reporting under the same name
+    engine.dispose(close=False)
+    with engine.connect():
+        assert pool_stats()['unit']['checked_out'] == 1
+    assert app.test_client().get('/api/v1/db/pool').get_json()['unit']['size'] == 1
+
+
+def test_post_fork_disposes_every_engine(monkeypatch):
+    import runpy
+    import types
+    from app import db
+    from modules import async_db
+
+    monkeypatch.setenv('GUNICORN_WORKER_CLASS', 'sync')
+    conf = os.path.join(os.path.dirname(__file__), '..', '..', 'gunicorn.conf.py')
+    post_fork = runpy.run_path(conf)['post_fork']
+    monkeypatch.setitem(post_fork.__globals__, 'preload_app', True)
+
+    disposed = []
+    with app.app_context():
+        engines = dict(db.engines)
+    for key, engine in engines.items():
+        monkeypatch.setattr(engine, 'dispose', lambda close=True, key=key: disposed.append((key, close)))
+    async_engine = types.SimpleNamespace(sync_engine=types.SimpleNamespace(
+        dispose=lambda close=True: disposed.append(('async', close))))
+    monkeypatch.setitem(async_db._engines, ('sqlite+aiosqlite:///x.db', 'async_default'), async_engine)
+
+    logged = []
+    server = types.SimpleNamespace(log=types.SimpleNamespace(info=logged.append))
+    post_fork(server, types.SimpleNamespace(pid=123))
+
+    assert sorted(disposed, key=str) == sorted([(key, False) for key in engines] + [('async', False)], key=str)
+    assert async_db._engines == {}
+    assert logged
@@ -0,0 +1,128 @@
+import sqlite3
+import time
+
+from flask import Flask, jsonify
+from flask_sqlalchemy import SQLAlchemy
+from prometheus_client import REGISTRY
+from sqlalchemy import insert, text
+
+from modules.db_routing import RoutingSession, primary_reads, replica_binds, replica_reads, replica_router
+
+
+def _make_app(tmp_path, replica_uri):
+    app = Flask('routing_test')
+    app.config.update(
+        SECRET_KEY='test',
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'primary.db'}",
+        SQLALCHEMY_BINDS=replica_binds(replica_uri),
+        REPLICA_STICKY_SECONDS=60,
+    )
+    db = SQLAlchemy(app, session_options={'class_': RoutingSession})
+
+    class Item(db.Model):
+        id = db.Column(db.Integer, primary_key=True)
+        name = db.Column(db.String(32))
+
+    @app.get('/items')
+    @replica_reads
+    def list_items():
+        return jsonify(sorted(name for (name,) in db.session.query(Item.name)))
+
+    @app.get('/items/primary')
+    @replica_reads
+    def list_items_primary():
+        with primary_reads():
+            return jsonify(sorted(name for (name,) in db.session.query(Item.name)))
+
+    @app.post('/items/<name>')
+    def add_item(name):
+        db.session.add(Item(name=name))
+        db.session.commit()
+        return jsonify({'success': True})
+
+    @app.post('/items/core/<name>')
+    def add_item_core(name):
+        db.session.execute(insert(Item).values(name=name))
+        db.session.commit()
+        return jsonify({'success': True})
+
+    @app.post('/items/text/<name>')
+    def add_item_text(name):
+        db.session.execute(text("INSERT INTO item (name) VALUES (:name)"), {'name': name})
+        db.session.commit()
+        return jsonify({'success': True})
+
+    with app.app_context():
+        db.create_all(bind_key=None)
+        db.session.add(Item(name='primary'))
+        db.session.commit()
+    return app
+
+
+def _seed_replica(path):
+    con = sqlite3.connect(path)
+    con.execute("create table item (id integer primary key, name varchar(32))")
+    con.execute("insert into item (name) values ('replica')")
+    con.commit()
+    con.close()
+
+
+def test_reads_go_to_replica_until_this_session_writes(tmp_path):
+    replica_router.reset()
+    _seed_replica(tmp_path / 'replica.db')
+    app = _make_app(tmp_path, f"sqlite:///{tmp_path / 'replica.db'}")
+    writer, reader = app.test_client(), app.test_client()
+
+    assert writer.get('/items').get_json() == ['replica']
+    assert writer.get('/items/primary').get_json() == ['primary']
+
+    # Read-your-writes: the writer is pinned to the primary, other sessions are not
+    writer.post('/items/fresh')
+    assert writer.get('/items').get_json() == ['fresh', 'primary']
+    assert reader.get('/items').get_json() == ['replica']
+
+    # The pin expires after REPLICA_STICKY_SECONDS
+    app.config['REPLICA_STICKY_SECONDS'] = 0.2
+    late = app.test_client()
+    late.post('/items/late')
+    assert 'late' in late.get('/items').get_json()
+    time.sleep(0.25)
+    assert late.get('/items').get_json() == ['replica']
+
+
+def test_core_and_text_writes_stick_to_primary(tmp_path):
+    replica_router.reset()
+    _seed_replica(tmp_path / 'replica.db')
+    app = _make_app(tmp_path, f"sqlite:///{tmp_path / 'replica.db'}")
+    core, raw, reader = app.test_client(), app.test_client(), app.test_client()
+
+    core.post('/items/core/by-core')
+    assert 'by-core' in core.get('/items').get_json()
+    raw.post('/items/text/by-text')
+    assert 'by-text' in raw.get('/items').get_json()
+    assert reader.get('/items').get_json() == ['replica']
+
+
+def test_replica_failing_mid_query_retries_on_primary(tmp_path):
+    replica_router.reset()
+    # Connects fine, but has no item table, so the SELECT itself fails
+    sqlite3.connect(tmp_path / 'empty.db').close()
+    app = _make_app(tmp_path, f"sqlite:///{tmp_path / 'empty.db'}")
+    before = REGISTRY.get_sample_value('db_replica_failures_total', {'replica': 'replica_0'}) or 0
+    client = app.test_client()
+    assert client.get('/items').get_json() == ['primary']
+    assert REGISTRY.get_sample_value('db_replica_failures_total', {'replica': 'replica_0'}) == before + 1
+    assert client.get('/items').get_json() == ['primary']
+    replica_router.reset()
+
+
+def test_unreachable_replica_falls_back_to_primary(tmp_path):
+    replica_router.reset()
+    before = REGISTRY.get_sample_value('db_replica_failures_total', {'replica': 'replica_0'}) or 0
+    app = _make_app(tmp_path, f"sqlite:///{tmp_path / 'missing' / 'replica.db'}")
+    client = app.test_client()
+    assert client.get('/items').get_json() == ['primary']
+    assert client.get('/items').get_json() == ['primary']
+    # Checked once, then skipped for REPLICA_RETRY_SECONDS
+    assert REGISTRY.get_sample_value('db_replica_failures_total', {'replica': 'replica_0'}) == before + 1
+    replica_router.reset()
@@ -0,0 +1,65 @@
+from app import app, db
+from modules import models
+
+
+def _client_for_new_tank(name):
+    with app.app_context():
+        tank = models.Tank(name=name)
+        db.session.add(tank)
+        db.session.commit()
+        tank_id = tank.id
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['tank_id'] = tank_id
+    return client, tank_id
+
+
+def test_new_product_and_schedule_in_one_submit():
+    client, tank_id = _client_for_new_tank('svc-recurring')
+    resp = client.post('/doser/submit', json={
+        'form_type': 'recurring', 'product_id': 'add_new_product', 'name': 'Svc Alk',
+        'total_volume': 4000, 'current_avail': 4000, 'amount': 5, 'trigger_interval': 3600,
+        'schedule_time': '2025-01-01 08:00:00',
+    })
+    assert resp.status_code == 201, resp.get_json()
+    body = resp.get_json()
+    with app.app_context():
+        schedule = db.session.get(models.DSchedule, body['id'])
+        assert schedule.tank_id == tank_id
+        assert schedule.product_id == body['product_id']
+        assert db.session.get(models.Products, body['product_id']).name == 'Svc Alk'
+
+
+def test_failed_step_rolls_back_new_product():
+    client, _ = _client_for_new_tank('svc-rollback')
+    resp = client.post('/doser/submit', json={
+        'form_type': 'recurring', 'product_id': 'add_new_product', 'name': 'Svc Orphan',
+        'amount': 5, 'schedule_time': '2025-01-01 08:00:00',  # no trigger_interval
+    })
+    assert resp.status_code == 400
+    assert 'trigger_interval' in resp.get_json()['error']
+    with app.app_context():
+        assert models.Products.query.filter_by(name='Svc Orphan').count() == 0
+
+
+def test_single_dose_and_duplicate_schedule():
+    client, tank_id = _client_for_new_tank('svc-single')
+    product = client.post('/web/fn/ops/new/products', json={'name': 'Svc Cal', 'total_volume': 1000})
+    assert product.status_code == 201
+    product_id = product.get_json()['id']
+
+    dose = client.post('/doser/submit', json={
+        'form_type': 'single', 'product_id': product_id, 'amount': 2.5, 'schedule_time': '2025-02-03 10:15:00',
+    })
+    assert dose.status_code == 201, dose.get_json()
+    with app.app_context():
+        row = db.session.get(models.Dosing, dose.get_json()['id'])
+        assert row.amount == 2.5 and row.trigger_time.hour == 10
+        # A single dose has no schedule, so (as in `rollups rebuild`) it is not attributed to a tank
+        assert models.DosingRollup.query.filter_by(product_id=product_id).count() == 0
+
+    first = client.post('/web/fn/ops/new/d_schedule', json={'product_id': product_id, 'amount': 1, 'trigger_interval': 60})
+    second = client.post('/web/fn/ops/new/d_schedule', json={'product_id': product_id, 'amount': 1, 'trigger_interval': 60})
+    assert first.status_code == 201
+    assert second.status_code == 400
+    assert second.get_json()['error'] == 'A schedule already exists for this tank and product.'
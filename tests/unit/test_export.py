@@ -0,0 +1,79 @@
+import io
+from datetime import date, datetime, time
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from app import app, db
+from modules import models
+from modules.export import write_export
+
+
+def test_export_streams_typed_parquet_and_arrow(tmp_path):
+    with app.app_context():
+        tank = models.Tank(name="export-tank")
+        other = models.Tank(name="export-other")
+        product = models.Products(name="export-alk")
+        db.session.add_all([tank, other, product])
+        db.session.commit()
+        db.session.add_all([
+            models.TestResults(tank_id=tank.id, test_date=date(2025, 1, i + 1), test_time=time(8, 0), alk=8.0 + i / 10)
+            for i in range(25)
+        ])
+        db.session.add(models.TestResults(tank_id=other.id, test_date=date(2025, 1, 1), alk=7.0))
+        schedule = models.DSchedule(trigger_interval=3600, amount=2.5, tank_id=tank.id, product_id=product.id)
+        db.session.add(schedule)
+        db.session.commit()
+        db.session.add(models.Dosing(trigger_time=datetime(2025, 1, 1, 6), amount=2.5,
+                                     product_id=product.id, schedule_id=schedule.id))
+        db.session.commit()
+        tank_id = tank.id
+
+        # Small batches: each one becomes its own row group
+        path = tmp_path / "tests.parquet"
+        assert write_export('test_results', tank_id, 'parquet', str(path), batch_rows=10) == 25
+        parquet = pq.ParquetFile(path)
+        assert parquet.metadata.num_row_groups == 3
+        table = parquet.read()
+        assert table.schema.field('test_date').type == pa.date32()
+        assert table.schema.field('alk').type == pa.float64()
+        assert table.column('alk').to_pylist()[:2] == [8.0, 8.1]
+
+    with app.test_client() as client:
+        resp = client.get(f"/api/v1/export/dosing?tank_id={tank_id}&format=arrow")
+        assert resp.status_code == 200
+        assert resp.headers['Content-Disposition'].endswith(f'tank{tank_id}_dosing.arrows"')
+        dosing = pa.ipc.open_stream(io.BytesIO(resp.data)).read_all()
+        assert dosing.column('tank_id').to_pylist() == [tank_id]
+        assert dosing.column('amount').to_pylist() == [2.5]
+
+        resp = client.get(f"/api/v1/export/corals?tank_id={tank_id}")
+        assert pq.read_table(io.BytesIO(resp.data)).num_rows == 0
+
+        assert client.get(f"/api/v1/export/vendors?tank_id={tank_id}").status_code == 404
+        assert client.get(f"/api/v1/export/dosing?tank_id={tank_id}&format=csv").status_code == 400
+
+
+def test_export_includes_archived_test_results(tmp_path, monkeypatch):
+    from modules import archive
+    monkeypatch.setitem(app.config, 'ARCHIVE_DIR', str(tmp_path / "archive"))
+    with app.app_context():
+        tank = models.Tank(name="export-archived")
+        db.session.add(tank)
+        db.session.commit()
+        db.session.add_all([
+            models.TestResults(tank_id=tank.id, test_date=date(2024, 1, 5), test_time=time(9, 0), alk=7.5, cal=420),
+            models.TestResults(tank_id=tank.id, test_date=date(2024, 3, 20), test_time=time(9, 0), alk=8.0),
+        ])
+        db.session.commit()
+        tank_id = tank.id
+        archive.compact(older_than_days=30, tank_id=tank_id, now=datetime(2024, 3, 31))
+        assert models.TestResults.query.filter_by(tank_id=tank_id).count() == 1
+
+        path = tmp_path / "tests.parquet"
+        assert write_export('test_results', tank_id, 'parquet', str(path)) == 2
+        table = pq.read_table(path)
+        assert table.column('test_date').to_pylist() == [date(2024, 1, 5), date(2024, 3, 20)]
+        assert table.column('test_time').to_pylist() == [time(9, 0), time(9, 0)]
+        assert table.column('alk').to_pylist() == [7.5, 8.0]
+        assert table.column('cal').to_pylist() == [420, None]
+        assert table.column('tank_id').to_pylist() == [tank_id, tank_id]
@@ -0,0 +1,111 @@
+from datetime import date, datetime, time
+
+from app import app, db
+from app.routes.api.grafana import _parse_time
+from modules import models, rollups
+from modules.db_functions import create_row
+
+
+def test_rollups_update_on_insert_and_serve_grafana():
+    with app.app_context():
+        tank = models.Tank(name="grafana-tank")
+        db.session.add(tank)
+        db.session.commit()
+        for hour, alk in ((9, 8.0), (9, 9.0), (15, 7.0)):
+            create_row(models.TestResults, {
+                'tank_id': tank.id,
+                'test_date': date(2025, 3, 1),
+                'test_time': time(hour, 30),
+                'alk': alk,
+            })
+        tank_id = tank.id
+
+        hourly = rollups.get_test_series(tank_id, 'alk', 'hour', *_range())
+        assert [(r[1], r[2], r[3], r[4]) for r in hourly] == [(2, 17.0, 8.0, 9.0), (1, 7.0, 7.0, 7.0)]
+
+    with app.test_client() as client:
+        resp = client.post("/api/v1/grafana/search", json={'target': 'grafana-tank'})
+        assert {'text': 'grafana-tank alk', 'value': f'tank:{tank_id}:alk'} in resp.get_json()
+
+        query = {
+            'range': {'from': '2025-03-01T00:00:00.000Z', 'to': '2025-03-02T00:00:00.000Z'},
+            'maxDataPoints': 500,
+            'targets': [{'target': f'tank:{tank_id}:alk'}],
+        }
+        resp = client.post("/api/v1/grafana/query", json=query)
+        assert resp.status_code == 200
+        assert [p[0] for p in resp.get_json()[0]['datapoints']] == [8.5, 7.0]
+
+        # A tiny point budget falls back to the daily rollup
+        query['maxDataPoints'] = 2
+        resp = client.post("/api/v1/grafana/query", json=query)
+        assert [p[0] for p in resp.get_json()[0]['datapoints']] == [8.0]
+
+    with app.app_context():
+        # Rebuilding from raw rows reproduces the incremental result
+        rollups.rebuild_rollups()
+        daily = rollups.get_test_series(tank_id, 'alk', 'day', *_range())
+        assert [(r[1], r[2]) for r in daily] == [(3, 24.0)]
+
+
+def test_edits_and_deletes_refresh_rollups():
+    with app.app_context():
+        tank = models.Tank(name="grafana-edit-tank")
+        product = models.Products(name="grafana-edit-alk")
+        db.session.add_all([tank, product])
+        db.session.flush()
+        schedule = models.DSchedule(tank_id=tank.id, product_id=product.id, amount=1, trigger_interval=60)
+        db.session.add(schedule)
+        db.session.commit()
+        tank_id, product_id = tank.id, product.id
+        rows = [
+            create_row(models.TestResults, {
+                'tank_id': tank_id, 'test_date': date(2025, 3, 1), 'test_time': time(hour, 30), 'alk': alk,
+            })
+            for hour, alk in ((9, 8.0), (15, 7.0))
+        ]
+        dose = create_row(models.Dosing, {
+            'schedule_id': schedule.id, 'product_id': product_id,
+            'trigger_time': datetime(2025, 3, 1, 8), 'amount': 4.0,
+        })
+        # Unscheduled doses have no tank, so they are not rolled up on any path
+        create_row(models.Dosing, {'product_id': product_id, 'trigger_time': datetime(2025, 3, 1, 9), 'amount': 9.0})
+        db.session.commit()
+        first_id, dose_id = rows[0].id, dose.id
+        assert [(r[1], r[2]) for r in rollups.get_dose_series(tank_id, product_id, 'day', *_range())] == [(1, 4.0)]
+
+        # Move the 09:30 result to the next day with a new value
+        row = db.session.get(models.TestResults, first_id)
+        days = rollups.affected_days(row)
+        row.test_date, row.alk = date(2025, 3, 2), 9.5
+        db.session.flush()
+        rollups.refresh_days(days + rollups.affected_days(row))
+        db.session.commit()
+        daily = rollups.get_test_series(tank_id, 'alk', 'day', datetime(2025, 3, 1), datetime(2025, 3, 3))
+        assert [(r[1], r[2], r[3], r[4]) for r in daily] == [(1, 7.0, 7.0, 7.0), (1, 9.5, 9.5, 9.5)]
+        assert [r[0].hour for r in rollups.get_test_series(tank_id, 'alk', 'hour', *_range())] == [15]
+
+    with app.test_client() as client:
+        resp = client.delete("/web/fn/ops/delete/dosing", json={'id': dose_id})
+        assert resp.status_code == 200
+        resp = client.delete("/web/fn/ops/delete/test_results", json={'id': first_id})
+        assert resp.status_code == 200
+
+    with app.app_context():
+        assert rollups.get_dose_series(tank_id, product_id, 'day', *_range()) == []
+        daily = rollups.get_test_series(tank_id, 'alk', 'day', datetime(2025, 3, 1), datetime(2025, 3, 3))
+        assert [(r[1], r[2]) for r in daily] == [(1, 7.0)]
+        incremental = models.TestRollup.query.filter_by(tank_id=tank_id).count()
+        rollups.rebuild_rollups()
+        assert models.TestRollup.query.filter_by(tank_id=tank_id).count() == incremental
+        assert rollups.get_dose_series(tank_id, product_id, 'day', *_range()) == []
+
+
+def test_parse_time_converts_offsets_to_utc():
+    assert _parse_time('2025-03-01T10:00:00.000Z') == datetime(2025, 3, 1, 10)
+    assert _parse_time('2025-03-01T10:00:00+02:00') == datetime(2025, 3, 1, 8)
+    assert _parse_time('2025-03-01T10:00:00') == datetime(2025, 3, 1, 10)
+
+
+def _range():
+    return datetime(2025, 3, 1), datetime(2025, 3, 2)
@@ -0,0 +1,43 @@
+import importlib.util
+import os
+import random
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+spec = importlib.util.spec_from_file_location('load_test', os.path.join(ROOT, 'bin', 'load_test.py'))
+load_test = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(load_test)
+
+
+def test_percentiles_use_nearest_rank():
+    values = list(range(1, 101))
+    assert load_test.percentile(values, 50) == 50
+    assert load_test.percentile(values, 95) == 95
+    assert load_test.percentile(values, 99) == 99
+    assert load_test.percentile([7], 99) == 7
+    assert load_test.percentile([], 50) is None
+
+
+def test_summary_counts_errors_and_throughput():
+    recorder = load_test.Recorder()
+    recorder.add('ignored', 1.0, 200)  # before warmup ends
+    recorder.recording = True
+    for ms in (10, 20, 30, 40):
+        recorder.add('coral_stats', ms / 1000, 200)
+    recorder.add('dose', 0.005, 500)
+    recorder.add('dose', 0.5, 'error')
+    rows, total = load_test.summarize(recorder, elapsed=2.0)
+    assert 'ignored' not in rows
+    assert rows['coral_stats']['p50_ms'] == 20 and rows['coral_stats']['max_ms'] == 40
+    assert rows['coral_stats']['rps'] == 2.0
+    assert rows['dose']['errors'] == 2
+    assert total['requests'] == 6 and total['errors'] == 2
+
+
+def test_mix_weights_and_requests():
+    names, builders, weights = load_test.build_mix(['dose=0', 'coral_stats=50'])
+    assert 'dose' not in names
+    assert weights[names.index('coral_stats')] == 50
+    user = load_test.User(random.Random(1), {'tank_id': 1, 'schedules': [], 'genera': ['Acropora']})
+    method, path, body = dict(zip(names, builders))['tests_datatable'](user)
+    assert method == 'GET' and path.startswith('/web/fn/ops/get/test_results/datatable?draw=1&')
+    assert load_test._dose(user) is None  # no schedules discovered
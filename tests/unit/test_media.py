@@ -0,0 +1,116 @@
+import io
+
+import pytest
+from PIL import Image
+
+from app import app
+from modules import media
+
+
+@pytest.fixture
+def upload_dir(tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, 'UPLOAD_DIR', str(tmp_path))
+    return tmp_path
+
+
+def _jpeg(width, height):
+    buf = io.BytesIO()
+    Image.new('RGB', (width, height), (200, 80, 40)).save(buf, 'JPEG')
+    return buf.getvalue()
+
+
+def test_upload_renders_content_addressed_renditions(upload_dir):
+    data = _jpeg(2000, 1500)
+    with app.test_client() as client:
+        resp = client.post('/web/fn/timeline/upload', data={'file': (io.BytesIO(data), 'reef.jpg')},
+                           content_type='multipart/form-data')
+        assert resp.status_code == 200
+        body = resp.get_json()
+        digest = body['hash']
+        assert len(digest) == 64
+        assert body['renditions']['thumbnail'] == f"/web/fn/media/{digest}/320.webp"
+
+        resp = client.get(body['renditions']['thumbnail'])
+        assert resp.status_code == 200
+        assert resp.mimetype == 'image/webp'
+        assert 'immutable' in resp.headers['Cache-Control']
+        assert 'max-age=31536000' in resp.headers['Cache-Control']
+        assert Image.open(io.BytesIO(resp.data)).size == (320, 240)
+        assert len(resp.data) < len(data)
+
+        media.rendition_worker.wait(digest, timeout=30)
+        large = client.get(f"/web/fn/media/{digest}/1280.jpg")
+        assert Image.open(io.BytesIO(large.data)).size == (1280, 960)
+        assert client.get(f"/web/fn/media/{digest}/1280.jpg",
+                          headers={'If-None-Match': large.headers['ETag']}).status_code == 304
+
+        # Same bytes, same digest; unknown digests and sizes are 404s
+        again = client.post('/web/fn/timeline/upload', data={'file': (io.BytesIO(data), 'copy.jpg')},
+                            content_type='multipart/form-data').get_json()
+        assert again['hash'] == digest
+        assert again['duplicate'] is True and body['duplicate'] is False
+        assert client.get(f"/web/fn/media/{'0' * 64}/320.webp").status_code == 404
+        assert client.get(f"/web/fn/media/{digest}/999.webp").status_code == 404
+
+        resp = client.post('/web/fn/timeline/upload', data={'file': (io.BytesIO(b'not an image'), 'x.png')},
+                           content_type='multipart/form-data')
+        assert resp.status_code == 400
+
+
+def test_store_streams_in_chunks_and_dedups(upload_dir):
+    from werkzeug.datastructures import FileStorage
+    from app.routes.corals import save_coral_photo
+
+    data = _jpeg(64, 64)
+
+    class Recorder(io.BytesIO):
+        reads = []
+
+        def read(self, size=-1):
+            Recorder.reads.append(size)
+            return super().read(size)
+
+    digest, ext, duplicate = media.store_original(FileStorage(Recorder(data), 'a.jpeg'), chunk_size=1024)
+    assert (ext, duplicate) == ('jpg', False)
+    assert all(size == 1024 for size in Recorder.reads) and len(Recorder.reads) > 1
+
+    # Coral.photo stores the hash; a second copy under another name is not stored again
+    with app.test_request_context():
+        assert save_coral_photo(FileStorage(io.BytesIO(data), 'b.jpg')) == digest
+        assert save_coral_photo(None) is None
+    media.rendition_worker.wait(digest, timeout=30)
+    originals = [p for p in (upload_dir / 'originals').rglob('*') if p.is_file()]
+    assert [p.name for p in originals] == [f"{digest}.jpg"]
+    assert not any((upload_dir / 'incoming').iterdir())
+
+    with pytest.raises(media.InvalidImage):
+        media.store_original(FileStorage(io.BytesIO(b'GIF89a-nope'), 'c.gif'))
+    assert not any((upload_dir / 'incoming').iterdir())
+
+
+def test_atomic_write_uses_unique_temp_files(tmp_path, monkeypatch):
+    import tempfile
+    path = str(tmp_path / 'a' / 'out.bin')
+    seen = []
+    mkstemp = tempfile.mkstemp
+
+    def recording_mkstemp(**kwargs):
+        fd, name = mkstemp(**kwargs)
+        seen.append(name)
+        return fd, name
+
+    monkeypatch.setattr(media.tempfile, 'mkstemp', recording_mkstemp)
+    media._atomic_write(path, lambda f: f.write(b'x'))
+    media._atomic_write(path, lambda f: f.write(b'y'))
+    assert open(path, 'rb').read() == b'y'
+    assert len(set(seen)) == 2 and all(name.startswith(str(tmp_path / 'a')) for name in seen)
+    assert sorted(p.name for p in (tmp_path / 'a').iterdir()) == ['out.bin']
+
+
+def test_rendering_leaves_the_gevent_hub(monkeypatch):
+    import threading
+    from gevent import monkey
+    monkey_patched = monkey.is_module_patched
+    monkeypatch.setattr(monkey, 'is_module_patched', lambda name: name == 'threading' or monkey_patched(name))
+    caller = threading.get_ident()
+    assert media._off_hub(threading.get_ident) != caller
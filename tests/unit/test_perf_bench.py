@@ -0,0 +1,35 @@
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+BENCH = os.path.join(ROOT, 'tests', 'perf', 'bench.py')
+
+
+def test_bench_runs_on_tiny_dataset():
+    env = {k: v for k, v in os.environ.items() if k != 'SQLALCHEMY_DATABASE_URI'}
+    proc = subprocess.run(
+        [sys.executable, BENCH, '--set', 'days=10', '--set', 'corals_per_tank=20', '--set', 'genera=5',
+         '--only', 'advanced_join,schedule_stats,coral_grid,model_fit', '--warmup', '0', '--repeat', '1', '--json'],
+        cwd=ROOT, env=env, capture_output=True, text=True, timeout=180,
+    )
+    assert proc.returncode == 0, proc.stderr
+    report = json.loads(proc.stdout[proc.stdout.index('{'):])
+    assert report['rows']['corals'] == 40
+    assert set(report['results']) == {'advanced_join', 'schedule_stats', 'coral_grid', 'model_fit'}
+    assert report['results']['schedule_stats']['queries'] >= 1
+    assert report['regressions'] == []  # overridden datasets are never compared
+
+
+def test_resolve_scale_overrides():
+    sys.path.insert(0, os.path.join(ROOT, 'tests', 'perf'))
+    from seed import resolve_scale  # re-exported from modules.synthetic_data
+
+    assert resolve_scale('small', {'tanks': '4'})['tanks'] == 4
+    try:
+        resolve_scale('small', {'nope': 1})
+    except ValueError:
+        pass
+    else:
+        raise AssertionError('unknown setting accepted')
@@ -0,0 +1,122 @@
+import io
+import random
+from datetime import date
+
+import pytest
+from PIL import Image, ImageDraw
+
+from app import app, db
+from modules import media, models
+from modules.photo_similarity import BKTree, dhash, hamming, similarity_index, to_signed
+
+
+@pytest.fixture
+def upload_dir(tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, 'UPLOAD_DIR', str(tmp_path))
+    return tmp_path
+
+
+def _scene(seed, size=(800, 600)):
+    rng = random.Random(seed)
+    img = Image.new('RGB', size, (10, 40, 90))
+    draw = ImageDraw.Draw(img)
+    for _ in range(12):
+        x, y = rng.randrange(size[0]), rng.randrange(size[1])
+        r = rng.randrange(30, 150)
+        draw.ellipse((x - r, y - r, x + r, y + r), fill=tuple(rng.randrange(256) for _ in range(3)))
+    return img
+
+
+def _encode(img, fmt='JPEG', **options):
+    buf = io.BytesIO()
+    img.save(buf, fmt, **options)
+    return buf.getvalue()
+
+
+def test_bk_tree_matches_brute_force():
+    rng = random.Random(7)
+    values = [rng.getrandbits(64) for _ in range(2000)]
+    # A few near-duplicates so small radii have something to find
+    values += [v ^ (1 << rng.randrange(64)) for v in values[:50]]
+    tree = BKTree()
+    for i, v in enumerate(values):
+        tree.add(v, i)
+    for q in values[:20]:
+        for radius in (0, 4, 12):
+            expected = sorted((hamming(q, v), i) for i, v in enumerate(values) if hamming(q, v) <= radius)
+            assert tree.search(q, radius) == expected
+    tree.remove(values[0], 0)
+    assert 0 not in [key for _, key in tree.search(values[0], 0)]
+    assert tree.size == len(values) - 1
+
+
+def test_dhash_survives_resize_and_reencode():
+    img = _scene(1)
+    copy = Image.open(io.BytesIO(_encode(img.resize((400, 300)), quality=60)))
+    assert hamming(dhash(img), dhash(copy)) <= 4
+    assert hamming(dhash(img), dhash(_scene(2))) > 10
+
+
+def test_similar_endpoints_find_reuploaded_photo(upload_dir):
+    similarity_index.reset()
+    original = _scene(11)
+    uploads = {
+        'original': _encode(original),
+        'smaller': _encode(original.resize((640, 480)), quality=70),
+        'other': _encode(_scene(12)),
+    }
+    digests = {}
+    with app.test_client() as client:
+        for name, data in uploads.items():
+            body = client.post('/web/fn/timeline/upload', data={'file': (io.BytesIO(data), f"{name}.jpg")},
+                               content_type='multipart/form-data').get_json()
+            digests[name] = body['hash']
+            media.rendition_worker.wait(body['hash'], timeout=30)
+
+        with app.app_context():
+            assert db.session.get(models.PhotoHash, digests['original']) is not None
+            tank = models.Tank(name="similarity-tank")
+            taxon = models.Taxonomy(genus='Similaria', species='photo', type='SPS')
+            db.session.add_all([tank, taxon])
+            db.session.flush()
+            coral = models.Coral(coral_name='Frag A', photo=digests['original'], taxonomy_id=taxon.id,
+                                 tank_id=tank.id, date_acquired=date(2025, 3, 1))
+            twin = models.Coral(coral_name='Frag B', photo=digests['smaller'], taxonomy_id=taxon.id,
+                                tank_id=tank.id, date_acquired=date(2025, 3, 1))
+            db.session.add_all([coral, twin])
+            db.session.commit()
+            coral_id, twin_id = coral.id, twin.id
+
+        found = client.get(f"/web/fn/media/{digests['original']}/similar").get_json()
+        assert [m['digest'] for m in found] == [digests['smaller']]
+        assert found[0]['corals'][0]['id'] == twin_id
+
+        resp = client.get(f"/web/fn/corals/{coral_id}/similar?max_distance=6")
+        assert resp.status_code == 200
+        assert [m['digest'] for m in resp.get_json()] == [digests['smaller']]
+
+        # The index is rebuilt from photo_hashes after a restart
+        similarity_index.reset()
+        assert client.get(f"/web/fn/media/{digests['smaller']}/similar").get_json()[0]['digest'] == digests['original']
+        assert client.get(f"/web/fn/media/{'0' * 64}/similar").status_code == 404
+        assert client.get('/web/fn/corals/999999/similar').status_code == 404
+
+
+def test_index_sees_hashes_written_by_other_workers(monkeypatch):
+    similarity_index.reset()
+    with app.app_context():
+        similarity_index.search(0)  # load the (possibly empty) tree
+        # Another worker stores a hash this process never saw
+        digest = 'e' * 64
+        db.session.add(models.PhotoHash(digest=digest, dhash=to_signed(0xF0F0F0F0F0F0F0F0)))
+        db.session.commit()
+
+        assert similarity_index.hash_of(digest) == 0xF0F0F0F0F0F0F0F0
+        assert (0, digest) in similarity_index.search(0xF0F0F0F0F0F0F0F0, 0)
+
+        other = 'f' * 64
+        db.session.add(models.PhotoHash(digest=other, dhash=to_signed(0xF0F0F0F0F0F0F0F1)))
+        db.session.commit()
+        assert (1, other) not in similarity_index.search(0xF0F0F0F0F0F0F0F0, 2)
+        monkeypatch.setattr(similarity_index, 'reload_seconds', 0)
+        assert (1, other) in similarity_index.search(0xF0F0F0F0F0F0F0F0, 2)
@@ -0,0 +1,110 @@
+from datetime import datetime
+
+from app import app, db
+from modules import models
+from modules.probe_buffer import probe_buffer
+
+
+def test_probe_readings_are_buffered_then_flushed(monkeypatch):
+    with app.app_context():
+        tank = models.Tank(name="probe-tank")
+        db.session.add(tank)
+        db.session.commit()
+        tank_id = tank.id
+
+    base = 1735689600000  # 2025-01-01T00:00:00Z
+    readings = [[base + i * 15000, 8.0 + (i % 10) / 100] for i in range(240)]
+    with app.test_client() as client:
+        resp = client.post("/api/v1/probes/readings", json={'tank_id': tank_id, 'probe': 'ph', 'readings': readings})
+        assert resp.status_code == 202
+        assert resp.get_json()['accepted'] == 240
+
+        probe_buffer.flush()
+        assert probe_buffer.stats()['depth'] == 0
+        with app.app_context():
+            assert models.ProbeReading.query.filter_by(tank_id=tank_id).count() == 240
+
+        resp = client.get(f"/api/v1/tests/series?tank_id={tank_id}&params=ph&points=24")
+        series = resp.get_json()['series']['ph']
+        assert series['raw_count'] == 240
+        assert len(series['data']) == 24
+
+        # A full buffer pushes back instead of growing without bound
+        monkeypatch.setattr(probe_buffer, 'max_size', 10)
+        resp = client.post("/api/v1/probes/readings", json={'tank_id': tank_id, 'probe': 'ph', 'readings': readings[:20]})
+        assert resp.status_code == 503
+        assert resp.headers['Retry-After']
+        assert client.get("/api/v1/probes/stats").get_json()['rejected'] >= 20
+
+
+def test_probe_readings_are_validated_and_bad_rows_dead_lettered():
+    with app.app_context():
+        tank = models.Tank(name="probe-tank-dlq")
+        db.session.add(tank)
+        db.session.commit()
+        tank_id = tank.id
+
+    base = 1735689600000
+    with app.test_client() as client:
+        resp = client.post("/api/v1/probes/readings", json={'tank_id': 987654, 'probe': 'ph', 'readings': [[base, 8.1]]})
+        assert resp.status_code == 404
+        for bad in ('nan', 'inf', '-inf'):
+            resp = client.post("/api/v1/probes/readings", json={'tank_id': tank_id, 'probe': 'ph', 'readings': [[base, bad]]})
+            assert resp.status_code == 400
+            assert 'finite' in resp.get_json()['error']
+        assert client.get("/api/v1/probes/stats").get_json()['depth'] == 0
+
+    # A row the database refuses is dead-lettered; the rest of the batch is still written
+    good = {'tank_id': tank_id, 'probe': 'ph', 'reading_time': datetime(2025, 2, 1), 'value': 8.2}
+    bad = dict(good, value=None)
+    probe_buffer.submit([good, bad, dict(good, value=8.3)])
+    assert probe_buffer.flush() == 2
+    assert probe_buffer.stats()['depth'] == 0
+    assert probe_buffer.dead_letters[-1][0] is bad
+    with app.app_context():
+        assert models.ProbeReading.query.filter_by(tank_id=tank_id).count() == 2
+
+
+def test_rows_written_before_an_outage_are_counted_once(monkeypatch):
+    import pytest
+    from sqlalchemy.exc import OperationalError
+    from modules import probe_buffer as probe_buffer_module
+
+    with app.app_context():
+        tank = models.Tank(name="probe-tank-outage")
+        db.session.add(tank)
+        db.session.commit()
+        tank_id = tank.id
+
+    rows = [
+        {'tank_id': tank_id, 'probe': 'ph', 'reading_time': datetime(2025, 3, 1, 0, i), 'value': 8.0 + i / 10}
+        for i in range(4)
+    ]
+    rows[1]['value'] = None  # refused, so the batch is retried row by row
+
+    # Calls: the multi-row insert, rows 0 and 1, then the database goes away on row 2
+    real_insert = probe_buffer_module.insert
+    calls = []
+
+    def flaky_insert(table):
+        calls.append(table)
+        if len(calls) == 4:
+            raise OperationalError("INSERT", {}, Exception("server has gone away"))
+        return real_insert(table)
+
+    # A private buffer without the background flusher, so only this test flushes it
+    buffer = probe_buffer_module.ProbeBuffer(max_size=100, flush_rows=100, flush_seconds=60)
+    monkeypatch.setattr(buffer, '_ensure_worker', lambda: None)
+    monkeypatch.setattr(probe_buffer_module, 'insert', flaky_insert)
+    buffer.submit(rows)
+    with pytest.raises(OperationalError):
+        buffer.flush()
+    assert buffer.stats()['flushed'] == 1
+    assert buffer.stats()['dead_lettered'] == 1
+    assert list(buffer._queue) == rows[2:]
+
+    monkeypatch.setattr(probe_buffer_module, 'insert', real_insert)
+    assert buffer.flush() == 2
+    assert buffer.stats()['flushed'] == 3
+    with app.app_context():
+        assert models.ProbeReading.query.filter_by(tank_id=tank_id).count() == 3
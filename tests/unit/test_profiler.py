@@ -0,0 +1,66 @@
+import time
+
+from app import app
+from app.routes.web import corals as coral_routes
+from modules.profiler import Sampler, _get_ident
+
+
+def _slow_tank_id():
+    time.sleep(0.05)
+    return 1
+
+
+def test_request_profile_returns_collapsed_stacks(monkeypatch):
+    monkeypatch.setattr(coral_routes, 'get_current_tank_id', _slow_tank_id)
+    with app.test_client() as client:
+        # Disabled without a token: the flag is ignored
+        resp = client.get('/web/fn/corals/stats?__profile=1')
+        assert resp.is_json and 'X-Profile-Samples' not in resp.headers
+        assert client.get('/api/v1/profiler/result').status_code == 404
+
+        monkeypatch.setitem(app.config, 'PROFILER_TOKEN', 'secret')
+        monkeypatch.setitem(app.config, 'PROFILER_INTERVAL_MS', 1)
+        resp = client.get('/web/fn/corals/stats?__profile=1', headers={'X-Profile-Token': 'wrong'})
+        assert resp.is_json
+
+        resp = client.get('/web/fn/corals/stats?__profile=1&token=secret')
+        assert resp.mimetype == 'text/plain'
+        assert int(resp.headers['X-Profile-Samples']) > 0
+        assert resp.headers['X-Profile-Status'] == '200'
+        assert resp.headers['X-Profile-Mode'] == 'thread'
+        lines = resp.get_data(as_text=True).strip().splitlines()
+        assert any('get_coral_stats;' in line and '_slow_tank_id' in line for line in lines)
+        assert all(line.rsplit(' ', 1)[1].isdigit() for line in lines)
+
+
+def test_worker_profile_is_time_boxed_and_token_gated(monkeypatch):
+    monkeypatch.setitem(app.config, 'PROFILER_TOKEN', 'secret')
+    headers = {'X-Profile-Token': 'secret'}
+    with app.test_client() as client:
+        assert client.post('/api/v1/profiler/start?seconds=0.3').status_code == 403
+        assert client.post('/api/v1/profiler/start?seconds=0.3&interval_ms=2', headers=headers).status_code == 202
+        assert client.post('/api/v1/profiler/start', headers=headers).status_code == 409
+        time.sleep(0.5)
+        body = client.get('/api/v1/profiler/result?format=json', headers=headers).get_json()
+        assert body['running'] is False
+        assert body['samples'] > 10
+        assert 0.25 <= body['duration_seconds'] < 1
+        assert client.get('/api/v1/profiler/result', headers=headers).mimetype == 'text/plain'
+
+
+def _parked(parent):
+    parent.switch()
+
+
+def test_sampler_follows_one_greenlet_not_its_thread():
+    import greenlet
+    main = greenlet.getcurrent()
+    g = greenlet.greenlet(_parked)
+    g.switch(main)  # runs until it switches back, then stays suspended in _parked
+    sampler = Sampler(0.001, 5, thread_ids=[_get_ident()], greenlet=g).start()
+    time.sleep(0.05)  # the thread is busy in this frame, the greenlet is not
+    profile = sampler.stop()
+    g.switch()
+    assert profile.samples > 0
+    assert any(stack.endswith('_parked') for stack in profile.stacks)
+    assert not any('test_sampler_follows_one_greenlet' in stack for stack in profile.stacks)
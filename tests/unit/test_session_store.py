@@ -0,0 +1,64 @@
+from prometheus_client import REGISTRY
+
+from app import app, db
+from modules import models
+from modules.session_store import CachedCookieSessionInterface, SqlSessionInterface
+
+
+def _hits(backend):
+    return REGISTRY.get_sample_value('session_cache_hits_total', {'backend': backend}) or 0
+
+
+def _set_tank(client, tank_id):
+    return client.post('/set_tank', data={'tank_id': tank_id})
+
+
+def test_cookie_sessions_are_cached_and_only_written_on_change(monkeypatch):
+    monkeypatch.setattr(app, 'session_interface', CachedCookieSessionInterface(100, 60))
+    with app.test_client() as client:
+        assert 'Set-Cookie' in _set_tank(client, 7).headers
+        hits = _hits('cookie')
+        for _ in range(3):
+            resp = client.get('/web/fn/corals/stats')
+            assert 'Set-Cookie' not in resp.headers
+        assert _hits('cookie') == hits + 2  # first read decodes, the rest hit the cache
+        with client.session_transaction() as sess:
+            assert sess['tank_id'] == 7
+
+
+def test_sql_sessions_version_the_cookie_and_skip_unchanged_writes(monkeypatch):
+    with app.app_context():
+        db.create_all()
+        interface = SqlSessionInterface(db, 100, 60)
+        monkeypatch.setattr(app, 'session_interface', interface)
+        with app.test_client() as client:
+            # Reading a missing session creates nothing
+            client.get('/web/fn/corals/stats')
+            before = db.session.query(models.WebSession).count()
+
+            resp = _set_tank(client, 3)
+            cookie = client.get_cookie('session').value
+            sid = cookie.split('.', 1)[0]
+            row = db.session.get(models.WebSession, sid)
+            assert db.session.query(models.WebSession).count() == before + 1
+            assert row.version == 1 and app.json.loads(row.data)['tank_id'] == 3
+            assert cookie.startswith(f"{sid}.1.")
+
+            hits = _hits('sql')
+            assert 'Set-Cookie' not in client.get('/web/fn/corals/stats').headers
+            assert _hits('sql') == hits + 1
+            db.session.expire_all()
+            assert db.session.get(models.WebSession, sid).version == 1
+
+            # A change bumps the version, so another process's cache can't serve the old value
+            _set_tank(client, 4)
+            assert client.get_cookie('session').value.startswith(f"{sid}.2.")
+            fresh = SqlSessionInterface(db, 100, 60)
+            monkeypatch.setattr(app, 'session_interface', fresh)
+            with client.session_transaction() as sess:
+                assert sess['tank_id'] == 4
+
+            # Tampered cookies start a new, empty session
+            client.set_cookie('session', cookie[:-2] + 'xx')
+            with client.session_transaction() as sess:
+                assert 'tank_id' not in sess
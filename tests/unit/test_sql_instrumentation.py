@@ -0,0 +1,31 @@
+import logging
+
+from prometheus_client import REGISTRY
+
+from app import app
+from modules import sql_instrumentation
+
+
+def test_requests_report_query_count_and_server_timing(monkeypatch, caplog):
+    sql_instrumentation.query_stats.reset()
+    endpoint = 'web_fn.coral_api.get_coral_stats'
+    before = REGISTRY.get_sample_value('sql_queries_per_request_count', {'endpoint': endpoint}) or 0
+    with app.test_client() as client:
+        with client.session_transaction() as sess:
+            sess['tank_id'] = 1
+        resp = client.get('/web/fn/corals/stats')
+        assert resp.status_code == 200
+        timing = resp.headers['Server-Timing']
+        assert timing.startswith('db;dur=') and 'desc="1 queries"' in timing and 'app;dur=' in timing
+        assert REGISTRY.get_sample_value('sql_queries_per_request_count', {'endpoint': endpoint}) == before + 1
+
+        monkeypatch.setitem(sql_instrumentation._settings, 'slow_ms', 0)
+        with caplog.at_level(logging.WARNING, logger='sql'):
+            client.get('/web/fn/corals/stats')
+        assert any('Slow query' in r.message and endpoint in r.message for r in caplog.records)
+
+        stats = {row['endpoint']: row for row in client.get('/api/v1/db/queries').get_json()}
+        assert stats[endpoint]['requests'] == 2
+        assert stats[endpoint]['avg_queries'] == 1
+        assert 'corals' in stats[endpoint]['slowest_sql']
+        assert client.get('/api/v1/db/queries?sort=bogus').status_code == 400
@@ -0,0 +1,26 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _import_app(code):
+    env = dict(os.environ, TESTING='true', SQLALCHEMY_DATABASE_URI='sqlite:///:memory:', PYTHONPATH=ROOT)
+    return subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=env, capture_output=True, text=True, timeout=120)
+
+
+def test_app_import_defers_numeric_stack():
+    proc = _import_app(
+        "import sys, app\n"
+        "print('boot:' + ','.join(m for m in ('numpy', 'sklearn', 'pandas', 'scipy') if m in sys.modules))\n"
+        "from modules.utils import timeseries\n"
+        "timeseries.bucket_aggregate([0, 1000], [1.0, 2.0], 1)\n"
+        "print('used:' + str('numpy' in sys.modules))\n"
+    )
+    assert proc.returncode == 0, proc.stderr
+    lines = proc.stdout.splitlines()
+    assert 'boot:' in lines
+    assert 'used:True' in lines
+    # No credentials in the boot log
+    assert 'DB_PASS' not in proc.stderr
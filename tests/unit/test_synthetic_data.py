@@ -0,0 +1,73 @@
+from datetime import date
+
+from sqlalchemy import create_engine, event, text
+
+from app import db
+from modules.synthetic_data import generate, resolve_scale
+
+SPEC = resolve_scale('small', {'days': 30, 'corals_per_tank': 50, 'genera': 5, 'doses_per_day': 4})
+
+
+def _fresh_engine(foreign_keys=False):
+    engine = create_engine('sqlite://')
+    if foreign_keys:
+        @event.listens_for(engine, 'connect')
+        def _enable_fks(dbapi_conn, _):
+            dbapi_conn.execute('PRAGMA foreign_keys=ON')
+    db.metadata.create_all(engine)
+    return engine
+
+
+def _dump(engine, table):
+    with engine.connect() as conn:
+        return conn.execute(text(f"SELECT * FROM {table} ORDER BY id")).all()
+
+
+def test_same_seed_same_rows():
+    a, b = _fresh_engine(), _fresh_engine()
+    generate(a, SPEC, seed=3, end=date(2025, 1, 31))
+    generate(b, SPEC, seed=3, end=date(2025, 1, 31))
+    for table in ('test_results', 'dosing', 'corals', 'products'):
+        assert _dump(a, table) == _dump(b, table)
+
+
+def test_rows_are_consistent():
+    engine = _fresh_engine()
+    counts = generate(engine, SPEC, seed=1, end=date(2025, 1, 31))
+    assert counts['test_results'] == 2 * 30
+    assert counts['corals'] == 2 * 50
+    with engine.connect() as conn:
+        # morphs always belong to the coral's taxonomy
+        assert conn.execute(text(
+            "SELECT COUNT(*) FROM corals c JOIN color_morphs m ON m.id = c.color_morphs_id "
+            "WHERE m.taxonomy_id != c.taxonomy_id"
+        )).scalar() == 0
+        # doses come from schedules of the same product, and never exceed the schedule's cadence
+        assert conn.execute(text(
+            "SELECT COUNT(*) FROM dosing d JOIN d_schedule s ON s.id = d.schedule_id WHERE s.product_id != d.product_id"
+        )).scalar() == 0
+        assert counts['dosing'] <= counts['d_schedule'] * 30 * 4
+        # every tank doses alkalinity
+        assert conn.execute(text(
+            "SELECT COUNT(DISTINCT s.tank_id) FROM d_schedule s JOIN products p ON p.id = s.product_id WHERE p.uses = '+Alk'"
+        )).scalar() == 2
+
+
+def test_appends_after_existing_rows():
+    engine = _fresh_engine()
+    generate(engine, SPEC, seed=1, end=date(2025, 1, 31))
+    generate(engine, SPEC, seed=2, end=date(2025, 1, 31))
+    tanks = _dump(engine, 'tanks')
+    assert [t.id for t in tanks] == [1, 2, 3, 4]
+
+
+def test_insert_order_satisfies_foreign_keys():
+    engine = _fresh_engine(foreign_keys=True)
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA foreign_keys")).scalar() == 1
+    counts = generate(engine, SPEC, seed=4, end=date(2025, 1, 31))
+    assert counts['dosing'] > 0
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA foreign_key_check")).all() == []
+        # stock columns are filled in after the dosing events
+        assert conn.execute(text("SELECT COUNT(*) FROM products WHERE current_avail < total_volume")).scalar() > 0
@@ -0,0 +1,35 @@
+from app import app, db
+from modules import models
+from modules.tank_context import tank_catalogue
+
+
+def test_tank_catalogue_caches_and_invalidates_on_writes():
+    with app.app_context():
+        tank_catalogue.invalidate()
+        misses = tank_catalogue.misses
+        first = tank_catalogue.get()
+        assert tank_catalogue.get() is first
+        assert tank_catalogue.misses == misses + 1
+        assert tank_catalogue.stats()['hits'] >= 1
+
+        # Writes outside table_ops are only picked up after the TTL
+        db.session.add(models.Tank(name="cache-direct"))
+        db.session.commit()
+        assert "cache-direct" not in [t.name for t in tank_catalogue.get()]
+
+    with app.test_client() as client:
+        resp = client.post("/web/fn/ops/new/tanks", json={'name': 'cache-new'})
+        assert resp.status_code == 201
+        new_id = resp.get_json()['id']
+
+    with app.app_context():
+        names = [t.name for t in tank_catalogue.get()]
+        assert 'cache-new' in names and 'cache-direct' in names
+        cached = tank_catalogue.get()
+
+    with app.test_client() as client:
+        client.post("/web/fn/ops/edit/tanks", json={'id': new_id, 'name': 'cache-renamed'})
+
+    with app.app_context():
+        assert tank_catalogue.get() is not cached
+        assert 'cache-renamed' in [t.name for t in tank_catalogue.get()]
@@ -0,0 +1,75 @@
+import time
+
+from app import app, db
+from modules import models
+from modules.taxonomy_suggest import SuggestIndex, suggest_index
+
+
+def test_suggest_ranks_prefix_and_fuzzy_matches_fast():
+    index = SuggestIndex(rebuild_seconds=3600)
+    taxa = [(1, 'Acropora', 'millepora', 'Milli', 'SPS'), (2, 'Euphyllia', 'paraancora', 'Hammer', 'LPS')]
+    taxa += [(10 + i, f'Genus{i % 500}', f'species{i}', None, 'LPS') for i in range(2000)]
+    morphs = [(i, f'Morph {i} Rainbow', 10 + i % 2000) for i in range(100_000)]
+    morphs.append((200_000, 'Walt Disney', 1))
+    index.load(taxa, morphs)
+
+    assert index.search('acro')[0]['kind'] == 'genus'
+    assert index.search('acro mil')[0]['label'] == 'Acropora millepora'
+    assert index.search('hammer')[0] == {
+        'kind': 'common_name', 'id': 2, 'taxonomy_id': 2, 'genus': 'Euphyllia',
+        'species': 'paraancora', 'type': 'LPS', 'label': 'Hammer', 'score': index.search('hammer')[0]['score'],
+    }
+    walt = index.search('walt dis')[0]
+    assert (walt['kind'], walt['genus'], walt['id']) == ('morph', 'Acropora', 200_000)
+    assert index.search('acorpora')[0]['genus'] == 'Acropora'  # typo -> trigram fallback
+    assert len(index.search('morph', limit=5)) == 5
+
+    started = time.perf_counter()
+    for _ in range(200):
+        index.search('rainb')
+        index.search('walt d')
+    assert (time.perf_counter() - started) / 400 < 0.005
+
+    # Incremental updates touch only the changed rows
+    index.upsert_taxon(1, 'Acropora', 'tenuis', 'Milli', 'SPS')
+    assert index.search('acro ten')[0]['label'] == 'Acropora tenuis'
+    assert index.search('walt')[0]['species'] == 'tenuis'
+    index.remove_morph(200_000)
+    assert all(r['label'] != 'Walt Disney' for r in index.search('walt'))
+
+
+
+def test_name_prefix_matches_survive_a_crowded_token_range():
+    index = SuggestIndex(rebuild_seconds=3600)
+    taxa = [(1, 'Redia', 'minor', 'Red', 'LPS'), (2, 'Acropora', 'tenuis', None, 'SPS')]
+    # More "... red" morphs than SCAN_LIMIT, all sorting before the genus token "redia"
+    morphs = [(i, f'Ultra {i} Red', 2) for i in range(1000)]
+    index.load(taxa, morphs)
+
+    results = index.search('red', limit=3)
+    assert [(r['kind'], r['label']) for r in results[:2]] == [('common_name', 'Red'), ('genus', 'Redia')]
+    assert index.search('redi')[0]['label'] == 'Redia'
+
+    # Incremental updates keep the name lists in step
+    index.upsert_taxon(1, 'Rhodactis', 'minor', None, 'LPS')
+    assert all(r['label'] not in ('Red', 'Redia') for r in index.search('red', limit=50))
+    assert index.search('rho')[0]['label'] == 'Rhodactis'
+
+
+def test_suggest_endpoint_follows_table_ops_writes():
+    with app.app_context():
+        taxon = models.Taxonomy(genus='Zoanthus', species='sociatus', type='Zoanthid', common_name='Zoa')
+        db.session.add(taxon)
+        db.session.commit()
+        db.session.add(models.ColorMorphs(taxonomy_id=taxon.id, morph_name='Utter Chaos'))
+        db.session.commit()
+        suggest_index.build()
+
+    with app.test_client() as client:
+        resp = client.get('/api/v1/taxonomy/suggest?q=utter')
+        morph = resp.get_json()[0]
+        assert (morph['kind'], morph['genus']) == ('morph', 'Zoanthus')
+
+        client.delete('/web/fn/ops/delete/color_morphs', json={'id': morph['id']})
+        assert client.get('/api/v1/taxonomy/suggest?q=utter').get_json() == []
+        assert client.get('/api/v1/taxonomy/suggest?q=').get_json() == []
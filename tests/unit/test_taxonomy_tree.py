@@ -0,0 +1,101 @@
+from app import app, db
+from modules import models
+from modules.taxonomy_tree import taxonomy_tree
+
+
+def test_taxonomy_pickers_use_etags_and_rebuild_on_edit():
+    with app.app_context():
+        acro = models.Taxonomy(genus='Acropora', species='millepora', type='SPS', common_name='Milli')
+        acro2 = models.Taxonomy(genus='Acropora', species='tenuis', type='SPS')
+        db.session.add_all([acro, acro2])
+        db.session.commit()
+        db.session.add(models.ColorMorphs(taxonomy_id=acro.id, morph_name='Rainbow'))
+        db.session.commit()
+        taxonomy_tree.invalidate()
+        acro_id = acro.id
+        tenuis_id = acro2.id
+
+    with app.test_client() as client:
+        resp = client.get('/api/v1/taxonomy/genus/details/Acropora')
+        assert resp.status_code == 200
+        etag = resp.headers['ETag']
+        assert not etag.startswith('W/')
+        body = resp.get_json()
+        assert [s['species'] for s in body['species']] == ['millepora', 'tenuis']
+        assert body['color_morphs'] == [{'id': body['color_morphs'][0]['id'], 'name': 'Rainbow', 'taxonomy_id': acro_id}]
+
+        rebuilds = taxonomy_tree.rebuilds
+        resp = client.get('/web/fn/taxonomy/genus/details/Acropora', headers={'If-None-Match': etag})
+        assert resp.status_code == 304
+        assert taxonomy_tree.rebuilds == rebuilds
+
+        genera = client.get('/api/v1/taxonomy/genus/all').get_json()
+        assert {'genus': 'Acropora', 'type': 'SPS', 'id': acro_id} in genera
+        assert client.get('/api/v1/taxonomy/species/by_genus?genus=Nope').get_json() == []
+
+        # Editing taxonomy through table_ops drops the tree, so the ETag changes
+        client.delete('/web/fn/ops/delete/taxonomy', json={'id': tenuis_id})
+        resp = client.get('/api/v1/taxonomy/genus/details/Acropora', headers={'If-None-Match': etag})
+        assert resp.status_code == 200
+        assert resp.headers['ETag'] != etag
+        assert [s['species'] for s in resp.get_json()['species']] == ['millepora']
+
+
+def test_bootstrap_is_one_joined_query_in_compact_rows():
+    from sqlalchemy import event
+
+    with app.app_context():
+        fav = models.Taxonomy(genus='Favia', species='speciosa', type='LPS')
+        db.session.add(fav)
+        db.session.commit()
+        db.session.add_all([
+            models.ColorMorphs(taxonomy_id=fav.id, morph_name='Green'),
+            models.ColorMorphs(taxonomy_id=fav.id, morph_name='Bubblegum'),
+        ])
+        db.session.commit()
+        fav_id = fav.id
+        taxonomy_tree.invalidate()
+
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            with app.test_client() as client:
+                full = client.get('/web/fn/taxonomy/bootstrap').get_json()
+                part = client.get('/api/v1/taxonomy/bootstrap?genus=Favia').get_json()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        assert len([s for s in statements if 'taxonomy' in s]) == 1
+
+    assert full['fields']['morphs'] == ['id', 'name', 'taxonomy_id']
+    assert ['Favia', 'LPS', fav_id] in full['genera']
+    assert part['genera'] == [['Favia', 'LPS', fav_id]]
+    assert part['species'] == [[fav_id, 'Favia', 'speciosa', None]]
+    assert [m[1] for m in part['morphs']] == ['Bubblegum', 'Green']
+    assert part['v'] == full['v']
+
+
+def test_genus_lookups_ignore_case_like_mysql():
+    with app.app_context():
+        first = models.Taxonomy(genus='Leptoseris', species='gardineri', type='SPS')
+        db.session.add(first)
+        db.session.commit()
+        db.session.add(models.Taxonomy(genus='leptoseris', species='hawaiiensis', type='SPS'))
+        db.session.commit()
+        first_id = first.id
+        taxonomy_tree.invalidate()
+
+    with app.test_client() as client:
+        genera = [g for g in client.get('/api/v1/taxonomy/genus/all').get_json() if g['genus'].lower() == 'leptoseris']
+        assert genera == [{'genus': 'Leptoseris', 'type': 'SPS', 'id': first_id}]
+
+        upper = client.get('/api/v1/taxonomy/genus/details/LEPTOSERIS')
+        lower = client.get('/api/v1/taxonomy/genus/details/leptoseris')
+        assert [s['species'] for s in upper.get_json()['species']] == ['gardineri', 'hawaiiensis']
+        assert upper.headers['ETag'] == lower.headers['ETag']
+
+        species = client.get('/api/v1/taxonomy/species/by_genus?genus=leptoseris').get_json()
+        assert {s['genus'] for s in species} == {'Leptoseris'}
+        part = client.get('/api/v1/taxonomy/bootstrap?genus=leptoSERIS').get_json()
+        assert part['genera'] == [['Leptoseris', 'SPS', first_id]]
+        assert [row[1:3] for row in part['species']] == [['Leptoseris', 'gardineri'], ['Leptoseris', 'hawaiiensis']]
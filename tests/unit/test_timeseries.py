@@ -0,0 +1,64 @@
+import math
+from datetime import date, time, timedelta
+
+import pytest
+from app import app, db
+from modules import models
+from modules.utils import timeseries
+
+
+def test_lttb_bounds_points_and_keeps_endpoints():
+    ts = list(range(0, 10000 * 1000, 1000))
+    values = [math.sin(i / 50) for i in range(len(ts))]
+    out_ts, out_values = timeseries.lttb(ts, values, 100)
+    assert len(out_ts) == 100
+    assert out_ts[0] == ts[0] and out_ts[-1] == ts[-1]
+    assert list(out_ts) == sorted(out_ts)
+
+
+def test_bucket_aggregate_min_max_avg():
+    ts = [0, 1, 2, 10, 11]
+    values = [1.0, 3.0, float('nan'), 5.0, 7.0]
+    rows = timeseries.bucket_aggregate(ts, values, 2, start=0, end=11)
+    assert rows == [[0, 1.0, 3.0, 2.0, 2], [6, 5.0, 7.0, 6.0, 2]]
+
+
+@pytest.fixture
+def series_tank():
+    with app.app_context():
+        tank = models.Tank(name="series-tank")
+        db.session.add(tank)
+        db.session.commit()
+        start = date(2024, 1, 1)
+        db.session.add_all([
+            models.TestResults(
+                tank_id=tank.id,
+                test_date=start + timedelta(days=i),
+                test_time=time(12, 0),
+                alk=8.0 + (i % 7) / 10,
+                cal=420,
+            )
+            for i in range(400)
+        ])
+        db.session.commit()
+        yield tank.id
+
+
+def test_series_endpoint_is_bounded(series_tank):
+    with app.test_client() as client:
+        resp = client.get(f"/api/v1/tests/series?tank_id={series_tank}&params=alk,cal&points=50")
+        assert resp.status_code == 200
+        body = resp.get_json()
+        assert body['series']['alk']['raw_count'] == 400
+        assert len(body['series']['alk']['data']) == 50
+
+        resp = client.get(
+            f"/api/v1/tests/series?tank_id={series_tank}&params=alk&mode=bucket&points=10"
+            "&start=2024-01-01&end=2024-01-31"
+        )
+        body = resp.get_json()
+        assert sum(row[4] for row in body['series']['alk']['data']) == 31
+        assert len(body['series']['alk']['data']) <= 10
+
+        resp = client.get(f"/api/v1/tests/series?tank_id={series_tank}&params=bogus")
+        assert resp.status_code == 400